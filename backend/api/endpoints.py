@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from prometheus_client import Counter, Summary, generate_latest, CONTENT_TYPE_LATEST
 from fastapi.responses import Response
 from typing import List, Dict, Any
 from api.schema import CounterDTO
 
-from database.service import DatabaseService
-from core.dependencies import get_db_session
+from database.service import AsyncDatabaseService
+from core.dependencies import get_async_db_session
 from core.training_orchestrator import run_model_training
 from pipelines.daily_update import run_daily_update
 from utils.logging_config import logger
@@ -36,12 +36,12 @@ update_counter = Counter(
 
 
 @router.get("/counters", response_model=List[CounterDTO])
-def get_counters(db: Session = Depends(get_db_session)):
+async def get_counters(db: AsyncSession = Depends(get_async_db_session)):
     """
     Récupère la liste de tous les compteurs disponibles.
     """
-    service = DatabaseService(db)
-    counters = service.get_all_stations()
+    service = AsyncDatabaseService(db)
+    counters = await service.get_all_stations()
 
     if not counters:
         return []
@@ -50,9 +50,8 @@ def get_counters(db: Session = Depends(get_db_session)):
 
 
 @router.get("/predict", summary="Get the latest prediction for a counter")
-@request_latency.time()
-def get_prediction(
-    station_id: str, db: Session = Depends(get_db_session)
+async def get_prediction(
+    station_id: str, db: AsyncSession = Depends(get_async_db_session)
 ) -> Dict[str, Any]:
     """
     Returns the most recent prediction for a given `station_id`.
@@ -60,8 +59,10 @@ def get_prediction(
     # Increment prediction counter metric
     predictions_counter.labels(station_id=station_id).inc()
 
-    service = DatabaseService(db)
-    prediction = service.get_latest_prediction_for_counter(station_id)
+    # The Summary decorator does not support coroutines: time the body instead
+    with request_latency.time():
+        service = AsyncDatabaseService(db)
+        prediction = await service.get_latest_prediction_for_counter(station_id)
 
     # If the ID does not exist or there is no prediction, a 404 is returned.
     if not prediction:
@@ -115,14 +116,16 @@ def metrics():
 
 
 @router.get("/dashboard/{station_id}")
-def get_dashboard_data(station_id: str, db: Session = Depends(get_db_session)):
+async def get_dashboard_data(
+    station_id: str, db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Aggregated endpoint for the frontend: returns Prediction of the day + History.
     """
-    service = DatabaseService(db)
+    service = AsyncDatabaseService(db)
 
     # Daily prediction (D0)
-    pred_today = service.get_latest_prediction_for_counter(station_id)
+    pred_today = await service.get_latest_prediction_for_counter(station_id)
 
     # Prepare prediction info, including its date for the frontend to check freshness.
     if pred_today:
@@ -139,7 +142,7 @@ def get_dashboard_data(station_id: str, db: Session = Depends(get_db_session)):
     # if get_dashboard_stats returns the specific lists.
 
     # Historical statistics
-    stats = service.get_dashboard_stats(station_id)
+    stats = await service.get_dashboard_stats(station_id)
 
     # We calculate the “Yesterday” KPI here to simplify the frontend.
     # We take the last value from the ‘accuracy’ lists.
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from database.database import DatabaseManager
+from database.database import DatabaseManager, AsyncDatabaseManager
 from utils.logging_config import logger
 
 # We retrieve the path of the current file (backend/core/dependencies.py)
@@ -17,6 +17,8 @@ load_dotenv(dotenv_path=env_path)
 # Verification and Instantiation
 
 db_url = os.getenv("DATABASE_URL")
+# Optional read-only replica: serves the API reads and the heavy analytical reads
+read_db_url = os.getenv("DATABASE_READ_URL")
 
 if not db_url:
     logger.warning("ALERT: DATABASE_URL is empty!")
@@ -24,7 +26,9 @@ if not db_url:
 else:
     logger.info("Starting the API with the database!")
 
-db_manager = DatabaseManager(database_url=db_url)
+db_manager = DatabaseManager(database_url=db_url, read_database_url=read_db_url)
+# Async engine used by the FastAPI read endpoints (on the replica if configured)
+async_db_manager = AsyncDatabaseManager(database_url=read_db_url or db_url)
 
 
 def get_db_session():
@@ -36,3 +40,11 @@ def get_db_session():
         yield session
     finally:
         session.close()
+
+
+async def get_async_db_session():
+    """
+    FastAPI dependency for obtaining an async database session.
+    """
+    async with async_db_manager.get_session() as session:
+        yield session
@@ -4,6 +4,7 @@ from apscheduler.triggers.cron import CronTrigger
 
 from pipelines.scheduled_tasks import (
     run_full_daily_process,
+    run_features_archival,
 )  # Assuming this file exists
 from core.training_orchestrator import run_model_training
 from utils.logging_config import logger
@@ -42,6 +43,19 @@ def start_scheduler():
         replace_existing=True,
     )
 
+    # Task 3: Monthly archival of cold features_data rows
+    # Runs on the 1st day of the month at 3:00 AM, after the retraining
+    archival_trigger = CronTrigger(
+        day="1", hour=3, minute=0, timezone=pytz.timezone("Europe/Paris")
+    )
+    _scheduler.add_job(
+        run_features_archival,
+        trigger=archival_trigger,
+        id="monthly_archival_job",
+        name="Monthly Features Archival",
+        replace_existing=True,
+    )
+
     # Launch
     try:
         _scheduler.start()
@@ -58,6 +72,11 @@ def start_scheduler():
             logger.info(
                 f"Monthly training job scheduled. Next run: {monthly_job.next_run_time}"
             )
+        archival_job = _scheduler.get_job("monthly_archival_job")
+        if archival_job:
+            logger.info(
+                f"Monthly archival job scheduled. Next run: {archival_job.next_run_time}"
+            )
     except Exception as e:
         logger.error(f"Error starting the scheduler: {e}")
 
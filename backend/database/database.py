@@ -1,5 +1,6 @@
 from sqlalchemy import (
     Column,
+    Boolean,
     Integer,
     String,
     DateTime,
@@ -8,17 +9,35 @@ from sqlalchemy import (
     create_engine,
     ForeignKey,
     JSON,
+    LargeBinary,
+    UniqueConstraint,
 )
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 import os
 from utils.logging_config import logger
+from .pool import engine_options, configure_engine
+from .features_codec import decode_features
+from .partitioning import (
+    PARTITIONED_TABLES,
+    create_partitioned_tables,
+    is_partitioned,
+)
 
 
 # Database
 Base = declarative_base()
 
+# Async driver used for each backend by AsyncDatabaseManager
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mssql": "mssql+aioodbc",
+}
+
 
 class CounterInfo(Base):
     """Table for all counter information"""
@@ -47,6 +66,12 @@ class BikeCount(Base):
     intensity = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
 
+    # One count per station and day. The unique index also serves every
+    # per-station date-range read.
+    __table_args__ = (
+        UniqueConstraint("station_id", "date", name="uq_bike_count_station_date"),
+    )
+
 
 class Prediction(Base):
     """Table for predictions"""
@@ -68,6 +93,26 @@ class Prediction(Base):
     )
     created_at = Column(DateTime, default=datetime.now)
 
+    # One prediction per station and day: re-running the predictor updates it
+    __table_args__ = (
+        UniqueConstraint(
+            "station_id", "prediction_date", name="uq_predictions_station_date"
+        ),
+    )
+
+
+class LatestPrediction(Base):
+    """Lookup table: most recent prediction of each counter (primary-key reads)"""
+
+    __tablename__ = "latest_prediction"
+
+    station_id = Column(
+        String(255), ForeignKey("counters_info.station_id"), primary_key=True
+    )
+    prediction_id = Column(Integer, ForeignKey("predictions.id"), nullable=False)
+    prediction_date = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now)
+
 
 class Weather(Base):
     """Table for weather data"""
@@ -75,12 +120,29 @@ class Weather(Base):
     __tablename__ = "weather"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    date = Column(DateTime, nullable=False)
+    date = Column(DateTime, nullable=False, unique=True)
     avg_temp = Column(Float(2), nullable=False)
     precipitation_mm = Column(Float)
     vent_max = Column(Float)
 
 
+class CellWeather(Base):
+    """
+    Daily weather history per grid cell (see download.weather_grid): the
+    weather of the stations' own cells, used by the feature store instead of
+    the city-wide `weather` rows when available.
+    """
+
+    __tablename__ = "weather_cells"
+
+    cell_lat = Column(Float, primary_key=True)
+    cell_lon = Column(Float, primary_key=True)
+    date = Column(DateTime, primary_key=True, index=True)
+    avg_temp = Column(Float)
+    precipitation_mm = Column(Float)
+    vent_max = Column(Float)
+
+
 class ModelMetrics(Base):
     """Table for model metrics"""
 
@@ -99,8 +161,25 @@ class ModelMetrics(Base):
     created_at = Column(DateTime, default=datetime.now)
 
 
+class FeaturesContext(Base):
+    """Feature values shared by all the stations of a prediction day (weather, calendar)."""
+
+    __tablename__ = "features_context"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(DateTime, nullable=False, index=True)
+    shared = Column(JSON, nullable=False)  # {feature: value}
+    vector_columns = Column(JSON, nullable=False)  # Order of the per-station vectors
+    created_at = Column(DateTime, default=datetime.now)
+
+
 class FeaturesData(Base):
-    """Table to store the feature-engineered data used for a prediction."""
+    """
+    Table to store the feature-engineered data used for a prediction.
+
+    Features are split between the day context (shared values) and a
+    per-station vector of packed float32 values.
+    """
 
     __tablename__ = "features_data"
 
@@ -112,38 +191,174 @@ class FeaturesData(Base):
         String(255), ForeignKey("counters_info.station_id"), nullable=False, index=True
     )
     date = Column(DateTime, nullable=False, index=True)
-    features = Column(JSON, nullable=False)
+    context_id = Column(
+        Integer, ForeignKey("features_context.id"), nullable=False, index=True
+    )
+    vector = Column(LargeBinary, nullable=False)
     target_intensity = Column(Integer)  # The actual value (your 'intensity' feature)
     created_at = Column(DateTime, default=datetime.now)
 
     prediction = relationship("Prediction", back_populates="training_data")
+    context = relationship("FeaturesContext")
+
+    @property
+    def features(self) -> dict:
+        """Decoded features of this prediction (shared + per-station values)."""
+        return decode_features(
+            self.context.shared, self.context.vector_columns, self.vector
+        )
+
+
+class FeaturesDataArchive(Base):
+    """Cold storage for features_data rows older than the retention period."""
+
+    __tablename__ = "features_data_archive"
+
+    # Same ids as in features_data; no foreign keys so that predictions
+    # and counters can be purged independently of the archive
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    prediction_id = Column(Integer, nullable=False)
+    station_id = Column(String(255), nullable=False, index=True)
+    date = Column(DateTime, nullable=False, index=True)
+    context_id = Column(Integer, nullable=False, index=True)
+    vector = Column(LargeBinary, nullable=False)
+    target_intensity = Column(Integer)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.now)
+
+
+class IngestionWatermark(Base):
+    """High-water mark of the traffic ingestion: last day stored per station"""
+
+    __tablename__ = "ingestion_watermarks"
+
+    station_id = Column(String(255), primary_key=True)
+    last_ingested_date = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+class StationWeeklyTotal(Base):
+    """Rollup table: total traffic per station and ISO week (Monday start)"""
+
+    __tablename__ = "station_weekly_totals"
+
+    station_id = Column(
+        String(255), ForeignKey("counters_info.station_id"), primary_key=True
+    )
+    week_start = Column(DateTime, primary_key=True)
+    total_intensity = Column(Integer, nullable=False)
+    days_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+class StationWeekdayProfile(Base):
+    """Rollup table: average traffic per station and day of week over the last 90 days"""
+
+    __tablename__ = "station_weekday_profiles"
+
+    station_id = Column(
+        String(255), ForeignKey("counters_info.station_id"), primary_key=True
+    )
+    weekday = Column(Integer, primary_key=True)  # 0=Monday, 6=Sunday
+    avg_intensity = Column(Float, nullable=False)
+    days_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+class StationRollingStats(Base):
+    """Rollup table: rolling 30/90-day statistics per station"""
+
+    __tablename__ = "station_rolling_stats"
+
+    station_id = Column(
+        String(255), ForeignKey("counters_info.station_id"), primary_key=True
+    )
+    as_of_date = Column(DateTime, nullable=False)  # Most recent count of the station
+    total_30d = Column(Integer, nullable=False)
+    days_30d = Column(Integer, nullable=False)
+    mean_30d = Column(Float)
+    total_90d = Column(Integer, nullable=False)
+    days_90d = Column(Integer, nullable=False)
+    mean_90d = Column(Float)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+class StationFeatures(Base):
+    """
+    Feature store: one precomputed feature row per station and day, read as is
+    by the training and the prediction pipelines (see features.feature_store).
+    """
+
+    __tablename__ = "station_features"
+
+    station_id = Column(
+        String(255), ForeignKey("counters_info.station_id"), primary_key=True
+    )
+    date = Column(DateTime, primary_key=True, index=True)
+    intensity = Column(Integer)  # Target, None until the count of the day is ingested
+    latitude = Column(Float)
+    longitude = Column(Float)
+    avg_temp = Column(Float)
+    precipitation_mm = Column(Float)
+    vent_max = Column(Float)
+    day_of_week = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    day_of_year = Column(Integer, nullable=False)
+    is_weekend = Column(Integer, nullable=False)
+    is_holiday = Column(Boolean, nullable=False)
+    day_of_week_sin = Column(Float, nullable=False)
+    day_of_week_cos = Column(Float, nullable=False)
+    month_sin = Column(Float, nullable=False)
+    month_cos = Column(Float, nullable=False)
+    is_rainy = Column(Integer, nullable=False)
+    is_cold = Column(Integer, nullable=False)
+    is_hot = Column(Integer, nullable=False)
+    is_windy = Column(Integer, nullable=False)
+    lag_1 = Column(Float)  # Intensity of the day before (None if not counted)
+    lag_7 = Column(Float)  # Intensity one week before
+    updated_at = Column(DateTime, default=datetime.now)
 
 
 class DatabaseManager:
     """Gestionnaire de base de données"""
 
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, read_database_url: str = None):
         database_url = database_url or os.getenv(
             "DATABASE_URL", "sqlite:///./bike_count_montpellier.db"
         )
         self.database_url = database_url
+        # Optional read-only replica (DATABASE_READ_URL)
+        self.read_database_url = read_database_url or os.getenv("DATABASE_READ_URL")
         self.engine = None
         self.SessionLocal = None
+        self.read_engine = None
+        self.ReadSessionLocal = None
         self._setup_engine()
 
     def _setup_engine(self):
         """Configure the database engine"""
         try:
+            # Pool size, overflow, pre-ping, recycle and timeouts come from the environment
             self.engine = create_engine(
-                self.database_url,
-                connect_args={"check_same_thread": False}
-                if "sqlite" in self.database_url
-                else {},
+                self.database_url, **engine_options(self.database_url)
             )
+            configure_engine(self.engine)
             self.SessionLocal = sessionmaker(
                 autocommit=False, autoflush=False, bind=self.engine
             )
             logger.info(f"Database engine configure from: {self.database_url}")
+
+            if self.read_database_url:
+                self.read_engine = create_engine(
+                    self.read_database_url,
+                    **engine_options(self.read_database_url, role="replica"),
+                )
+                configure_engine(self.read_engine, role="replica")
+                self.ReadSessionLocal = sessionmaker(
+                    autocommit=False, autoflush=False, bind=self.read_engine
+                )
+                logger.info("Read replica engine configured.")
         except Exception as e:
             logger.error(f"Error setting up database engine: {e}")
             raise
@@ -151,7 +366,18 @@ class DatabaseManager:
     def init_db(self):
         """Initialises the database tables"""
         try:
-            Base.metadata.create_all(bind=self.engine)
+            if is_partitioned(self.engine):
+                # bike_count and features_data are created as monthly partitioned tables
+                tables = Base.metadata.sorted_tables
+                partitioned = [t for t in tables if t.name in PARTITIONED_TABLES]
+                Base.metadata.create_all(
+                    bind=self.engine,
+                    tables=[t for t in tables if t not in partitioned],
+                )
+                with self.engine.begin() as connection:
+                    create_partitioned_tables(connection, partitioned)
+            else:
+                Base.metadata.create_all(bind=self.engine)
             logger.info("Databse tables created successfully")
         except SQLAlchemyError as e:
             logger.error(f"Error creating database tables: {e}")
@@ -160,3 +386,55 @@ class DatabaseManager:
     def get_session(self):
         """Returns a database session"""
         return self.SessionLocal()
+
+    @property
+    def has_read_replica(self) -> bool:
+        return self.ReadSessionLocal is not None
+
+    def get_read_session(self):
+        """Returns a session on the read replica, or None if reads go to the primary"""
+        return self.ReadSessionLocal() if self.has_read_replica else None
+
+
+def to_async_url(database_url: str) -> str:
+    """Converts a synchronous database URL to its async driver equivalent."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+class AsyncDatabaseManager:
+    """Gestionnaire de base de données asynchrone (endpoints FastAPI)"""
+
+    def __init__(self, database_url: str = None):
+        database_url = database_url or os.getenv(
+            "DATABASE_URL", "sqlite:///./bike_count_montpellier.db"
+        )
+        self.database_url = to_async_url(database_url)
+        self.engine = None
+        self.SessionLocal = None
+        self._setup_engine()
+
+    def _setup_engine(self):
+        """Configure the async database engine"""
+        try:
+            self.engine = create_async_engine(
+                self.database_url,
+                **engine_options(self.database_url, role="async", is_async=True),
+            )
+            configure_engine(self.engine.sync_engine, role="async")
+            self.SessionLocal = async_sessionmaker(
+                self.engine, class_=AsyncSession, expire_on_commit=False
+            )
+            logger.info("Async database engine configured.")
+        except Exception as e:
+            logger.error(f"Error setting up async database engine: {e}")
+            raise
+
+    def get_session(self) -> AsyncSession:
+        """Returns an async database session"""
+        return self.SessionLocal()
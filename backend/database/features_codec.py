@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Per-station feature vectors are stored as packed little-endian float32
+VECTOR_DTYPE = np.dtype("<f4")
+
+
+def _to_native(value: Any) -> Any:
+    """numpy scalars -> python types (JSON serializable)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def split_features(records: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Splits the feature dicts of one prediction day into shared and per-station parts.
+
+    A feature is shared when every record holds the same value (weather,
+    calendar...). The others become the columns of the per-station vector,
+    in first-seen order.
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: (shared values, vector column names)
+    """
+    keys = list(dict.fromkeys(k for record in records for k in record))
+    shared, vector_columns = {}, []
+    for key in keys:
+        first = _to_native(records[0].get(key, np.nan))
+        if all(key in r and _to_native(r[key]) == first for r in records):
+            shared[key] = first
+        else:
+            vector_columns.append(key)
+    return shared, vector_columns
+
+
+def _is_numeric(value: Any) -> bool:
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def encode_vector(features: Dict[str, Any], vector_columns: List[str]) -> bytes:
+    """
+    Packs the per-station values as float32 (missing features -> NaN).
+
+    Raises:
+        ValueError: If a per-station value is not numeric (the message names
+            the columns), e.g. a date converted to str.
+    """
+    values = [features.get(c, np.nan) for c in vector_columns]
+    try:
+        return np.asarray(values, dtype=VECTOR_DTYPE).tobytes()
+    except (TypeError, ValueError):
+        columns = [c for c, v in zip(vector_columns, values) if not _is_numeric(v)]
+        raise ValueError(f"Non-numeric per-station features: {columns}") from None
+
+
+def decode_features(
+    shared: Optional[Dict[str, Any]], vector_columns: List[str], vector: bytes
+) -> Dict[str, Any]:
+    """Rebuilds the feature dict of one station from its context and vector."""
+    values = np.frombuffer(vector, dtype=VECTOR_DTYPE).tolist()
+    return {**(shared or {}), **dict(zip(vector_columns, values))}
+
+
+def decode_matrix(vectors: List[bytes], width: int) -> np.ndarray:
+    """Stacks the vectors of one context into a (n_rows, width) float32 matrix."""
+    return np.frombuffer(b"".join(vectors), dtype=VECTOR_DTYPE).reshape(
+        len(vectors), width
+    )
@@ -0,0 +1,176 @@
+import os
+import re
+from datetime import date, datetime
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Index,
+    MetaData,
+    PrimaryKeyConstraint,
+    Table,
+    UniqueConstraint,
+    text,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from utils.logging_config import logger
+
+# Tables stored as monthly range partitions, with their partition key
+PARTITIONED_TABLES = {"bike_count": "date", "features_data": "date"}
+
+
+def partitioning_mode() -> str:
+    """Storage layout from DB_PARTITIONING: "none" (default) or "monthly"."""
+    return os.getenv("DB_PARTITIONING", "none").strip().lower()
+
+
+def is_partitioned(bind) -> bool:
+    """True if monthly partitions are used on this connection/engine (PostgreSQL only)."""
+    return partitioning_mode() == "monthly" and bind.dialect.name == "postgresql"
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    """e.g. bike_count_y2025m01"""
+    return f"{table_name}_y{month.year}m{month.month:02d}"
+
+
+def partitioned_table_ddl(table: Table) -> List[str]:
+    """
+    Builds the PostgreSQL DDL of `table` as a range-partitioned parent table.
+
+    PostgreSQL requires the partition key in every primary key and unique
+    constraint: it is appended to them (e.g. PRIMARY KEY (id, date)).
+    Column types, foreign keys and indexes are taken from the ORM model.
+    """
+    key = PARTITIONED_TABLES[table.name]
+    metadata = MetaData()
+    # Referenced tables must exist in the metadata to compile the foreign keys
+    for fk in table.foreign_keys:
+        fk.column.table.to_metadata(metadata)
+
+    columns = [
+        Column(
+            c.name,
+            c.type,
+            *[ForeignKey(fk.target_fullname) for fk in c.foreign_keys],
+            nullable=c.nullable,
+            autoincrement=c.autoincrement,
+        )
+        for c in table.columns
+    ]
+    pk_cols = [c.name for c in table.primary_key.columns]
+    constraints = [
+        PrimaryKeyConstraint(*pk_cols, *([key] if key not in pk_cols else []))
+    ]
+
+    # Column-level unique=True is already listed in table.constraints
+    unique_sets = {}
+    for uc in table.constraints:
+        if isinstance(uc, UniqueConstraint):
+            cols = [c.name for c in uc.columns]
+            cols += [key] if key not in cols else []
+            unique_sets[tuple(cols)] = uc.name or f"uq_{table.name}_{'_'.join(cols)}"
+    constraints += [UniqueConstraint(*cols, name=n) for cols, n in unique_sets.items()]
+
+    parent = Table(
+        table.name,
+        metadata,
+        *columns,
+        *constraints,
+        postgresql_partition_by=f"RANGE ({key})",
+    )
+    dialect = postgresql.dialect()
+    ddl = [str(CreateTable(parent, if_not_exists=True).compile(dialect=dialect))]
+    for c in table.columns:
+        if c.index:
+            index = Index(f"ix_{table.name}_{c.name}", parent.c[c.name])
+            ddl.append(
+                str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+            )
+    return ddl
+
+
+def create_partitioned_tables(connection: Connection, tables: Iterable[Table]) -> None:
+    """Creates the partitioned parent tables (no partition is created here)."""
+    for table in tables:
+        for statement in partitioned_table_ddl(table):
+            connection.execute(text(statement))
+        logger.info(f"Partitioned table {table.name} created (monthly, on date).")
+
+
+def ensure_partitions(
+    connection: Connection, table_name: str, dates: Iterable[datetime]
+) -> None:
+    """
+    Creates the monthly partitions of `table_name` covering `dates`, if missing.
+    Must be called before inserting rows: there is no default partition.
+
+    Existing partitions are looked up in the catalog of the current
+    transaction, not cached in the process: a rolled back CREATE TABLE is
+    created again by the next call.
+    """
+    months = {month_start(d.date() if isinstance(d, datetime) else d) for d in dates}
+    for month in sorted(months):
+        name = partition_name(table_name, month)
+        exists = connection.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+        ).scalar()
+        if exists:
+            continue
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            )
+        )
+        logger.info(f"Partition {name} created.")
+
+
+def list_partitions(connection: Connection, table_name: str) -> List[Tuple[str, date]]:
+    """Returns the monthly partitions of `table_name` as (name, month) pairs."""
+    rows = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ),
+        {"table": table_name},
+    ).scalars()
+    pattern = re.compile(rf"^{table_name}_y(\d{{4}})m(\d{{2}})$")
+    partitions = []
+    for name in rows:
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_partitions_before(
+    connection: Connection, table_name: str, older_than: datetime
+) -> List[str]:
+    """
+    Drops the partitions of `table_name` that only hold rows older than `older_than`.
+    Returns the dropped partition names.
+    """
+    limit = older_than.date() if isinstance(older_than, datetime) else older_than
+    dropped = []
+    for name, month in list_partitions(connection, table_name):
+        if next_month(month) <= limit:
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} partitions of {table_name}.")
+    return dropped
@@ -0,0 +1,153 @@
+import os
+import time
+from typing import Any, Dict
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# ----------- Metrics -----------
+# Exposed on the existing /metrics mount (default Prometheus registry).
+# The "role" label is the pool logging name (e.g. "primary").
+pool_checkouts = Counter(
+    "db_pool_checkouts_total", "Number of connections checked out", ["role"]
+)
+pool_checkout_timeouts = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Number of checkouts that timed out waiting for a connection",
+    ["role"],
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["role"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30),
+)
+pool_checked_out = Gauge(
+    "db_pool_checked_out_connections", "Connections currently checked out", ["role"]
+)
+pool_size = Gauge("db_pool_size", "Configured pool size", ["role"])
+pool_overflow = Gauge(
+    "db_pool_overflow_connections",
+    "Connections currently open beyond pool_size",
+    ["role"],
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+class _InstrumentedPoolMixin:
+    """Records checkout wait times and timeouts of a QueuePool in Prometheus."""
+
+    def _do_get(self):
+        role = self.logging_name or "default"
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.labels(role=role).inc()
+            raise
+        pool_checkout_wait.labels(role=role).observe(time.perf_counter() - start)
+        pool_checkouts.labels(role=role).inc()
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(
+    database_url: str, role: str = "primary", is_async: bool = False
+) -> Dict[str, Any]:
+    """
+    Builds the create_engine (or create_async_engine) keyword arguments
+    from environment variables.
+
+    - DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s)
+    - DB_POOL_RECYCLE (1800 s), DB_POOL_PRE_PING (true)
+    - DB_STATEMENT_TIMEOUT_MS (0 = disabled): applied on PostgreSQL and SQL Server
+
+    In-memory SQLite databases keep SQLAlchemy's default single-connection pool.
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_logging_name": role,
+    }
+    connect_args: Dict[str, Any] = {}
+
+    if "sqlite" in database_url:
+        connect_args["check_same_thread"] = False
+        if ":memory:" in database_url or database_url.rstrip("/").endswith("sqlite:"):
+            options["connect_args"] = connect_args
+            return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+    )
+
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+    if statement_timeout and database_url.startswith("postgresql"):
+        if is_async:
+            # asyncpg takes server settings instead of libpq options
+            connect_args["server_settings"] = {
+                "statement_timeout": str(statement_timeout)
+            }
+        else:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+    options["connect_args"] = connect_args
+    return options
+
+
+def configure_engine(engine: Engine, role: str = "primary") -> None:
+    """
+    Attaches per-connection settings and pool gauges to an engine.
+
+    - SQLite: WAL journal and synchronous=NORMAL (DB_SQLITE_WAL, default true),
+      so readers no longer block on the writer.
+    - SQL Server: query timeout from DB_STATEMENT_TIMEOUT_MS.
+    """
+    dialect = engine.dialect.name
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+    if dialect == "sqlite" and _env_bool("DB_SQLITE_WAL", True):
+
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+
+    elif dialect == "mssql" and statement_timeout:
+
+        @event.listens_for(engine, "connect")
+        def _set_query_timeout(dbapi_connection, connection_record):
+            # pyodbc expects seconds
+            dbapi_connection.timeout = max(1, statement_timeout // 1000)
+
+    # Gauges read the current pool (it is replaced on engine.dispose())
+    if isinstance(engine.pool, QueuePool):
+        pool_checked_out.labels(role=role).set_function(
+            lambda: engine.pool.checkedout()
+        )
+        pool_size.labels(role=role).set_function(lambda: engine.pool.size())
+        pool_overflow.labels(role=role).set_function(
+            lambda: max(0, engine.pool.overflow())
+        )
@@ -1,30 +1,214 @@
-from typing import List, Dict, Any, Optional, Type
+import os
+from collections import defaultdict
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Type
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func
+import pandas as pd
+from sqlalchemy import (
+    Integer,
+    Select,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 
 from .database import (
     Base,
     CounterInfo,
     BikeCount,
     Prediction,
+    LatestPrediction,
     Weather,
+    CellWeather,
     ModelMetrics,
+    FeaturesContext,
     FeaturesData,
+    FeaturesDataArchive,
+    IngestionWatermark,
+    StationWeeklyTotal,
+    StationWeekdayProfile,
+    StationRollingStats,
+    StationFeatures,
 )
+from .features_codec import decode_matrix, encode_vector, split_features
+from .partitioning import drop_partitions_before, ensure_partitions, is_partitioned
 from utils.logging_config import logger
 
+# Number of rows sent per INSERT statement by the bulk upsert path
+DEFAULT_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "1000"))
+
+# How far back "last known value" lookups search (keeps partition pruning possible)
+LAST_VALUE_LOOKBACK_DAYS = int(os.getenv("DB_LAST_VALUE_LOOKBACK_DAYS", "365"))
+
+# Rows per batch streamed by the training data reader
+TRAINING_CHUNK_SIZE = int(os.getenv("DB_TRAINING_CHUNK_SIZE", "50000"))
+
+# Dtypes of the training frame (station_id is categorical, see iter_training_data)
+TRAINING_DTYPES = {
+    "intensity": "int32",
+    "avg_temp": "float32",
+    "precipitation_mm": "float32",
+    "vent_max": "float32",
+    "latitude": "float64",
+    "longitude": "float64",
+}
+
+
+# --- Read statements shared by the sync and async services ---#
+
+
+def _week_start(day: date) -> datetime:
+    """Returns the Monday (at midnight) of the week containing `day`."""
+    return datetime.combine(day - timedelta(days=day.weekday()), time.min)
+
+
+def _latest_prediction_lookup_stmt(station_id: str) -> Select:
+    """Most recent prediction of a counter, through the latest_prediction table (primary keys only)."""
+    return (
+        select(Prediction)
+        .join(LatestPrediction, LatestPrediction.prediction_id == Prediction.id)
+        .where(LatestPrediction.station_id == station_id)
+    )
+
+
+def _latest_prediction_stmt(station_id: str) -> Select:
+    """Most recent prediction of a counter, sorting its predictions (lookup fallback)."""
+    return (
+        select(Prediction)
+        .where(Prediction.station_id == station_id)
+        .order_by(Prediction.prediction_date.desc())
+        .limit(1)
+    )
+
+
+def _dashboard_stmts(station_id: str, today: date) -> Tuple[Select, Select, Select]:
+    """
+    Statements feeding the dashboard:
+    - actuals and past predictions merged and grouped per day over the last 30 days,
+    - the precomputed weekday profile,
+    - the precomputed totals of the last 12 weeks.
+    """
+    start_30d = today - timedelta(days=30)
+    start_7d = today - timedelta(days=7)
+
+    actuals = select(
+        BikeCount.date.label("day"),
+        BikeCount.intensity.label("real"),
+        literal(None, Integer).label("pred"),
+    ).where(BikeCount.station_id == station_id, BikeCount.date >= start_30d)
+
+    # Past predictions, strictly before today
+    predictions = select(
+        Prediction.prediction_date.label("day"),
+        literal(None, Integer).label("real"),
+        Prediction.prediction_value.label("pred"),
+    ).where(
+        Prediction.station_id == station_id,
+        Prediction.prediction_date >= start_7d,
+        Prediction.prediction_date < today,
+    )
+
+    daily = union_all(actuals, predictions).subquery()
+    daily_stmt = (
+        select(
+            daily.c.day,
+            func.sum(daily.c.real).label("real"),
+            func.sum(daily.c.pred).label("pred"),
+        )
+        .group_by(daily.c.day)
+        .order_by(daily.c.day)
+    )
+
+    profile_stmt = select(
+        StationWeekdayProfile.weekday, StationWeekdayProfile.avg_intensity
+    ).where(StationWeekdayProfile.station_id == station_id)
+
+    first_week = _week_start(today) - timedelta(weeks=11)
+    totals_stmt = select(
+        StationWeeklyTotal.week_start, StationWeeklyTotal.total_intensity
+    ).where(
+        StationWeeklyTotal.station_id == station_id,
+        StationWeeklyTotal.week_start >= first_week,
+    )
+    return daily_stmt, profile_stmt, totals_stmt
+
+
+def _build_dashboard_stats(
+    daily_rows: Sequence[Any],
+    profile_rows: Sequence[Any],
+    total_rows: Sequence[Any],
+    today: date,
+) -> Dict[str, Any]:
+    """Shapes the rows returned by the dashboard statements for the frontend."""
+    # Alignment via dictionary (Date -> Value)
+    # We use .date() to ensure that we are comparing days, not hours.
+    dict_real: Dict[date, int] = {}
+    dict_pred: Dict[date, int] = {}
+    for r in daily_rows:
+        d = r.day.date() if isinstance(r.day, datetime) else r.day
+        if r.real is not None:
+            dict_real[d] = dict_real.get(d, 0) + int(r.real)
+        if r.pred is not None:
+            dict_pred[d] = dict_pred.get(d, 0) + int(r.pred)
+
+    # 30-day history (BikeCount)
+    # Note: If days are missing, the graph will be short; ideally, the gaps should be filled in.
+    history_30_days = [v for _, v in sorted(dict_real.items())]
+
+    # 7-day accuracy (Actual vs. Forecast comparison)
+    start_7d = today - timedelta(days=7)
+    dates_last_7 = [start_7d + timedelta(days=i) for i in range(7)]
+    acc_real = [dict_real.get(d, 0) for d in dates_last_7]
+    acc_pred = [dict_pred.get(d, 0) for d in dates_last_7]
+
+    # Averages per day of the week (Weekly Profile, precomputed over 90 days)
+    weekly_averages = [0] * 7
+    for r in profile_rows:
+        weekly_averages[r.weekday] = int(r.avg_intensity)
+
+    # Weekly Totals (12-week volume, oldest first, current week last)
+    totals = {r.week_start: r.total_intensity for r in total_rows}
+    current_week = _week_start(today)
+    weeks = [current_week - timedelta(weeks=11 - i) for i in range(12)]
+    weekly_totals = [totals.get(w, 0) for w in weeks]
+
+    return {
+        "history_30_days": history_30_days,
+        "accuracy_7_days": {"real": acc_real, "pred": acc_pred},
+        "weekly_averages": weekly_averages,
+        "weekly_totals": weekly_totals,
+    }
+
 
 class DatabaseService:
     """
     Service layer for database operations.
     This class abstracts the database session and provides
     methods to interact with the data models.
+
+    Read methods (get_*, load_*, iter_*) use `read_session` when given (read
+    replica). Writes, and the reads done as part of a write (upsert lookups,
+    rollup refresh, archival), always use `session` on the primary.
     """
 
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        read_session: Optional[Session] = None,
+    ):
         self.session = session
+        self.batch_size = batch_size
+        # Reads go to the replica when one is given, writes always to `session`
+        self.read_session = read_session or session
 
     def _bulk_add(self, model: Type[Base], data: List[Dict[str, Any]]) -> bool:
         """
@@ -41,6 +225,89 @@ class DatabaseService:
             logger.error(f"Error during bulk insert for {model.__tablename__}: {e}")
             return False
 
+    def _bulk_upsert(
+        self,
+        model: Type[Base],
+        data: List[Dict[str, Any]],
+        conflict_cols: List[str],
+    ) -> bool:
+        """
+        Generic idempotent bulk insert: rows whose `conflict_cols` already exist
+        are updated instead of duplicated.
+
+        Uses INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL, and a
+        select-then-insert/update fallback on other dialects. Rows are written
+        in batches of `self.batch_size`. Does not commit.
+        """
+        if not data:
+            logger.info(f"No data provided for model {model.__tablename__}. Skipping.")
+            return True
+
+        table = model.__table__
+        columns = set(table.columns.keys())
+        update_cols = [
+            c
+            for c in columns
+            if c not in conflict_cols and c not in ("id", "created_at")
+        ]
+
+        # Keep only table columns, and the last row for each key: a single
+        # ON CONFLICT statement cannot update the same row twice.
+        rows_by_key: Dict[tuple, Dict[str, Any]] = {}
+        for row in data:
+            clean = {k: v for k, v in row.items() if k in columns}
+            rows_by_key[tuple(clean.get(c) for c in conflict_cols)] = clean
+        rows = list(rows_by_key.values())
+
+        dialect = self.session.get_bind().dialect.name
+        try:
+            for i in range(0, len(rows), self.batch_size):
+                batch = rows[i : i + self.batch_size]
+                if dialect in ("postgresql", "sqlite"):
+                    insert = (
+                        postgresql.insert if dialect == "postgresql" else sqlite.insert
+                    )
+                    stmt = insert(table)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=conflict_cols,
+                        set_={c: stmt.excluded[c] for c in update_cols},
+                    )
+                    self.session.execute(stmt, batch)
+                else:
+                    self._upsert_fallback(model, batch, conflict_cols)
+            logger.info(f"Upserted {len(rows)} records into {model.__tablename__}.")
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Error during bulk upsert for {model.__tablename__}: {e}")
+            return False
+
+    def _upsert_fallback(
+        self, model: Type[Base], batch: List[Dict[str, Any]], conflict_cols: List[str]
+    ) -> None:
+        """Portable upsert for dialects without ON CONFLICT (e.g. SQL Server)."""
+        query = self.session.query(
+            model.id, *[getattr(model, c) for c in conflict_cols]
+        )
+        for c in conflict_cols:
+            query = query.filter(getattr(model, c).in_({row[c] for row in batch}))
+        existing = {tuple(r[1:]): r[0] for r in query.all()}
+
+        to_update, to_insert = [], []
+        for row in batch:
+            row_id = existing.get(tuple(row[c] for c in conflict_cols))
+            if row_id is None:
+                to_insert.append(row)
+            else:
+                to_update.append({**row, "id": row_id})
+
+        self.session.bulk_update_mappings(model, to_update)
+        self.session.bulk_insert_mappings(model, to_insert)
+
+    def _ensure_partitions(self, model: Type[Base], dates: List[datetime]) -> None:
+        """Creates the monthly partitions needed by `dates` (partitioned PostgreSQL only)."""
+        if dates and is_partitioned(self.session.get_bind()):
+            ensure_partitions(self.session.connection(), model.__tablename__, dates)
+
     def add_counter_infos(self, counters_data: List[Dict[str, Any]]) -> bool:
         """
         Add counters if they do not already exist (based on station_id).
@@ -87,16 +354,115 @@ class DatabaseService:
             return False
 
     def add_bike_counts(self, counts_data: List[Dict[str, Any]]):
-        """Adds multiple bike count records to the database."""
-        return self._bulk_add(BikeCount, counts_data)
+        """Adds or updates multiple bike count records (one per station and date)."""
+        try:
+            self._ensure_partitions(BikeCount, [row["date"] for row in counts_data])
+        except SQLAlchemyError as e:
+            logger.error(f"Error creating bike_count partitions: {e}")
+            return False
+        return self._bulk_upsert(BikeCount, counts_data, ["station_id", "date"])
 
     def add_weather_data(self, weather_data: List[Dict[str, Any]]):
-        """Adds multiple weather records to the database."""
-        return self._bulk_add(Weather, weather_data)
+        """Adds or updates multiple weather records (one per date)."""
+        return self._bulk_upsert(Weather, weather_data, ["date"])
+
+    def add_cell_weather(self, weather_data: List[Dict[str, Any]]):
+        """Adds or updates the weather history of grid cells (one per cell and date)."""
+        return self._bulk_upsert(
+            CellWeather, weather_data, ["cell_lat", "cell_lon", "date"]
+        )
 
     def add_predictions(self, predictions_data: List[Dict[str, Any]]):
-        """Add multiple predictions records to the database"""
-        return self._bulk_add(Prediction, predictions_data)
+        """Add or update multiple predictions records (one per station and date)"""
+        if not self._bulk_upsert(
+            Prediction, predictions_data, ["station_id", "prediction_date"]
+        ):
+            return False
+
+        # Most recent date of each station in this batch -> latest_prediction
+        latest: Dict[str, datetime] = {}
+        for row in predictions_data:
+            s_id, day = row["station_id"], row["prediction_date"]
+            if s_id not in latest or day > latest[s_id]:
+                latest[s_id] = day
+        if not latest:
+            return True
+        try:
+            rows = (
+                self.session.query(
+                    Prediction.id, Prediction.station_id, Prediction.prediction_date
+                )
+                .filter(Prediction.station_id.in_(list(latest)))
+                .filter(Prediction.prediction_date.in_(set(latest.values())))
+                .all()
+            )
+            self._refresh_latest_predictions(
+                [tuple(r) for r in rows if latest[r.station_id] == r.prediction_date]
+            )
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Error refreshing latest predictions: {e}")
+            return False
+
+    def _refresh_latest_predictions(
+        self, predictions: List[Tuple[int, str, datetime]]
+    ) -> None:
+        """
+        Points latest_prediction to the most recent of `predictions`
+        ((id, station_id, prediction_date) tuples) for each station, unless a
+        more recent prediction is already referenced (backfills). Does not commit.
+        """
+        latest: Dict[str, Tuple[int, datetime]] = {}
+        for prediction_id, s_id, day in predictions:
+            if s_id not in latest or day >= latest[s_id][1]:
+                latest[s_id] = (prediction_id, day)
+        if not latest:
+            return
+
+        now = datetime.now()
+        rows = [
+            {
+                "station_id": s_id,
+                "prediction_id": prediction_id,
+                "prediction_date": day,
+                "updated_at": now,
+            }
+            for s_id, (prediction_id, day) in latest.items()
+        ]
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(LatestPrediction)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["station_id"],
+                set_={
+                    c: stmt.excluded[c]
+                    for c in ("prediction_id", "prediction_date", "updated_at")
+                },
+                where=stmt.excluded.prediction_date >= LatestPrediction.prediction_date,
+            )
+            for i in range(0, len(rows), self.batch_size):
+                self.session.execute(stmt, rows[i : i + self.batch_size])
+        else:
+            existing = dict(
+                self.session.query(
+                    LatestPrediction.station_id, LatestPrediction.prediction_date
+                )
+                .filter(LatestPrediction.station_id.in_(list(latest)))
+                .all()
+            )
+            self.session.bulk_insert_mappings(
+                LatestPrediction, [r for r in rows if r["station_id"] not in existing]
+            )
+            self.session.bulk_update_mappings(
+                LatestPrediction,
+                [
+                    r
+                    for r in rows
+                    if r["station_id"] in existing
+                    and r["prediction_date"] >= existing[r["station_id"]]
+                ],
+            )
 
     def add_model_metrics(self, model_metrics: List[Dict[str, Any]]):
         """Add multiples model metrics records to the database"""
@@ -109,13 +475,19 @@ class DatabaseService:
         Retrieves the most recent prediction for a given counter.
         """
         try:
-            result = (
-                self.session.query(Prediction)
-                .filter(Prediction.station_id == station_id)
-                .order_by(Prediction.prediction_date.desc())
+            prediction = (
+                self.read_session.execute(_latest_prediction_lookup_stmt(station_id))
+                .scalars()
                 .first()
             )
-            return result
+            if prediction is None:
+                # Not referenced yet (rows written outside the service, older databases)
+                prediction = (
+                    self.read_session.execute(_latest_prediction_stmt(station_id))
+                    .scalars()
+                    .first()
+                )
+            return prediction
         except SQLAlchemyError as e:
             logger.error(f"Error fetching prediction for counter {station_id}: {e}")
             return None
@@ -124,12 +496,72 @@ class DatabaseService:
 
     def get_all_stations(self) -> List[CounterInfo]:
         """Retrieves all active stations from the database."""
-        return self.session.query(CounterInfo).all()
+        return self.read_session.query(CounterInfo).all()
 
     def get_weather_for_date(self, target_date: datetime) -> Optional[Weather]:
         """Retrieves weather forecast/data for a specific date."""
         # Assuming date is stored at midnight or date-only format in DB
-        return self.session.query(Weather).filter(Weather.date == target_date).first()
+        return (
+            self.read_session.query(Weather).filter(Weather.date == target_date).first()
+        )
+
+    def get_latest_weather(self, target_date: datetime) -> Optional[Weather]:
+        """
+        Retrieves the most recent weather row up to `target_date`: the stored
+        J0 forecast if any, else the last known day. Fallback of the
+        prediction pipeline when the weather API cannot be reached.
+        """
+        try:
+            return (
+                self.read_session.query(Weather)
+                .filter(Weather.date <= target_date)
+                .order_by(Weather.date.desc())
+                .first()
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching latest weather: {e}")
+            return None
+
+    def get_cell_weather(
+        self,
+        cells: Sequence[Tuple[float, float]],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> pd.DataFrame:
+        """
+        Stored weather history of the given grid cells between two dates.
+
+        Returns:
+            pd.DataFrame: cell_lat, cell_lon, date, avg_temp, precipitation_mm,
+            vent_max (empty if nothing is stored or on error).
+        """
+        columns = list(CellWeather.__table__.columns)
+        names = [c.name for c in columns]
+        cells = set(cells)
+        if not cells:
+            return pd.DataFrame(columns=names)
+
+        # Bounding filter in SQL, exact cells in pandas
+        filters = [
+            CellWeather.cell_lat.in_({lat for lat, _ in cells}),
+            CellWeather.cell_lon.in_({lon for _, lon in cells}),
+        ]
+        if start_date is not None:
+            filters.append(CellWeather.date >= start_date)
+        if end_date is not None:
+            filters.append(CellWeather.date <= end_date)
+        try:
+            rows = self.read_session.execute(select(*columns).where(*filters)).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching cell weather: {e}")
+            return pd.DataFrame(columns=names)
+
+        frame = pd.DataFrame.from_records(rows, columns=names)
+        frame["date"] = pd.to_datetime(frame["date"])
+        keep = pd.MultiIndex.from_arrays(
+            [frame["cell_lat"], frame["cell_lon"]]
+        ).isin(list(cells))
+        return frame[keep].reset_index(drop=True)
 
     def get_bike_count(self, station_id: str, target_date: datetime) -> Optional[int]:
         """
@@ -137,50 +569,164 @@ class DatabaseService:
         Used to reconstruct Lags (J-1, J-7) for prediction.
         """
         result = (
-            self.session.query(BikeCount.intensity)
+            self.read_session.query(BikeCount.intensity)
             .filter(BikeCount.station_id == station_id)
             .filter(BikeCount.date == target_date)
             .first()
         )
         return result[0] if result else None
 
-    def get_most_recent_bike_count(self, station_id: str) -> Optional[BikeCount]:
-        """Retrieves the most recent bike count record for a station."""
+    def get_most_recent_bike_count(
+        self, station_id: str, lookback_days: Optional[int] = LAST_VALUE_LOOKBACK_DAYS
+    ) -> Optional[BikeCount]:
+        """
+        Retrieves the most recent bike count record for a station within the
+        last `lookback_days` days (None = no limit).
+        """
         try:
-            return (
-                self.session.query(BikeCount)
-                .filter(BikeCount.station_id == station_id)
-                .order_by(BikeCount.date.desc())
-                .first()
+            query = self.read_session.query(BikeCount).filter(
+                BikeCount.station_id == station_id
             )
+            if lookback_days is not None:
+                query = query.filter(
+                    BikeCount.date >= datetime.now() - timedelta(days=lookback_days)
+                )
+            return query.order_by(BikeCount.date.desc()).first()
         except SQLAlchemyError as e:
             logger.error(f"Error fetching most recent count for {station_id}: {e}")
             return None
 
+    def get_lag_matrix(
+        self,
+        station_ids: List[str],
+        reference_date: datetime,
+        lags: Sequence[int] = (1, 7),
+        lookback_days: Optional[int] = LAST_VALUE_LOOKBACK_DAYS,
+    ) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        Retrieves every requested lag for a set of stations in a single query.
+
+        For each station, the result maps "lag_<k>" to the intensity recorded
+        k days before `reference_date` (None if missing), and "last_value" to
+        the most recent known intensity within `lookback_days` before
+        `reference_date`. The last-value lookup is a second query, only issued
+        when at least one station has a missing lag.
+
+        Returns:
+            Dict[str, Dict[str, Optional[int]]]: {station_id: {"lag_1": ..., "last_value": ...}}
+        """
+        if not station_ids:
+            return {}
+
+        lag_dates = {reference_date - timedelta(days=lag): lag for lag in lags}
+        matrix = {
+            s_id: {**{f"lag_{lag}": None for lag in lags}, "last_value": None}
+            for s_id in station_ids
+        }
+
+        try:
+            # 1. All lags for all stations at once
+            rows = (
+                self.read_session.query(
+                    BikeCount.station_id, BikeCount.date, BikeCount.intensity
+                )
+                .filter(BikeCount.station_id.in_(station_ids))
+                .filter(BikeCount.date.in_(list(lag_dates)))
+                .all()
+            )
+            for r in rows:
+                lag = lag_dates.get(r.date)
+                if lag is not None and r.station_id in matrix:
+                    matrix[r.station_id][f"lag_{lag}"] = r.intensity
+
+            # 2. Last known value, only for stations with at least one missing lag
+            incomplete = [
+                s_id
+                for s_id, values in matrix.items()
+                if any(values[f"lag_{lag}"] is None for lag in lags)
+            ]
+            if incomplete:
+                # Both sides are bounded by date so that only recent partitions are read
+                window = [BikeCount.date <= reference_date]
+                if lookback_days is not None:
+                    window.append(
+                        BikeCount.date >= reference_date - timedelta(days=lookback_days)
+                    )
+                latest = (
+                    self.read_session.query(
+                        BikeCount.station_id, func.max(BikeCount.date).label("max_date")
+                    )
+                    .filter(BikeCount.station_id.in_(incomplete), *window)
+                    .group_by(BikeCount.station_id)
+                    .subquery()
+                )
+                last_rows = (
+                    self.read_session.query(BikeCount.station_id, BikeCount.intensity)
+                    .join(
+                        latest,
+                        (BikeCount.station_id == latest.c.station_id)
+                        & (BikeCount.date == latest.c.max_date),
+                    )
+                    .filter(*window)
+                    .all()
+                )
+                for r in last_rows:
+                    matrix[r.station_id]["last_value"] = r.intensity
+
+            return matrix
+
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching lag matrix: {e}")
+            return {}
+
     def save_prediction_single_with_context(
         self, pred_data: Dict, features_data: Dict
     ) -> bool:
         """
-        Saves ONE prediction AND its associated JSON context in a single transaction.
+        Saves ONE prediction AND its associated feature context in a single transaction.
         Uses .flush() to retrieve the generated prediction ID before creating the context entry.
+        If a prediction already exists for this station and date (replay), it is
+        updated and its context replaced.
         """
         try:
-            # 1. Create Prediction Object
-            prediction = Prediction(**pred_data)
-            self.session.add(prediction)
+            # 1. Create or update Prediction Object
+            prediction = (
+                self.session.query(Prediction)
+                .filter(Prediction.station_id == pred_data["station_id"])
+                .filter(Prediction.prediction_date == pred_data["prediction_date"])
+                .first()
+            )
+            if prediction is None:
+                prediction = Prediction(**pred_data)
+                self.session.add(prediction)
+            else:
+                for key, value in pred_data.items():
+                    setattr(prediction, key, value)
 
             # 2. Flush: Send to DB to generate prediction.id (transaction remains open)
             self.session.flush()
+            self._refresh_latest_predictions(
+                [(prediction.id, prediction.station_id, prediction.prediction_date)]
+            )
+            self._ensure_partitions(FeaturesData, [pred_data["prediction_date"]])
 
-            # 3. Create linked FeaturesData Object
-            features = FeaturesData(
-                prediction_id=prediction.id,  # The Foreign Key is now available
-                station_id=pred_data["station_id"],
-                date=pred_data["prediction_date"],
-                features=features_data,  # SQLAlchemy automatically handles Dict -> JSON conversion
-                target_intensity=None,
+            # 3. Create (or refresh) linked FeaturesData Object
+            context = self._add_features_context(
+                pred_data["prediction_date"], [features_data]
             )
-            self.session.add(features)
+            features = prediction.training_data
+            if features is None:
+                features = FeaturesData(
+                    prediction_id=prediction.id,  # The Foreign Key is now available
+                    station_id=pred_data["station_id"],
+                    date=pred_data["prediction_date"],
+                    target_intensity=None,
+                )
+                self.session.add(features)
+            features.context = context
+            features.vector = encode_vector(features_data, context.vector_columns)
+            self.session.flush()
+            self._delete_orphan_contexts([pred_data["prediction_date"]])
 
             # 4. Final Commit (Both rows saved together)
             self.session.commit()
@@ -193,6 +739,190 @@ class DatabaseService:
             )
             return False
 
+    def save_predictions_batch_with_context(
+        self, records: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> bool:
+        """
+        Saves a whole run of predictions AND their feature contexts in a single transaction.
+
+        `records` is a list of (pred_data, features_data) pairs. Predictions are
+        upserted in bulk and their ids retrieved with RETURNING (or one SELECT on
+        dialects without it). Features identical for all stations of a day are
+        stored once in features_context, the others as one float32 vector per
+        station, bulk-inserted and replacing those of replayed predictions.
+        Commits once: either the whole run is saved, or nothing.
+        """
+        if not records:
+            logger.info("No predictions provided. Skipping.")
+            return True
+
+        # Last record wins for a given (station, date), as in the bulk upsert
+        by_key = {
+            (pred["station_id"], pred["prediction_date"]): (pred, features)
+            for pred, features in records
+        }
+        predictions = [pred for pred, _ in by_key.values()]
+        dialect = self.session.get_bind().dialect.name
+
+        try:
+            # 1. Upsert all predictions and collect their ids
+            ids: Dict[tuple, int] = {}
+            if dialect in ("postgresql", "sqlite"):
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                for i in range(0, len(predictions), self.batch_size):
+                    stmt = insert(Prediction)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["station_id", "prediction_date"],
+                        set_={
+                            "prediction_value": stmt.excluded.prediction_value,
+                            "model_version": stmt.excluded.model_version,
+                        },
+                    ).returning(
+                        Prediction.id, Prediction.station_id, Prediction.prediction_date
+                    )
+                    result = self.session.execute(
+                        stmt, predictions[i : i + self.batch_size]
+                    )
+                    ids.update({(r[1], r[2]): r[0] for r in result})
+            else:
+                for i in range(0, len(predictions), self.batch_size):
+                    self._upsert_fallback(
+                        Prediction,
+                        predictions[i : i + self.batch_size],
+                        ["station_id", "prediction_date"],
+                    )
+                rows = (
+                    self.session.query(
+                        Prediction.id, Prediction.station_id, Prediction.prediction_date
+                    )
+                    .filter(Prediction.station_id.in_({k[0] for k in by_key}))
+                    .filter(Prediction.prediction_date.in_({k[1] for k in by_key}))
+                    .all()
+                )
+                ids.update({(r[1], r[2]): r[0] for r in rows})
+
+            self._refresh_latest_predictions(
+                [(ids[key], key[0], key[1]) for key in by_key]
+            )
+
+            # 2. Replace the contexts of these predictions in bulk
+            self._ensure_partitions(FeaturesData, [key[1] for key in by_key])
+            prediction_ids = [ids[key] for key in by_key]
+            for i in range(0, len(prediction_ids), self.batch_size):
+                self.session.query(FeaturesData).filter(
+                    FeaturesData.prediction_id.in_(
+                        prediction_ids[i : i + self.batch_size]
+                    )
+                ).delete(synchronize_session=False)
+
+            by_day: Dict[datetime, List[tuple]] = defaultdict(list)
+            for key, (pred, features) in by_key.items():
+                by_day[pred["prediction_date"]].append((key, features))
+
+            feature_rows = []
+            for day, items in by_day.items():
+                context = self._add_features_context(day, [f for _, f in items])
+                feature_rows += [
+                    {
+                        "prediction_id": ids[key],
+                        "station_id": key[0],
+                        "date": day,
+                        "context_id": context.id,
+                        "vector": encode_vector(features, context.vector_columns),
+                        "target_intensity": None,
+                    }
+                    for key, features in items
+                ]
+            self.session.bulk_insert_mappings(FeaturesData, feature_rows)
+            self._delete_orphan_contexts(list(by_day))
+
+            # 3. Single commit for the whole run
+            self.session.commit()
+            logger.info(f"Saved {len(by_key)} predictions with their context.")
+            return True
+
+        except (SQLAlchemyError, KeyError, ValueError, TypeError) as e:
+            self.session.rollback()
+            logger.error(f"Batch prediction transaction failed: {e}")
+            return False
+
+    def _add_features_context(
+        self, day: datetime, records: List[Dict[str, Any]]
+    ) -> FeaturesContext:
+        """Stores the features shared by `records` (one prediction day). Flushes to get the id."""
+        shared, vector_columns = split_features(records)
+        context = FeaturesContext(
+            date=day, shared=shared, vector_columns=vector_columns
+        )
+        self.session.add(context)
+        self.session.flush()
+        return context
+
+    def _delete_orphan_contexts(self, days: List[datetime]) -> None:
+        """Removes the contexts of `days` no longer used (replaced by a replay)."""
+        self.session.execute(
+            delete(FeaturesContext)
+            .where(FeaturesContext.date.in_(days))
+            .where(~exists().where(FeaturesData.context_id == FeaturesContext.id))
+            .where(
+                ~exists().where(FeaturesDataArchive.context_id == FeaturesContext.id)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def load_features_frame(
+        self, start_date: datetime, end_date: datetime, include_archive: bool = False
+    ) -> pd.DataFrame:
+        """
+        Rebuilds the features used by the predictions of [start_date, end_date].
+
+        Vectors sharing a context are decoded together with np.frombuffer and
+        the shared values broadcast as constant columns; no JSON is parsed per row.
+        With `include_archive`, archived rows are included (lineage audits).
+
+        Returns:
+            pd.DataFrame: one row per prediction (prediction_id, station_id, date,
+            target_intensity and one column per feature).
+        """
+        meta_columns = ["prediction_id", "station_id", "date", "target_intensity"]
+        tables = [FeaturesData.__table__]
+        if include_archive:
+            tables.append(FeaturesDataArchive.__table__)
+
+        by_context: Dict[int, list] = defaultdict(list)
+        for table in tables:
+            stmt = select(
+                *[table.c[c] for c in meta_columns], table.c.context_id, table.c.vector
+            ).where(table.c.date >= start_date, table.c.date <= end_date)
+            for row in self.read_session.execute(stmt):
+                by_context[row.context_id].append(row)
+        if not by_context:
+            return pd.DataFrame(columns=meta_columns)
+
+        contexts = (
+            self.read_session.query(FeaturesContext)
+            .filter(FeaturesContext.id.in_(list(by_context)))
+            .all()
+        )
+        frames = []
+        for context in contexts:
+            rows = by_context[context.id]
+            frame = pd.DataFrame(
+                decode_matrix([r.vector for r in rows], len(context.vector_columns)),
+                columns=context.vector_columns,
+            )
+            for i, column in enumerate(meta_columns):
+                frame.insert(i, column, [r[i] for r in rows])
+            for column, value in context.shared.items():
+                frame[column] = value
+            frames.append(frame)
+
+        return (
+            pd.concat(frames, ignore_index=True)
+            .sort_values(["date", "station_id"])
+            .reset_index(drop=True)
+        )
+
     # --- Monitoring ---#
 
     def get_predictions_by_date(self, target_date: datetime) -> List[Prediction]:
@@ -201,7 +931,7 @@ class DatabaseService:
         """
         # Filter by date
         return (
-            self.session.query(Prediction)
+            self.read_session.query(Prediction)
             .filter(Prediction.prediction_date == target_date)
             .all()
         )
@@ -211,85 +941,588 @@ class DatabaseService:
         Retrieves actual counts for a given date.
         Useful for monitoring (the reality on the ground).
         """
-        return self.session.query(BikeCount).filter(BikeCount.date == target_date).all()
+        return (
+            self.read_session.query(BikeCount)
+            .filter(BikeCount.date == target_date)
+            .all()
+        )
 
-    def get_dashboard_stats(self, station_id: str) -> Dict[str, Any]:
+    # --- Ingestion watermarks ---#
+
+    def get_ingestion_watermarks(
+        self, station_ids: Optional[List[str]] = None
+    ) -> Dict[str, datetime]:
         """
-        Retrieves and aggregates all statistics for the frontend dashboard.
+        Retrieves the last ingested day of each station.
+
+        Stations without a watermark (databases filled before watermarks
+        existed) fall back to their most recent bike count. Read on the
+        primary: a stale replica would trigger needless downloads.
         """
-        today = datetime.now().date()
+        query = self.session.query(
+            IngestionWatermark.station_id, IngestionWatermark.last_ingested_date
+        )
+        if station_ids is not None:
+            query = query.filter(IngestionWatermark.station_id.in_(station_ids))
+        marks = dict(query.all())
 
-        # 30-day history (BikeCount)
-        start_30d = today - timedelta(days=30)
-        rows_30d = (
-            self.session.query(BikeCount.date, BikeCount.intensity)
-            .filter(BikeCount.station_id == station_id)
-            .filter(BikeCount.date >= start_30d)
-            .order_by(BikeCount.date.asc())
-            .all()
+        missing = None if station_ids is None else set(station_ids) - set(marks)
+        if missing is None or missing:
+            fallback = self.session.query(
+                BikeCount.station_id, func.max(BikeCount.date)
+            )
+            if missing is not None:
+                fallback = fallback.filter(BikeCount.station_id.in_(missing))
+            for s_id, last_date in fallback.group_by(BikeCount.station_id).all():
+                marks.setdefault(s_id, last_date)
+        return marks
+
+    def update_ingestion_watermarks(self, last_dates: Dict[str, datetime]) -> bool:
+        """
+        Advances the watermarks to `last_dates` ({station_id: last day stored}).
+        A watermark never moves back (backfills of older days). Does not commit.
+        """
+        if not last_dates:
+            return True
+        try:
+            current = dict(
+                self.session.query(
+                    IngestionWatermark.station_id,
+                    IngestionWatermark.last_ingested_date,
+                )
+                .filter(IngestionWatermark.station_id.in_(list(last_dates)))
+                .all()
+            )
+            now = datetime.now()
+            rows = [
+                {
+                    "station_id": s_id,
+                    "last_ingested_date": max(day, current.get(s_id, day)),
+                    "updated_at": now,
+                }
+                for s_id, day in last_dates.items()
+            ]
+            return self._bulk_upsert(IngestionWatermark, rows, ["station_id"])
+        except SQLAlchemyError as e:
+            logger.error(f"Error updating ingestion watermarks: {e}")
+            return False
+
+    # --- Rollups ---#
+
+    def update_rollups(
+        self,
+        station_ids: List[str],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> bool:
+        """
+        Incrementally refreshes the rollup tables for the given stations.
+
+        Only the weeks overlapping [start_date, end_date] are recomputed for the
+        weekly totals (all weeks if no range is given). The weekday profiles and
+        rolling 30/90-day stats are recomputed from the last 90 days of each
+        station. Rows are rebuilt from bike_count, so re-running is idempotent.
+        Does not commit: the caller owns the transaction.
+        """
+        if not station_ids:
+            return True
+
+        try:
+            # The latest count of a station is at least start_date once rows of
+            # [start_date, end_date] were written: bounding prunes older partitions
+            latest_query = self.session.query(
+                BikeCount.station_id, func.max(BikeCount.date)
+            ).filter(BikeCount.station_id.in_(station_ids))
+            if start_date is not None:
+                latest_query = latest_query.filter(BikeCount.date >= start_date)
+            latest_dates = dict(latest_query.group_by(BikeCount.station_id).all())
+            if not latest_dates:
+                return True
+
+            # Lower bound covering both the affected weeks and the 90-day windows
+            window_start = min(latest_dates.values()) - timedelta(days=89)
+            week_lower = _week_start(start_date.date()) if start_date else None
+            week_upper = (
+                _week_start(end_date.date()) + timedelta(days=7) if end_date else None
+            )
+
+            query = self.session.query(
+                BikeCount.station_id, BikeCount.date, BikeCount.intensity
+            ).filter(BikeCount.station_id.in_(list(latest_dates)))
+            if week_lower is not None:
+                query = query.filter(BikeCount.date >= min(week_lower, window_start))
+            rows = query.all()
+
+            weekly: Dict[tuple, List[int]] = {}
+            profiles: Dict[tuple, List[int]] = {}
+            rolling: Dict[str, Dict[str, int]] = {
+                s_id: {"total_30d": 0, "days_30d": 0, "total_90d": 0, "days_90d": 0}
+                for s_id in latest_dates
+            }
+
+            for r in rows:
+                # Weekly totals, limited to the affected weeks
+                in_range = (week_lower is None or r.date >= week_lower) and (
+                    week_upper is None or r.date < week_upper
+                )
+                if in_range:
+                    key = (r.station_id, _week_start(r.date.date()))
+                    total = weekly.setdefault(key, [0, 0])
+                    total[0] += r.intensity
+                    total[1] += 1
+
+                # Weekday profile and rolling stats, relative to the latest count
+                days_ago = (latest_dates[r.station_id] - r.date).days
+                if 0 <= days_ago < 90:
+                    profile = profiles.setdefault(
+                        (r.station_id, r.date.weekday()), [0, 0]
+                    )
+                    profile[0] += r.intensity
+                    profile[1] += 1
+
+                    stats = rolling[r.station_id]
+                    stats["total_90d"] += r.intensity
+                    stats["days_90d"] += 1
+                    if days_ago < 30:
+                        stats["total_30d"] += r.intensity
+                        stats["days_30d"] += 1
+
+            ids = list(latest_dates)
+            now = datetime.now()
+
+            # Replace the affected rollup rows
+            weekly_delete = self.session.query(StationWeeklyTotal).filter(
+                StationWeeklyTotal.station_id.in_(ids)
+            )
+            if week_lower is not None:
+                weekly_delete = weekly_delete.filter(
+                    StationWeeklyTotal.week_start >= week_lower
+                )
+            if week_upper is not None:
+                weekly_delete = weekly_delete.filter(
+                    StationWeeklyTotal.week_start < week_upper
+                )
+            weekly_delete.delete(synchronize_session=False)
+            self.session.query(StationWeekdayProfile).filter(
+                StationWeekdayProfile.station_id.in_(ids)
+            ).delete(synchronize_session=False)
+            self.session.query(StationRollingStats).filter(
+                StationRollingStats.station_id.in_(ids)
+            ).delete(synchronize_session=False)
+
+            self.session.bulk_insert_mappings(
+                StationWeeklyTotal,
+                [
+                    {
+                        "station_id": s_id,
+                        "week_start": week,
+                        "total_intensity": total,
+                        "days_count": count,
+                        "updated_at": now,
+                    }
+                    for (s_id, week), (total, count) in weekly.items()
+                ],
+            )
+            self.session.bulk_insert_mappings(
+                StationWeekdayProfile,
+                [
+                    {
+                        "station_id": s_id,
+                        "weekday": wd,
+                        "avg_intensity": total / count,
+                        "days_count": count,
+                        "updated_at": now,
+                    }
+                    for (s_id, wd), (total, count) in profiles.items()
+                ],
+            )
+            self.session.bulk_insert_mappings(
+                StationRollingStats,
+                [
+                    {
+                        "station_id": s_id,
+                        "as_of_date": latest_dates[s_id],
+                        **stats,
+                        "mean_30d": (
+                            stats["total_30d"] / stats["days_30d"]
+                            if stats["days_30d"]
+                            else None
+                        ),
+                        "mean_90d": (
+                            stats["total_90d"] / stats["days_90d"]
+                            if stats["days_90d"]
+                            else None
+                        ),
+                        "updated_at": now,
+                    }
+                    for s_id, stats in rolling.items()
+                ],
+            )
+            logger.info(
+                f"Rollups refreshed for {len(ids)} stations ({len(weekly)} weeks)."
+            )
+            return True
+
+        except SQLAlchemyError as e:
+            logger.error(f"Error refreshing rollups: {e}")
+            return False
+
+    def get_rollup_gaps(self) -> List[str]:
+        """
+        Stations whose rollups do not cover their counts: no rolling stats
+        row, stats older than the latest count, or fewer days in the weekly
+        totals than counted days.
+        """
+        counts = (
+            select(
+                BikeCount.station_id,
+                func.count().label("days"),
+                func.max(BikeCount.date).label("last_date"),
+            )
+            .group_by(BikeCount.station_id)
+            .subquery()
         )
-        # We just extract the intensities.
-        # Note: If days are missing, the graph will be short; ideally, the gaps should be filled in.
-        history_30_days = [r.intensity for r in rows_30d]
-
-        # 7-day accuracy (Actual vs. Forecast comparison)
-        start_7d = today - timedelta(days=7)
-
-        # Past predictions
-        preds_7d = (
-            self.session.query(Prediction.prediction_date, Prediction.prediction_value)
-            .filter(Prediction.station_id == station_id)
-            .filter(Prediction.prediction_date >= start_7d)
-            .filter(Prediction.prediction_date < today)  # Strictly before today
-            .all()
+        weekly = (
+            select(
+                StationWeeklyTotal.station_id,
+                func.sum(StationWeeklyTotal.days_count).label("days"),
+            )
+            .group_by(StationWeeklyTotal.station_id)
+            .subquery()
         )
-        # Real past
-        reals_7d = (
-            self.session.query(BikeCount.date, BikeCount.intensity)
-            .filter(BikeCount.station_id == station_id)
-            .filter(BikeCount.date >= start_7d)
-            .filter(BikeCount.date < today)
-            .all()
+        stmt = (
+            select(counts.c.station_id)
+            .outerjoin(
+                StationRollingStats,
+                StationRollingStats.station_id == counts.c.station_id,
+            )
+            .outerjoin(weekly, weekly.c.station_id == counts.c.station_id)
+            .where(
+                or_(
+                    StationRollingStats.station_id.is_(None),
+                    StationRollingStats.as_of_date < counts.c.last_date,
+                    func.coalesce(weekly.c.days, 0) < counts.c.days,
+                )
+            )
+            .order_by(counts.c.station_id)
         )
+        return list(self.session.execute(stmt).scalars())
 
-        # Alignment via dictionary (Date -> Value)
-        # We use .date() to ensure that we are comparing days, not hours.
-        dict_pred = {p.prediction_date.date(): p.prediction_value for p in preds_7d}
-        dict_real = {r.date.date(): r.intensity for r in reals_7d}
+    def backfill_rollups(self) -> bool:
+        """
+        Full rebuild of the rollups of the stations they do not cover
+        (database filled before the rollup tables existed, stations without
+        new counts since). Nothing is rebuilt when the rollups are complete.
+        Does not commit.
+        """
+        try:
+            gaps = self.get_rollup_gaps()
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking the rollups coverage: {e}")
+            return False
+        if not gaps:
+            return True
+        logger.info(f"Rollups incomplete for {len(gaps)} stations: rebuilding...")
+        return self.update_rollups(gaps)
 
-        dates_last_7 = [start_7d + timedelta(days=i) for i in range(7)]
-        acc_real = [dict_real.get(d, 0) for d in dates_last_7]
-        acc_pred = [dict_pred.get(d, 0) for d in dates_last_7]
+    # --- Training data ---#
 
-        # Averages per day of the week (Weekly Profile)
-        # We take a broad historical view (90 days)
-        start_90d = today - timedelta(days=90)
-        rows_90d = (
-            self.session.query(BikeCount.date, BikeCount.intensity)
-            .filter(BikeCount.station_id == station_id)
-            .filter(BikeCount.date >= start_90d)
-            .all()
+    def iter_training_data(
+        self,
+        chunk_size: int = TRAINING_CHUNK_SIZE,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streams the training dataset in (station_id, date)-ordered chunks.
+
+        Counts are joined with the weather of the day (inner join) and the
+        station coordinates (left join) in SQL, and read through a server-side
+        cursor: only `chunk_size` rows are held in memory at a time. Each chunk
+        has the TRAINING_DTYPES and a categorical station_id sharing the same
+        categories, so chunks can be concatenated without dtype upcasts.
+        """
+        bounds = []
+        if start_date is not None:
+            bounds.append(BikeCount.date >= start_date)
+        if end_date is not None:
+            bounds.append(BikeCount.date <= end_date)
+
+        # Categories known up front (index-only scan)
+        station_ids = self.read_session.execute(
+            select(BikeCount.station_id)
+            .where(*bounds)
+            .distinct()
+            .order_by(BikeCount.station_id)
+        ).scalars()
+        station_dtype = pd.CategoricalDtype(list(station_ids))
+
+        stmt = (
+            select(
+                BikeCount.station_id,
+                BikeCount.date,
+                BikeCount.intensity,
+                Weather.avg_temp,
+                Weather.precipitation_mm,
+                Weather.vent_max,
+                CounterInfo.latitude,
+                CounterInfo.longitude,
+            )
+            .join(Weather, Weather.date == BikeCount.date)
+            .outerjoin(CounterInfo, CounterInfo.station_id == BikeCount.station_id)
+            .where(*bounds)
+            .order_by(BikeCount.station_id, BikeCount.date)
+            .execution_options(yield_per=chunk_size)
         )
+        result = self.read_session.execute(stmt)
+        columns = list(result.keys())
+        for rows in result.partitions():
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            chunk["station_id"] = chunk["station_id"].astype(station_dtype)
+            chunk["date"] = pd.to_datetime(chunk["date"])
+            yield chunk.astype(TRAINING_DTYPES)
 
-        week_sums = [0] * 7
-        week_counts = [0] * 7
+    def load_training_frame(
+        self,
+        chunk_size: int = TRAINING_CHUNK_SIZE,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> pd.DataFrame:
+        """Reads the whole training dataset with iter_training_data (compact dtypes)."""
+        chunks = list(self.iter_training_data(chunk_size, start_date, end_date))
+        if not chunks:
+            return pd.DataFrame()
+        frame = pd.concat(chunks, ignore_index=True)
+        logger.info(
+            f"Training data loaded: {len(frame)} rows in {len(chunks)} chunks "
+            f"({frame.memory_usage(deep=True).sum() / 1e6:.1f} MB)."
+        )
+        return frame
 
-        for r in rows_90d:
-            wd = r.date.weekday()  # 0=Monday, 6=Sunday
-            week_sums[wd] += r.intensity
-            week_counts[wd] += 1
+    # --- Feature store ---#
 
-        weekly_averages = [
-            int(s / c) if c > 0 else 0 for s, c in zip(week_sums, week_counts)
+    def upsert_station_features(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Writes precomputed feature rows (see features.feature_store), replacing
+        the rows of the same (station_id, date). Does not commit.
+        """
+        now = datetime.now()
+        return self._bulk_upsert(
+            StationFeatures,
+            [{**row, "updated_at": now} for row in rows],
+            ["station_id", "date"],
+        )
+
+    def get_feature_store_gaps(self) -> List[str]:
+        """
+        Stations whose training rows (counts with the weather of the day, as
+        read by load_training_frame) are not all in the feature store: no
+        stored row, fewer labelled rows or a later first day.
+        """
+        counts = (
+            select(
+                BikeCount.station_id,
+                func.count().label("rows"),
+                func.min(BikeCount.date).label("first_date"),
+            )
+            .join(Weather, Weather.date == BikeCount.date)
+            .group_by(BikeCount.station_id)
+            .subquery()
+        )
+        stored = (
+            select(
+                StationFeatures.station_id,
+                func.count().label("rows"),
+                func.min(StationFeatures.date).label("first_date"),
+            )
+            .where(StationFeatures.intensity.is_not(None))
+            .group_by(StationFeatures.station_id)
+            .subquery()
+        )
+        stmt = (
+            select(counts.c.station_id)
+            .outerjoin(stored, stored.c.station_id == counts.c.station_id)
+            .where(
+                or_(
+                    stored.c.station_id.is_(None),
+                    stored.c.rows < counts.c.rows,
+                    stored.c.first_date > counts.c.first_date,
+                )
+            )
+            .order_by(counts.c.station_id)
+        )
+        return list(self.read_session.execute(stmt).scalars())
+
+    def load_station_features(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        labelled: bool = True,
+        chunk_size: int = TRAINING_CHUNK_SIZE,
+    ) -> pd.DataFrame:
+        """
+        Reads the feature store in (station_id, date) order, streamed in
+        chunks of `chunk_size` rows.
+
+        labelled=True returns the training rows (known intensity and lags)
+        with the TRAINING_DTYPES and a categorical station_id, like
+        load_training_frame. labelled=False returns every row as stored, e.g.
+        the rows of the day to predict.
+        """
+        columns = [
+            c for c in StationFeatures.__table__.columns if c.name != "updated_at"
         ]
+        filters = []
+        if start_date is not None:
+            filters.append(StationFeatures.date >= start_date)
+        if end_date is not None:
+            filters.append(StationFeatures.date <= end_date)
+        if labelled:
+            filters += [
+                StationFeatures.intensity.is_not(None),
+                StationFeatures.lag_1.is_not(None),
+                StationFeatures.lag_7.is_not(None),
+            ]
+        stmt = (
+            select(*columns)
+            .where(*filters)
+            .order_by(StationFeatures.station_id, StationFeatures.date)
+            .execution_options(yield_per=chunk_size)
+        )
+        try:
+            result = self.read_session.execute(stmt)
+            names = list(result.keys())
+            chunks = [
+                pd.DataFrame.from_records(rows, columns=names)
+                for rows in result.partitions()
+            ]
+        except SQLAlchemyError as e:
+            logger.error(f"Error reading the feature store: {e}")
+            return pd.DataFrame()
+        if not chunks:
+            return pd.DataFrame(columns=[c.name for c in columns])
 
-        # Weekly Totals (12-week volume)
-        # For now, if there is insufficient historical data, an empty safe list is returned.
-        weekly_totals = [0] * 12
+        frame = pd.concat(chunks, ignore_index=True)
+        frame["date"] = pd.to_datetime(frame["date"])
+        frame["is_holiday"] = frame["is_holiday"].astype(bool)
+        if labelled:
+            frame["station_id"] = frame["station_id"].astype("category")
+            frame = frame.astype(TRAINING_DTYPES)
+        logger.info(f"Feature store read: {len(frame)} rows.")
+        return frame
 
-        return {
-            "history_30_days": history_30_days,
-            "accuracy_7_days": {"real": acc_real, "pred": acc_pred},
-            "weekly_averages": weekly_averages,
-            "weekly_totals": weekly_totals,
-        }
+    # --- Archival ---#
+
+    def archive_features_data(self, older_than: datetime) -> int:
+        """
+        Moves the features_data rows dated before `older_than` to features_data_archive.
+
+        Rows are copied with a single INSERT ... SELECT then removed from the hot
+        table; with monthly partitions, partitions entirely older than
+        `older_than` are dropped instead of deleted row by row. Commits.
+
+        Returns:
+            int: number of archived rows (-1 on error).
+        """
+        source = FeaturesData.__table__
+        columns = [c.name for c in source.columns]
+        cold = source.c.date < older_than
+        try:
+            moved = self.session.execute(
+                insert(FeaturesDataArchive).from_select(
+                    columns + ["archived_at"],
+                    select(*source.c, literal(datetime.now())).where(cold),
+                )
+            ).rowcount
+
+            if is_partitioned(self.session.get_bind()):
+                drop_partitions_before(
+                    self.session.connection(), source.name, older_than
+                )
+            self.session.execute(delete(source).where(cold))
+
+            self.session.commit()
+            logger.info(
+                f"Archived {moved} features_data rows older than {older_than:%Y-%m-%d}."
+            )
+            return moved
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Error archiving features_data: {e}")
+            return -1
+
+    def get_rolling_stats(
+        self, station_ids: List[str]
+    ) -> Dict[str, StationRollingStats]:
+        """Retrieves the precomputed rolling 30/90-day stats, keyed by station."""
+        if not station_ids:
+            return {}
+        rows = (
+            self.read_session.query(StationRollingStats)
+            .filter(StationRollingStats.station_id.in_(station_ids))
+            .all()
+        )
+        return {r.station_id: r for r in rows}
+
+    def get_dashboard_stats(self, station_id: str) -> Dict[str, Any]:
+        """
+        Retrieves and aggregates all statistics for the frontend dashboard.
+
+        Actuals and past predictions are merged and grouped per day in a single
+        query over the last 30 days (bounded by the (station_id, date) indexes).
+        The weekday profile and 12-week totals are read from the rollup tables.
+        """
+        today = datetime.now().date()
+        daily_stmt, profile_stmt, totals_stmt = _dashboard_stmts(station_id, today)
+        return _build_dashboard_stats(
+            self.read_session.execute(daily_stmt).all(),
+            self.read_session.execute(profile_stmt).all(),
+            self.read_session.execute(totals_stmt).all(),
+            today,
+        )
+
+
+class AsyncDatabaseService:
+    """
+    Async counterpart of DatabaseService for the read paths served by the API.
+    Shares its statements with DatabaseService, so both always return the same data.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_latest_prediction_for_counter(
+        self, station_id: str
+    ) -> Optional[Prediction]:
+        """
+        Retrieves the most recent prediction for a given counter.
+        """
+        try:
+            result = await self.session.execute(
+                _latest_prediction_lookup_stmt(station_id)
+            )
+            prediction = result.scalars().first()
+            if prediction is None:
+                # Not referenced yet (rows written outside the service, older databases)
+                result = await self.session.execute(_latest_prediction_stmt(station_id))
+                prediction = result.scalars().first()
+            return prediction
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching prediction for counter {station_id}: {e}")
+            return None
+
+    async def get_all_stations(self) -> List[CounterInfo]:
+        """Retrieves all active stations from the database."""
+        result = await self.session.execute(select(CounterInfo))
+        return list(result.scalars().all())
+
+    async def get_dashboard_stats(self, station_id: str) -> Dict[str, Any]:
+        """
+        Retrieves and aggregates all statistics for the frontend dashboard.
+        """
+        today = datetime.now().date()
+        daily_stmt, profile_stmt, totals_stmt = _dashboard_stmts(station_id, today)
+        daily_rows = (await self.session.execute(daily_stmt)).all()
+        profile_rows = (await self.session.execute(profile_stmt)).all()
+        total_rows = (await self.session.execute(totals_stmt)).all()
+        return _build_dashboard_stats(daily_rows, profile_rows, total_rows, today)
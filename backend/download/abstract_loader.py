@@ -1,7 +1,16 @@
 from abc import ABC, abstractmethod
 
+from download.http_cache import CountingCachedSession, get_cached_session
+
 
 class BaseAPILoader(ABC):
     @abstractmethod
     def fetch_data(self):
         pass
+
+    @staticmethod
+    def cached_session(
+        name: str, expire_after: int = -1, **kwargs
+    ) -> CountingCachedSession:
+        """Shared requests_cache session (CACHE_PATH / name) with hit/miss metrics."""
+        return get_cached_session(name, expire_after=expire_after, **kwargs)
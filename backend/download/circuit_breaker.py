@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import httpx
+from prometheus_client import Counter
+from requests.adapters import BaseAdapter
+
+from utils.logging_config import logger
+
+# Consecutive failures (timeouts, connection errors, 429/5xx) that open the
+# breaker of a host, and delay before a probe request is let through
+API_BREAKER_FAILURES = int(os.getenv("API_BREAKER_FAILURES", "5"))
+API_BREAKER_RESET_SECONDS = float(os.getenv("API_BREAKER_RESET_SECONDS", "60"))
+
+# Budget of a scheduled run, all APIs together (0 = unlimited)
+API_RUN_BUDGET_SECONDS = float(os.getenv("API_RUN_BUDGET_SECONDS", "1200"))
+API_RUN_MAX_REQUESTS = int(os.getenv("API_RUN_MAX_REQUESTS", "0"))
+
+FAILURE_STATUS = {429, 500, 502, 503, 504}
+
+# ----------- Metrics -----------
+api_rejected_requests = Counter(
+    "external_api_rejected_requests_total",
+    "Requests to external APIs rejected before being sent",
+    ["host", "reason"],
+)
+
+
+class ExternalApiUnavailable(Exception):
+    """An external API must not be called anymore during this run."""
+
+
+class CircuitOpenError(ExternalApiUnavailable):
+    pass
+
+
+class BudgetExceededError(ExternalApiUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    closed: requests go through, consecutive failures are counted.
+    open: requests fail immediately (CircuitOpenError) for `reset_timeout` s.
+    half_open: one probe request is let through; its result closes or
+    reopens the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = API_BREAKER_FAILURES,
+        reset_timeout: float = API_BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            if (
+                self.state == "open"
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                self.state = "half_open"
+                logger.info(f"Circuit breaker {self.name}: probing the API.")
+                return
+        api_rejected_requests.labels(host=self.name, reason="circuit_open").inc()
+        raise CircuitOpenError(f"Circuit breaker open for {self.name}")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit breaker {self.name}: closed.")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (
+                self.state == "closed" and self.failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"Circuit breaker {self.name}: open after {self.failures} failures "
+                    f"(retry in {self.reset_timeout:.0f}s)."
+                )
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RequestBudget:
+    """Wall time and number of requests granted to the external APIs."""
+
+    def __init__(self, seconds: float = 0, max_requests: int = 0):
+        self.deadline = time.monotonic() + seconds if seconds > 0 else None
+        self.max_requests = max_requests or None
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def consume(self, host: str) -> None:
+        with self._lock:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                reason = "time budget exhausted"
+            elif self.max_requests is not None and self.requests >= self.max_requests:
+                reason = f"request budget exhausted ({self.max_requests})"
+            else:
+                self.requests += 1
+                return
+        api_rejected_requests.labels(host=host, reason="budget").inc()
+        raise BudgetExceededError(f"{host}: {reason}")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_budget: Optional[RequestBudget] = None
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """Breaker shared by every loader calling `host`."""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+@contextmanager
+def request_budget(
+    seconds: float = API_RUN_BUDGET_SECONDS, max_requests: int = API_RUN_MAX_REQUESTS
+) -> Iterator[RequestBudget]:
+    """Applies a budget to all the API requests sent within the block."""
+    global _budget
+    previous, _budget = _budget, RequestBudget(seconds, max_requests)
+    try:
+        yield _budget
+    finally:
+        _budget = previous
+
+
+def before_request(host: str) -> Optional[float]:
+    """
+    Admission of a request to `host`: raises ExternalApiUnavailable if the
+    run budget is spent or the breaker is open. Returns the seconds left in
+    the budget (None = unlimited), to cap the request timeout.
+    """
+    budget = _budget
+    if budget is not None:
+        budget.consume(host)
+    get_breaker(host).before_request()
+    return budget.remaining_seconds() if budget is not None else None
+
+
+def after_response(host: str, status: Optional[int]) -> None:
+    """Reports the outcome of a request (status None = the request raised)."""
+    if status is None or status in FAILURE_STATUS:
+        get_breaker(host).record_failure()
+    else:
+        get_breaker(host).record_success()
+
+
+def _cap(timeout, remaining: Optional[float]):
+    if remaining is None:
+        return timeout
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+
+class GuardedAdapter(BaseAdapter):
+    """requests adapter applying the breaker and the budget around another one."""
+
+    def __init__(self, inner: BaseAdapter):
+        super().__init__()
+        self.inner = inner
+
+    @property
+    def max_retries(self):
+        return self.inner.max_retries
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        host = urllib.parse.urlsplit(request.url).netloc
+        remaining = before_request(host)
+        # Any exception counts as a failure: a half-open probe is always released
+        status = None
+        try:
+            response = self.inner.send(
+                request, stream, _cap(timeout, remaining), verify, cert, proxies
+            )
+            status = response.status_code
+            return response
+        finally:
+            after_response(host, status)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class GuardedTransport(httpx.AsyncBaseTransport):
+    """httpx transport applying the breaker and the budget around another one."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode()
+        remaining = before_request(host)
+        if remaining is not None:
+            request.extensions["timeout"] = {
+                k: _cap(v, remaining)
+                for k, v in request.extensions.get("timeout", {}).items()
+            }
+        # Any exception (including a cancellation) counts as a failure
+        status = None
+        try:
+            response = await self.inner.handle_async_request(request)
+            status = response.status_code
+            return response
+        finally:
+            after_response(host, status)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
@@ -1,27 +1,35 @@
+import os
 import openmeteo_requests
-import requests_cache
+import pandas as pd
+from download.replay_transport import install_transport
+from download.weather_grid import Cell, CacheLookupHook, fetch_grid_weather
 from retry_requests import retry
-from typing import Any, List
+from typing import Any, Iterable, List, Optional, Union
 import requests
 from utils.logging_config import logger
-from utils.paths import CACHE_PATH
+
+# Variables of the grid forecast, in response order
+GRID_DAILY_VARIABLES = ["temperature_2m_mean", "wind_speed_10m_mean", "precipitation_sum"]
+# Forecasts change during the day: lifetime (s) of a cached cell forecast
+FORECAST_CACHE_TTL = float(os.getenv("WEATHER_FORECAST_TTL", "3600"))
 
 
 class OpenMeteoDailyAPIC:
     """
     A client class to fetch daily weather data from Open-Meteo API.
-    Uses caching and automatic retry on errors.
+    Uses automatic retry on errors; forecasts are cached per grid cell
+    (see get_grid_weather).
     """
 
     def __init__(self) -> None:
         """
-        Initialize the API client with cache and retry configuration.
+        Initialize the API client with retry configuration.
         """
         try:
-            cache_session = requests_cache.CachedSession(
-                CACHE_PATH / ".cache_daily", expire_after=3600
+            # retry() mounts its own adapters: put the fixture transport back on top
+            self.session = install_transport(
+                retry(requests.Session(), retries=5, backoff_factor=0.2)
             )
-            self.session = retry(cache_session, retries=5, backoff_factor=0.2)
             self.client = openmeteo_requests.Client(session=self.session)
         except Exception as e:
             logger.error(f"Failed to initialize Open-Meteo client: {e}")
@@ -29,8 +37,8 @@ class OpenMeteoDailyAPIC:
 
     def get_weather_json(
         self,
-        latitude: float,
-        longitude: float,
+        latitude: Union[float, List[float]],
+        longitude: Union[float, List[float]],
         start_date: str,
         end_date: str,
         daily_variables: List[str] = [
@@ -44,8 +52,9 @@ class OpenMeteoDailyAPIC:
         Fetch daily weather data from Open-Meteo API for the given coordinates and date range.
 
         Args:
-            latitude (float): Latitude of the location.
-            longitude (float): Longitude of the location.
+            latitude (float | List[float]): Latitude of the location, or of
+                several locations (one batched request, one response each).
+            longitude (float | List[float]): Longitude of the location(s).
             start_date (str): Start date in YYYY-MM-DD format.
             end_date (str): End date in YYYY-MM-DD format.
             daily_variables (List[str], optional): List of daily variables to fetch.
@@ -95,3 +104,76 @@ class OpenMeteoDailyAPIC:
         except Exception as e:
             logger.error(f"An unexpected error occurred: {e}")
             raise
+
+    def get_grid_weather(
+        self,
+        cells: Iterable[Cell],
+        start_date: str,
+        end_date: str,
+        timezone: str = "Europe/Paris",
+        on_lookup: Optional[CacheLookupHook] = None,
+    ) -> pd.DataFrame:
+        """
+        Daily forecast of several grid cells (see `download.weather_grid`),
+        served from the per-cell cache (FORECAST_CACHE_TTL) or fetched in one
+        batched request. `on_lookup` is called with the cache result of each
+        cell.
+
+        Returns:
+            pd.DataFrame: cell_lat, cell_lon, date, avg_temp, precipitation_mm, vent_max.
+        """
+
+        def fetch_batch(batch: List[Cell], start: str, end: str) -> pd.DataFrame:
+            responses = self.get_weather_json(
+                latitude=[lat for lat, _ in batch],
+                longitude=[lon for _, lon in batch],
+                start_date=start,
+                end_date=end,
+                daily_variables=GRID_DAILY_VARIABLES,
+                timezone=timezone,
+            )
+            # One response per location, in request order
+            return pd.concat(
+                [
+                    daily_response_to_frame(response).assign(
+                        cell_lat=cell[0], cell_lon=cell[1]
+                    )
+                    for cell, response in zip(batch, responses)
+                ],
+                ignore_index=True,
+            )
+
+        # Daily values depend on the timezone: one cache entry per timezone
+        return fetch_grid_weather(
+            fetch_batch,
+            f"forecast:{timezone}",
+            cells,
+            start_date,
+            end_date,
+            expire_after=FORECAST_CACHE_TTL,
+            on_lookup=on_lookup,
+        )
+
+
+def daily_response_to_frame(response: Any) -> pd.DataFrame:
+    """
+    Daily values of one Open-Meteo SDK response (GRID_DAILY_VARIABLES order),
+    dated by local day.
+    """
+    daily = response.Daily()
+    # Time() is the local midnight in UTC seconds: shift back to the local day
+    offset = response.UtcOffsetSeconds()
+    dates = pd.date_range(
+        start=pd.to_datetime(daily.Time() + offset, unit="s"),
+        end=pd.to_datetime(daily.TimeEnd() + offset, unit="s"),
+        freq=pd.Timedelta(seconds=daily.Interval()),
+        inclusive="left",
+    )
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "avg_temp": daily.Variables(0).ValuesAsNumpy(),
+            "vent_max": daily.Variables(1).ValuesAsNumpy(),
+            "precipitation_mm": daily.Variables(2).ValuesAsNumpy(),
+        }
+    )
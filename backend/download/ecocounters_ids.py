@@ -1,5 +1,5 @@
 from download.abstract_loader import BaseAPILoader
-import requests
+import os
 import time
 from requests.exceptions import HTTPError, Timeout, ConnectionError, RequestException
 from utils.logging_config import logger
@@ -7,6 +7,9 @@ from typing import Optional, Any, Dict
 
 base_url = "https://portail-api-data.montpellier3m.fr/ecocounter"
 
+# Station metadata rarely changes: short TTL, then revalidated with ETag/Last-Modified
+ECOCOUNTER_METADATA_TTL = int(os.getenv("ECOCOUNTER_METADATA_TTL", "600"))
+
 
 class EncountersIDsLoader(BaseAPILoader):
     """
@@ -16,6 +19,11 @@ class EncountersIDsLoader(BaseAPILoader):
     Inherits from BaseAPILoader and implements the abstract method `fetch_data`.
     """
 
+    def __init__(self, expire_after: int = ECOCOUNTER_METADATA_TTL):
+        self.session = self.cached_session(
+            ".cache_ecocounter", expire_after=expire_after
+        )
+
     def fetch_data(
         self, limit: int = 1000, timeout: int = 10, retries: int = 3
     ) -> Optional[Dict[str, Any]]:
@@ -40,7 +48,7 @@ class EncountersIDsLoader(BaseAPILoader):
         for attempt in range(retries):
             print(f"Attempt {attempt + 1} of {retries}...")
             try:
-                response = requests.get(url, params=params, timeout=timeout)
+                response = self.session.get(url, params=params, timeout=timeout)
                 response.raise_for_status()
                 logger.info("Successfully fetched station metadata.")
                 print("Metadata fetched successfully")
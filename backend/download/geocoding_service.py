@@ -1,88 +1,214 @@
-import requests
+import asyncio
+import json
+import math
+import os
 import time
-from typing import Optional
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from download.replay_transport import async_transport, offline_caches
+from utils.async_utils import run_sync
 from utils.logging_config import logger
+from utils.paths import CACHE_PATH
 
 # URL de l'API Nominatim (OpenStreetMap)
-NOMINATIM_API_URL = "https://nominatim.openstreetmap.org/reverse"
+NOMINATIM_API_URL = os.getenv(
+    "NOMINATIM_API_URL", "https://nominatim.openstreetmap.org/reverse"
+)
+# Politique d'usage de Nominatim : 1 requête/seconde maximum
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.1"))
+
+# IMPORTANT : Nominatim exige un User-Agent valide identifiant l'application.
+# Si on ne le met pas, la requête sera bloquée (403 Forbidden).
+NOMINATIM_HEADERS = {
+    "User-Agent": "PredictionVeloMontpellier/1.0 (contact@ton-domaine.com)"
+}
+
+# Cache disque des noms de rue : clé = coordonnées arrondies (5 décimales ~ 1 m)
+GEOCODING_CACHE_PATH = CACHE_PATH / "geocoding_cache.json"
+GEOCODING_PRECISION = 5
+
+
+class GeocodingCache:
+    """Résultats du géocodage inverse, persistés en JSON et indexés par lat/lon arrondies."""
+
+    def __init__(self, path: Optional[Path] = GEOCODING_CACHE_PATH):
+        # path=None : cache en mémoire uniquement (enregistrement/rejeu de fixtures)
+        self.path = Path(path) if path is not None else None
+        try:
+            self.names: Dict[str, str] = json.loads(self.path.read_text())
+        except (AttributeError, OSError, ValueError):
+            self.names = {}
+
+    @staticmethod
+    def key(lat: Any, lon: Any) -> Optional[str]:
+        """Clé du cache, ou None si les coordonnées sont absentes/invalides."""
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return None
+        if not lat or not lon or math.isnan(lat) or math.isnan(lon):
+            return None
+        return f"{lat:.{GEOCODING_PRECISION}f},{lon:.{GEOCODING_PRECISION}f}"
+
+    def get(self, key: str) -> Optional[str]:
+        return self.names.get(key)
+
+    def set(self, key: str, name: str) -> None:
+        self.names[key] = name
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(
+                json.dumps(self.names, indent=1, sort_keys=True, ensure_ascii=False)
+            )
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire le cache de géocodage : {e}")
+
+
+class _RateLimiter:
+    """Espace le départ des requêtes d'au moins `interval` secondes."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+def _extract_street_name(data: Dict, lat: float, lon: float) -> str:
+    """Choisit le nom le plus pertinent dans une réponse Nominatim."""
+    address = data.get("address", {})
+
+    # Liste de priorité pour trouver un nom pertinent
+    # On cherche d'abord une rue, puis une zone piétonne, une place, un parc, etc.
+    priority_keys = [
+        "road",  # Route standard
+        "pedestrian",  # Zone piétonne
+        "footway",  # Passage piéton
+        "cycleway",  # Piste cyclable
+        "square",  # Place
+        "park",  # Parc
+        "construction",  # Zone en travaux (parfois retourné)
+        "hamlet",  # Hameau (pour les zones moins denses)
+        "suburb",  # Quartier
+        "city_district",  # Arrondissement
+    ]
+
+    # 1. On cherche la clé la plus précise
+    for key in priority_keys:
+        if key in address:
+            # Parfois le nom contient déjà "Montpellier", on le garde propre
+            return address[key]
+
+    # 2. Si aucune clé précise, on essaie le nom d'affichage générique (souvent long)
+    if "display_name" in data:
+        # On prend juste le premier segment du display_name (avant la première virgule)
+        return data["display_name"].split(",")[0]
+
+    # 3. Fallback ultime
+    return f"Point ({lat:.3f}, {lon:.3f})"
+
+
+async def _reverse_geocode(
+    client: httpx.AsyncClient, limiter: _RateLimiter, lat: float, lon: float
+) -> Optional[str]:
+    """Un appel Nominatim (géocodage inverse). None en cas d'échec."""
+    # zoom=18 correspond au niveau "rue/détail"
+    params = {"lat": lat, "lon": lon, "format": "json", "zoom": 18, "addressdetails": 1}
 
+    try:
+        await limiter.wait()
+        response = await client.get(NOMINATIM_API_URL, params=params)
+        response.raise_for_status()
+        return _extract_street_name(response.json(), lat, lon)
 
-def get_street_name_from_coords(lat: float, lon: float) -> Optional[str]:
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Erreur HTTP Nominatim pour ({lat}, {lon}) : {e}")
+    except httpx.TimeoutException:
+        logger.warning(f"Timeout Nominatim pour ({lat}, {lon})")
+    except httpx.TransportError:
+        logger.error("Erreur de connexion à Nominatim. Vérifiez votre internet.")
+    except Exception as e:
+        logger.error(f"Erreur inattendue lors du géocodage : {e}")
+    return None
+
+
+async def resolve_street_names(
+    coords: Dict[str, Tuple[Any, Any]], cache: Optional[GeocodingCache] = None
+) -> Dict[str, Optional[str]]:
     """
-    Récupère un nom de rue ou de lieu lisible à partir de coordonnées GPS
-    via l'API OpenStreetMap Nominatim.
+    Géocodage inverse d'un lot de compteurs.
+
+    Les coordonnées déjà connues sont lues dans le cache disque ; les autres
+    sont demandées à Nominatim en parallèle, le départ des requêtes étant
+    espacé de NOMINATIM_MIN_INTERVAL secondes (limite de l'API). Seuls les
+    succès sont mis en cache : un échec sera retenté au prochain lancement.
 
     Args:
-        lat (float): Latitude
-        lon (float): Longitude
+        coords (Dict[str, Tuple[Any, Any]]): {station_id: (latitude, longitude)}
+        cache (Optional[GeocodingCache]): cache à utiliser (défaut : GEOCODING_CACHE_PATH)
 
     Returns:
-        Optional[str]: Le nom de la rue (ex: "Rue de la Loge") ou None en cas d'échec.
+        Dict[str, Optional[str]]: {station_id: nom de rue ou None}
     """
-    if not lat or not lon:
-        return None
+    if cache is None:
+        cache = GeocodingCache(None if offline_caches() else GEOCODING_CACHE_PATH)
+    names: Dict[str, Optional[str]] = {}
+    # Coordonnées à demander -> compteurs concernés
+    pending: Dict[str, list] = {}
+    for station_id, (lat, lon) in coords.items():
+        key = cache.key(lat, lon)
+        names[station_id] = cache.get(key) if key else None
+        if key and names[station_id] is None:
+            pending.setdefault(key, []).append(station_id)
+
+    if not pending:
+        return names
+
+    n_cached = sum(name is not None for name in names.values())
+    logger.info(f"Géocodage de {len(pending)} coordonnées ({n_cached} en cache)...")
+    limiter = _RateLimiter(NOMINATIM_MIN_INTERVAL)
+    points = [tuple(map(float, key.split(","))) for key in pending]
+    async with httpx.AsyncClient(
+        headers=NOMINATIM_HEADERS, timeout=5, transport=async_transport()
+    ) as client:
+        results = await asyncio.gather(
+            *[_reverse_geocode(client, limiter, lat, lon) for lat, lon in points]
+        )
 
-    # Paramètres pour le géocodage inverse
-    # zoom=18 correspond au niveau "rue/détail"
-    params = {"lat": lat, "lon": lon, "format": "json", "zoom": 18, "addressdetails": 1}
+    for (key, station_ids), name in zip(pending.items(), results):
+        if name is not None:
+            cache.set(key, name)
+        for station_id in station_ids:
+            names[station_id] = name
+    cache.save()
+    return names
 
-    # IMPORTANT : Nominatim exige un User-Agent valide identifiant l'application.
-    # Si on ne le met pas, la requête sera bloquée (403 Forbidden).
-    headers = {"User-Agent": "PredictionVeloMontpellier/1.0 (contact@ton-domaine.com)"}
 
-    try:
-        # Pause de politesse pour éviter le Rate Limiting (max 1 req/sec recommandé)
-        time.sleep(1.1)
+def get_street_name_from_coords(lat: float, lon: float) -> Optional[str]:
+    """
+    Récupère un nom de rue ou de lieu lisible à partir de coordonnées GPS
+    via l'API OpenStreetMap Nominatim (avec cache disque).
 
-        response = requests.get(
-            NOMINATIM_API_URL, params=params, headers=headers, timeout=5
-        )
-        response.raise_for_status()
+    Args:
+        lat (float): Latitude
+        lon (float): Longitude
 
-        data = response.json()
-        address = data.get("address", {})
-
-        # Liste de priorité pour trouver un nom pertinent
-        # On cherche d'abord une rue, puis une zone piétonne, une place, un parc, etc.
-        priority_keys = [
-            "road",  # Route standard
-            "pedestrian",  # Zone piétonne
-            "footway",  # Passage piéton
-            "cycleway",  # Piste cyclable
-            "square",  # Place
-            "park",  # Parc
-            "construction",  # Zone en travaux (parfois retourné)
-            "hamlet",  # Hameau (pour les zones moins denses)
-            "suburb",  # Quartier
-            "city_district",  # Arrondissement
-        ]
-
-        # 1. On cherche la clé la plus précise
-        for key in priority_keys:
-            if key in address:
-                # Parfois le nom contient déjà "Montpellier", on le garde propre
-                return address[key]
-
-        # 2. Si aucune clé précise, on essaie le nom d'affichage générique (souvent long)
-        if "display_name" in data:
-            # On prend juste le premier segment du display_name (avant la première virgule)
-            return data["display_name"].split(",")[0]
-
-        # 3. Fallback ultime
-        return f"Point ({lat:.3f}, {lon:.3f})"
-
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"Erreur HTTP Nominatim pour ({lat}, {lon}) : {e}")
-        return None
-    except requests.exceptions.ConnectionError:
-        logger.error("Erreur de connexion à Nominatim. Vérifiez votre internet.")
-        return None
-    except requests.exceptions.Timeout:
-        logger.warning(f"Timeout Nominatim pour ({lat}, {lon})")
-        return None
-    except Exception as e:
-        logger.error(f"Erreur inattendue lors du géocodage : {e}")
-        return None
+    Returns:
+        Optional[str]: Le nom de la rue (ex: "Rue de la Loge") ou None en cas d'échec.
+    """
+    return run_sync(resolve_street_names({"point": (lat, lon)}))["point"]
 
 
 if __name__ == "__main__":
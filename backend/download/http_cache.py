@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests_cache
+from prometheus_client import Counter
+
+from download.replay_transport import install_transport, offline_caches
+from utils.logging_config import logger
+from utils.paths import CACHE_PATH
+
+# ----------- Metrics -----------
+http_cache_requests = Counter(
+    "http_cache_requests_total",
+    "HTTP requests of the API loaders, by cache result (hit/miss)",
+    ["cache", "result"],
+)
+
+# Set ECOCOUNTER_HTTP_CACHE=false to bypass the cache (e.g. to force a refresh)
+HTTP_CACHE_ENABLED = os.getenv("ECOCOUNTER_HTTP_CACHE", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+    "on",
+)
+
+
+def record_cache_result(cache: str, hit: bool) -> None:
+    http_cache_requests.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+class CountingCachedSession(requests_cache.CachedSession):
+    """requests_cache session that reports its hits and misses to Prometheus."""
+
+    def __init__(self, cache_name: Union[str, Path], label: str, **kwargs):
+        super().__init__(cache_name, **kwargs)
+        self.label = label
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        record_cache_result(self.label, getattr(response, "from_cache", False))
+        return response
+
+
+# One session per cache file, shared by all the loaders of the process
+_sessions: Dict[str, CountingCachedSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_cached_session(
+    name: str, expire_after: int = -1, **kwargs
+) -> CountingCachedSession:
+    """
+    Returns the process-wide cached session stored in CACHE_PATH / `name`.
+
+    `expire_after` is in seconds (-1 = never expires). Expired responses that
+    carry an ETag or Last-Modified header are revalidated with a conditional
+    request instead of being downloaded again.
+    When recording or replaying fixtures (see `download.replay_transport`),
+    the cache is kept in memory and the replay adapter is mounted.
+    """
+    with _sessions_lock:
+        if name not in _sessions:
+            if offline_caches():
+                kwargs.setdefault("backend", "memory")
+            _sessions[name] = install_transport(
+                CountingCachedSession(
+                    CACHE_PATH / name,
+                    label=name.lstrip("."),
+                    expire_after=expire_after,
+                    **kwargs,
+                )
+            )
+        return _sessions[name]
+
+
+class ResponseCache:
+    """
+    Minimal SQLite response cache for the httpx (async) loaders.
+
+    Entries store the status code, body and ETag of a response, with an
+    optional expiry (None = never expires). Expired entries are kept so that
+    they can be revalidated with If-None-Match.
+    """
+
+    def __init__(self, path: Union[str, Path], label: str = "ecocounter"):
+        self.path = str(path)
+        self.label = label
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, status INTEGER NOT NULL, body TEXT, "
+            "etag TEXT, stored_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return json.dumps([url, sorted((params or {}).items())])
+
+    def get(self, key: str) -> Optional[Tuple[int, Any, Optional[str], bool]]:
+        """Returns (status, json body, etag, is_fresh) or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, body, etag, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, body, etag, expires_at = row
+        fresh = expires_at is None or expires_at > time.time()
+        return status, json.loads(body) if body else None, etag, fresh
+
+    def set(
+        self,
+        key: str,
+        status: int,
+        body: Any,
+        etag: Optional[str] = None,
+        expire_after: Optional[float] = None,
+    ) -> None:
+        """Stores a response. `expire_after` in seconds, None = never expires."""
+        now = time.time()
+        expires_at = None if expire_after is None else now + expire_after
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    status,
+                    json.dumps(body) if body is not None else None,
+                    etag,
+                    now,
+                    expires_at,
+                ),
+            )
+            self._connection.commit()
+
+    def touch(self, key: str, expire_after: Optional[float]) -> None:
+        """Extends the lifetime of an entry after a 304 Not Modified."""
+        expires_at = None if expire_after is None else time.time() + expire_after
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET expires_at = ? WHERE key = ?", (expires_at, key)
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache of the Ecocounter timeseries (None if disabled)."""
+    global _response_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _sessions_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                ":memory:" if offline_caches() else CACHE_PATH / "ecocounter_http.sqlite"
+            )
+            logger.info(f"Ecocounter HTTP cache: {_response_cache.path}")
+        return _response_cache
@@ -0,0 +1,318 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import HTTPResponse
+from urllib3.exceptions import MaxRetryError
+
+from download.circuit_breaker import GuardedAdapter, GuardedTransport
+from utils.logging_config import logger
+from utils.paths import DATA_PATH
+
+# live: real network (default) / record: real network, responses saved as
+# fixtures / replay: fixtures only, no outside service
+TRANSPORT_MODES = ("live", "record", "replay")
+API_TRANSPORT_MODE = os.getenv("API_TRANSPORT_MODE", "live").lower()
+if API_TRANSPORT_MODE not in TRANSPORT_MODES:
+    raise ValueError(
+        f"API_TRANSPORT_MODE must be one of {TRANSPORT_MODES}, got {API_TRANSPORT_MODE!r}"
+    )
+
+API_FIXTURES_PATH = Path(os.getenv("API_FIXTURES_PATH", DATA_PATH / "fixtures"))
+# Replay only: latency added to every response (s), share of failed requests
+API_REPLAY_LATENCY = float(os.getenv("API_REPLAY_LATENCY", "0"))
+API_REPLAY_FAILURE_RATE = float(os.getenv("API_REPLAY_FAILURE_RATE", "0"))
+API_REPLAY_FAILURE_STATUS = int(os.getenv("API_REPLAY_FAILURE_STATUS", "503"))
+API_REPLAY_SEED = os.getenv("API_REPLAY_SEED")
+
+# Headers that no longer describe the (decoded, buffered) recorded body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def offline_caches() -> bool:
+    """
+    True when recording or replaying: the persistent caches (HTTP, weather
+    grid, geocoding, station densities) are replaced by in-memory ones, so
+    that every request reaches the transport and runs are reproducible.
+    """
+    return API_TRANSPORT_MODE != "live"
+
+
+class Fixture(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    content: bytes
+
+
+class FixtureStore:
+    """
+    Recorded responses on disk: one JSON file per request, under
+    `path / <host> / <sha1 of method, URL with sorted query and body>.json`.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = Path(path) if path is not None else API_FIXTURES_PATH
+
+    @staticmethod
+    def _normalize(url: str) -> urllib.parse.SplitResult:
+        parts = urllib.parse.urlsplit(str(url))
+        query = urllib.parse.urlencode(
+            sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        )
+        return parts._replace(query=query, fragment="")
+
+    def _file(self, method: str, url: str, body: Optional[bytes]) -> Path:
+        parts = self._normalize(url)
+        digest = hashlib.sha1(
+            f"{method.upper()} {parts.geturl()}".encode() + (body or b"")
+        ).hexdigest()
+        return self.path / parts.netloc.replace(":", "_") / f"{digest}.json"
+
+    def load(
+        self, method: str, url: str, body: Optional[bytes] = None
+    ) -> Optional[Fixture]:
+        try:
+            data = json.loads(self._file(method, url, body).read_text())
+        except (OSError, ValueError):
+            return None
+        return Fixture(data["status"], data["headers"], base64.b64decode(data["body"]))
+
+    def save(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        status: int,
+        headers,
+        content: bytes,
+    ) -> None:
+        path = self._file(method, url, body)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(
+                {
+                    "method": method.upper(),
+                    "url": self._normalize(url).geturl(),
+                    "status": status,
+                    "headers": {
+                        k.lower(): v
+                        for k, v in headers.items()
+                        if k.lower() not in _DROPPED_HEADERS
+                    },
+                    "body": base64.b64encode(content).decode(),
+                },
+                indent=1,
+            )
+        )
+
+
+class FaultInjector:
+    """Latency and random failures of the replayed responses."""
+
+    def __init__(
+        self,
+        latency: Optional[float] = None,
+        failure_rate: Optional[float] = None,
+        seed: Optional[str] = None,
+    ):
+        self.latency = API_REPLAY_LATENCY if latency is None else latency
+        self.failure_rate = (
+            API_REPLAY_FAILURE_RATE if failure_rate is None else failure_rate
+        )
+        seed = API_REPLAY_SEED if seed is None else seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+
+def _missing_fixture(method: str, url) -> str:
+    return f"No recorded fixture for {method} {url} (API_TRANSPORT_MODE=replay)"
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport of the async loaders (Ecocounter timeseries, geocoding).
+    Records the responses of the real network, or replays them from disk
+    with the latency and failures of a FaultInjector.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        store: Optional[FixtureStore] = None,
+        faults: Optional[FaultInjector] = None,
+        **transport_kwargs,
+    ):
+        self.mode = mode or API_TRANSPORT_MODE
+        self.store = store or FixtureStore()
+        self.faults = faults or FaultInjector()
+        self._live = (
+            httpx.AsyncHTTPTransport(**transport_kwargs)
+            if self.mode == "record"
+            else None
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        if self._live is not None:
+            response = await self._live.handle_async_request(request)
+            try:
+                content = await response.aread()
+            finally:
+                await response.aclose()
+            self.store.save(
+                request.method,
+                str(request.url),
+                body,
+                response.status_code,
+                response.headers,
+                content,
+            )
+            status, headers = response.status_code, response.headers
+        else:
+            if self.faults.latency > 0:
+                await asyncio.sleep(self.faults.latency)
+            if self.faults.should_fail():
+                return httpx.Response(API_REPLAY_FAILURE_STATUS, request=request)
+            fixture = self.store.load(request.method, str(request.url), body)
+            if fixture is None:
+                raise httpx.ConnectError(
+                    _missing_fixture(request.method, request.url), request=request
+                )
+            status, headers, content = fixture
+        headers = {
+            k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS
+        }
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        if self._live is not None:
+            await self._live.aclose()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    requests adapter of the synchronous loaders (station metadata, Open-Meteo
+    history and forecast). Same behaviour as ReplayTransport; in replay the
+    `max_retries` policy of the replaced adapter is applied to the replayed
+    statuses.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        store: Optional[FixtureStore] = None,
+        faults: Optional[FaultInjector] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.mode = mode or API_TRANSPORT_MODE
+        self.store = store or FixtureStore()
+        self.faults = faults or FaultInjector()
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        if self.mode == "record":
+            response = super().send(request, False, timeout, verify, cert, proxies)
+            self.store.save(
+                request.method,
+                request.url,
+                body,
+                response.status_code,
+                response.headers,
+                response.content,
+            )
+            return response
+
+        retries = self.max_retries
+        while True:
+            response = self._replay_once(request, body)
+            if not retries.is_retry(request.method, response.status_code):
+                return response
+            try:
+                retries = retries.increment(request.method, request.url)
+            except MaxRetryError as e:
+                raise requests.exceptions.RetryError(e, request=request)
+
+    def _replay_once(self, request, body: Optional[bytes]) -> requests.Response:
+        if self.faults.latency > 0:
+            time.sleep(self.faults.latency)
+        if self.faults.should_fail():
+            return self._build(request, Fixture(API_REPLAY_FAILURE_STATUS, {}, b""))
+        fixture = self.store.load(request.method, request.url, body)
+        if fixture is None:
+            raise requests.exceptions.ConnectionError(
+                _missing_fixture(request.method, request.url), request=request
+            )
+        return self._build(request, fixture)
+
+    def _build(self, request, fixture: Fixture) -> requests.Response:
+        raw = HTTPResponse(
+            body=io.BytesIO(fixture.content),
+            headers=fixture.headers,
+            status=fixture.status,
+            preload_content=False,
+            decode_content=False,
+        )
+        response = requests.Response()
+        response.status_code = fixture.status
+        response.headers = CaseInsensitiveDict(fixture.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = raw
+        response.reason = raw.reason
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = fixture.content
+        return response
+
+
+def install_transport(session: requests.Session) -> requests.Session:
+    """
+    Mounts the transport layer of the loaders on the session: a ReplayAdapter
+    when recording or replaying (keeping the retry policy of the adapters it
+    replaces), wrapped by the circuit breaker and run budget guard (see
+    `download.circuit_breaker`). Call it again after retry() remounted plain
+    adapters.
+    """
+    for prefix in ("http://", "https://"):
+        current = session.adapters.get(prefix) or HTTPAdapter()
+        if isinstance(current, GuardedAdapter):
+            continue
+        if API_TRANSPORT_MODE != "live" and not isinstance(current, ReplayAdapter):
+            current = ReplayAdapter(max_retries=current.max_retries)
+        session.mount(prefix, GuardedAdapter(current))
+    return session
+
+
+def async_transport(**transport_kwargs) -> httpx.AsyncBaseTransport:
+    """
+    Transport for an httpx.AsyncClient: the network (or the fixtures when
+    recording/replaying) behind the circuit breaker and run budget guard.
+    `transport_kwargs` (e.g. limits) go to the real transport.
+    """
+    if API_TRANSPORT_MODE == "live":
+        return GuardedTransport(httpx.AsyncHTTPTransport(**transport_kwargs))
+    logger.debug(f"httpx transport in {API_TRANSPORT_MODE} mode ({API_FIXTURES_PATH}).")
+    return GuardedTransport(ReplayTransport(**transport_kwargs))
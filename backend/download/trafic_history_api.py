@@ -1,49 +1,192 @@
-import requests
+import asyncio
+import json
+import os
+import queue
+import threading
 import urllib.parse
-import time
+from pathlib import Path
+import httpx
+import ijson
+import numpy as np
 import pandas as pd
 from download.abstract_loader import BaseAPILoader
-from requests.exceptions import HTTPError, Timeout, ConnectionError, RequestException
+from download.http_cache import ResponseCache, get_response_cache, record_cache_result
+from download.replay_transport import async_transport, offline_caches
 from utils.logging_config import logger
-from typing import List, Dict, Optional, Tuple
+from utils.async_utils import run_sync
+from utils.paths import CACHE_PATH
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple
+
+# Public API of Montpellier Méditerranée Métropole
+ECOCOUNTER_BASE_URL = os.getenv(
+    "ECOCOUNTER_BASE_URL", "https://portail-api-data.montpellier3m.fr"
+)
+# Maximum number of requests in flight against the API (one host)
+ECOCOUNTER_MAX_CONCURRENCY = int(os.getenv("ECOCOUNTER_MAX_CONCURRENCY", "8"))
+
+# Status codes worth retrying (rate limiting, transient server errors)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Chunks ending more than N days ago can no longer change: cached forever.
+# More recent chunks are cached for ECOCOUNTER_RECENT_TTL seconds, then
+# revalidated (If-None-Match) when the API sent an ETag.
+ECOCOUNTER_SETTLED_DAYS = int(os.getenv("ECOCOUNTER_SETTLED_DAYS", "2"))
+ECOCOUNTER_RECENT_TTL = int(os.getenv("ECOCOUNTER_RECENT_TTL", "3600"))
+
+# Maximum number of records returned by one timeseries request
+ECOCOUNTER_RECORD_LIMIT = int(os.getenv("ECOCOUNTER_RECORD_LIMIT", "10000"))
+# Adaptive chunks: share of the limit aimed for, bounds of a chunk in days
+CHUNK_TARGET_FILL = 0.8
+MIN_CHUNK_DAYS, MAX_CHUNK_DAYS = 1, 512
+# Initial estimate for a station never downloaded (hourly counter)
+DEFAULT_RECORDS_PER_DAY = 24.0
+DENSITY_PATH = CACHE_PATH / "ecocounter_density.json"
+
+# Streaming mode: max number of parsed chunks waiting for the consumer
+ECOCOUNTER_STREAM_QUEUE_SIZE = int(os.getenv("ECOCOUNTER_STREAM_QUEUE_SIZE", "16"))
+
+# (station_id, index as ISO strings, values) for one date chunk
+TimeseriesChunk = Tuple[str, np.ndarray, np.ndarray]
+
+
+class ChunkFetchError(Exception):
+    """A date chunk could not be downloaded (retries exhausted, bad response)."""
+
+
+def as_intensity_array(values: List) -> np.ndarray:
+    """Counts as a numpy array: int64 if complete, float64 with NaN for nulls."""
+    array = np.asarray(values)
+    if array.dtype == object:
+        array = array.astype(np.float64)
+    return array
+
+
+async def parse_timeseries_stream(byte_chunks: AsyncIterator[bytes]) -> Dict[str, List]:
+    """
+    Incrementally parses the `index` and `values` arrays of a timeseries
+    response body, without loading the whole JSON document in memory.
+    """
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    data = {"index": [], "values": []}
+
+    def consume():
+        for prefix, _, value in events:
+            if prefix == "index.item":
+                data["index"].append(value)
+            elif prefix == "values.item":
+                data["values"].append(value)
+        del events[:]
+
+    async for raw in byte_chunks:
+        parser.send(raw)
+        consume()
+    parser.close()
+    consume()
+    return data
+
+
+class StationDensityStore:
+    """
+    Records per day observed for each station, persisted as JSON in CACHE_PATH
+    so that the next run starts from a realistic chunk size.
+    """
+
+    def __init__(self, path: Optional[Path] = DENSITY_PATH):
+        # path=None: in memory only (fixture record/replay runs start from defaults)
+        self.path = Path(path) if path is not None else None
+        try:
+            self.densities: Dict[str, float] = json.loads(self.path.read_text())
+        except (AttributeError, OSError, ValueError):
+            self.densities = {}
+
+    def get(self, station_id: str) -> float:
+        return self.densities.get(station_id, DEFAULT_RECORDS_PER_DAY)
+
+    def update(self, station_id: str, records: int, days: float) -> None:
+        """
+        Blends the density observed over `days` with the stored one. Ranges
+        without any record (new or broken counter) leave the estimate as is.
+        """
+        if days < 1 or records == 0:
+            return
+        observed = records / days
+        previous = self.densities.get(station_id)
+        self.densities[station_id] = (
+            observed if previous is None else (previous + observed) / 2
+        )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.densities, indent=1, sort_keys=True))
+        except OSError as e:
+            logger.warning(f"Could not save station densities to {self.path}: {e}")
 
 
 class EcoCounterTimeseriesLoader(BaseAPILoader):
     """
     Loader to fetch time series data from Montpellier Ecocounter API for multiple stations.
     Handles API pagination limits (max 10k records) by chunking the time range.
+    Chunks are sized from each station's record density (`StationDensityStore`)
+    and adjusted on the fly (see `_iter_station_chunks`).
+
+    Stations are fetched concurrently with asyncio/httpx on a shared keep-alive
+    connection pool, bounded by `max_concurrency`.
+    Responses are kept in a persistent cache (see `download.http_cache`), so
+    replaying a period only downloads the chunks that may still change.
+    `iter_chunks` streams the chunks one by one (bounded memory) instead of
+    merging whole stations.
+    Requests go through the shared circuit breaker and run budget (see
+    `download.circuit_breaker`): once the API is deemed unavailable, the
+    fetch raises ExternalApiUnavailable instead of retrying every chunk.
 
     Inherits from BaseAPILoader and implements the abstract method `fetch_data`.
     """
 
-    def _generate_date_chunks(self, start_str: str, end_str: str, months: int = 6) -> List[Tuple[str, str]]:
+    def __init__(
+        self,
+        base_url: str = ECOCOUNTER_BASE_URL,
+        max_concurrency: int = ECOCOUNTER_MAX_CONCURRENCY,
+        backoff: float = 0.5,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = True,
+        record_limit: int = ECOCOUNTER_RECORD_LIMIT,
+        densities: Optional[StationDensityStore] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.backoff = backoff
+        self.record_limit = record_limit
+        if densities is None:
+            densities = StationDensityStore(None if offline_caches() else DENSITY_PATH)
+        self.densities = densities
+        # Shared persistent cache unless a dedicated one is given (or disabled)
+        if cache is None and use_cache:
+            cache = get_response_cache()
+        self.cache = cache
+
+    @staticmethod
+    def _chunk_ttl(chunk_end: str) -> Optional[int]:
+        """Cache lifetime of a chunk in seconds (None = never expires)."""
+        settled = pd.Timestamp.now().normalize() - pd.Timedelta(
+            days=ECOCOUNTER_SETTLED_DAYS
+        )
+        return None if pd.to_datetime(chunk_end) < settled else ECOCOUNTER_RECENT_TTL
+
+    def _span_days(self, records_per_day: float) -> int:
         """
-        Helper method to split a date range into smaller chunks (e.g., 6 months).
+        Chunk length (days) expected to fill CHUNK_TARGET_FILL of the record
+        limit, rounded down to a power of two: plans stay stable between runs
+        (cache hits) while the density estimate moves slightly.
         """
-        start = pd.to_datetime(start_str)
-        end = pd.to_datetime(end_str)
-        chunks = []
-        # If the range is a single day (or instantaneous), return one chunk immediately
-        if start == end:
-            return [(
-                start.strftime("%Y-%m-%dT%H:%M:%S"),
-                end.strftime("%Y-%m-%dT%H:%M:%S")
-            )]
-        
-        current = start
-        while current < end:
-            next_date = current + pd.DateOffset(months=months)
-            chunk_end = min(next_date, end)
-            
-            # Format expected by the API (YYYY-MM-DDTHH:MM:SS)
-            chunks.append((
-                current.strftime("%Y-%m-%dT%H:%M:%S"),
-                chunk_end.strftime("%Y-%m-%dT%H:%M:%S")
-            ))
-            # Next chunk starts where the previous one ended
-            current = chunk_end
-            
-        return chunks
+        days = self.record_limit * CHUNK_TARGET_FILL / max(records_per_day, 1e-3)
+        span = MIN_CHUNK_DAYS
+        while span * 2 <= min(days, MAX_CHUNK_DAYS):
+            span *= 2
+        return span
 
     def fetch_data(
         self,
@@ -54,100 +197,418 @@ class EcoCounterTimeseriesLoader(BaseAPILoader):
         retries: int = 3,
     ) -> Dict[str, Optional[Dict]]:
         """
-        Loop over station IDs AND date chunks to fetch complete JSON data with retry mechanism.
+        Fetches complete JSON data for every station and date chunk, concurrently.
+
+        Returns:
+            Dict[str, Optional[Dict]]: {station_id: {"index", "values", "id"}} or None
+            for stations without data.
         """
-        results: Dict[str, Optional[Dict]] = {}
-        total_stations = len(station_ids_list)
-
-        # 1. Prepare date chunks to bypass API limits
-        date_chunks = self._generate_date_chunks(start_date, end_date)
-        logger.info(f"Time range split into {len(date_chunks)} chunks per station to ensure full data retrieval.")
-
-        for idx, station_id in enumerate(station_ids_list, start=1):
-            full_id = (
-                f"urn:ngsi-ld:EcoCounter:{station_id}"
-                if "urn:" not in station_id
-                else station_id
+        return run_sync(
+            self.fetch_data_async(
+                station_ids_list, start_date, end_date, timeout=timeout, retries=retries
             )
-            encoded_id = urllib.parse.quote(full_id)
-            url = f"https://portail-api-data.montpellier3m.fr/ecocounter_timeseries/{encoded_id}/attrs/intensity"
-            
-            print(
-                f"[{idx}/{total_stations}] Downloading data for station {station_id}...",
-                end=" ",
-                flush=True,
+        )
+
+    def fetch_data_windows(
+        self,
+        windows: Dict[Tuple[str, str], List[str]],
+        timeout: int = 5,
+        retries: int = 3,
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Fetches a different date range per group of stations, concurrently.
+
+        Args:
+            windows: {(start_date, end_date): [station_id, ...]}
+
+        Returns:
+            Dict[str, Optional[Dict]]: same contract as `fetch_data`.
+        """
+        return run_sync(
+            self.fetch_windows_async(windows, timeout=timeout, retries=retries)
+        )
+
+    def iter_chunks(
+        self,
+        windows: Dict[Tuple[str, str], List[str]],
+        timeout: int = 5,
+        retries: int = 3,
+        queue_size: int = ECOCOUNTER_STREAM_QUEUE_SIZE,
+    ) -> Iterator[TimeseriesChunk]:
+        """
+        Streams the (station_id, index, values) arrays of every chunk, in
+        completion order. Response bodies are parsed incrementally and the
+        download runs in a background thread that pauses when `queue_size`
+        chunks are waiting: memory stays bounded whatever the date range.
+
+        Args:
+            windows: {(start_date, end_date): [station_id, ...]}
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        done = object()
+
+        def producer():
+            try:
+                asyncio.run(
+                    self._stream_windows(windows, chunks, stop, timeout, retries)
+                )
+            except BaseException as e:
+                self._put(chunks, e, stop)
+            finally:
+                self._put(chunks, done, stop)
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early (or failed): unblock and stop the producer
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def _put(chunks: queue.Queue, item, stop: threading.Event) -> None:
+        """Blocking put that gives up once the consumer is gone."""
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    async def _stream_windows(
+        self,
+        windows: Dict[Tuple[str, str], List[str]],
+        chunks: queue.Queue,
+        stop: threading.Event,
+        timeout: int,
+        retries: int,
+    ) -> None:
+        """Downloads the chunks with `max_concurrency` workers feeding the queue."""
+        jobs = [
+            (station_id, start_date, end_date)
+            for (start_date, end_date), station_ids in windows.items()
+            for station_id in station_ids
+        ]
+        logger.info(f"Streaming {len(jobs)} stations for {len(windows)} date windows.")
+        pending = iter(jobs)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=limits,
+            transport=async_transport(limits=limits),
+        ) as client:
+
+            async def worker():
+                # Each worker holds at most one parsed chunk: bounded memory
+                for station_id, start_date, end_date in pending:
+                    async for data in self._iter_station_chunks(
+                        client,
+                        semaphore,
+                        station_id,
+                        start_date,
+                        end_date,
+                        retries,
+                        stream=True,
+                    ):
+                        if stop.is_set():
+                            return
+                        if data.get("index"):
+                            item = (
+                                station_id,
+                                np.asarray(data["index"]),
+                                as_intensity_array(data["values"]),
+                            )
+                            await asyncio.to_thread(self._put, chunks, item, stop)
+
+            await asyncio.gather(*[worker() for _ in range(self.max_concurrency)])
+        self.densities.save()
+
+    async def fetch_data_async(
+        self,
+        station_ids_list: List[str],
+        start_date: str,
+        end_date: str,
+        timeout: int = 5,
+        retries: int = 3,
+    ) -> Dict[str, Optional[Dict]]:
+        """Async version of `fetch_data`."""
+        return await self.fetch_windows_async(
+            {(start_date, end_date): station_ids_list}, timeout=timeout, retries=retries
+        )
+
+    async def fetch_windows_async(
+        self,
+        windows: Dict[Tuple[str, str], List[str]],
+        timeout: int = 5,
+        retries: int = 3,
+    ) -> Dict[str, Optional[Dict]]:
+        """Async version of `fetch_data_windows`."""
+        # 1. One job per station and date range (chunks are planned adaptively)
+        jobs = []
+        for (start_date, end_date), station_ids in windows.items():
+            logger.info(f"{start_date} -> {end_date}: {len(station_ids)} stations.")
+            jobs += [(station_id, start_date, end_date) for station_id in station_ids]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=limits,
+            transport=async_transport(limits=limits),
+        ) as client:
+            # 2. One task per station (stations are fetched concurrently)
+            station_results = await asyncio.gather(
+                *[
+                    self._fetch_station(
+                        client, semaphore, station_id, start_date, end_date, retries
+                    )
+                    for station_id, start_date, end_date in jobs
+                ]
             )
+        self.densities.save()
 
-            # Containers to merge results from different time chunks
-            consolidated_index = []
-            consolidated_values = []
-            
-            # 2. Loop over time chunks
-            for chunk_start, chunk_end in date_chunks:
-                params = {"fromDate": chunk_start, "toDate": chunk_end}
-                chunk_success = False
-
-                for attempt in range(retries):
-                    try:
-                        response = requests.get(url, params=params, timeout=timeout)
-                        
-                        # Specific handling: 404 on a chunk isn't fatal (just no data for this period)
-                        if response.status_code == 404:
-                            chunk_success = True
-                            break
+        return {
+            station_id: result
+            for (station_id, _, _), result in zip(jobs, station_results)
+        }
 
-                        response.raise_for_status()
-                        data = response.json()
-                        
-                        # Merge data into the main lists
-                        if "index" in data and "values" in data:
-                            consolidated_index.extend(data["index"])
-                            consolidated_values.extend(data["values"])
-                        
-                        chunk_success = True
-                        # Success for this chunk, exit retry loop
-                        break 
-
-                    except Timeout:
-                        logger.warning(
-                            f"Timeout on attempt {attempt + 1} for station {station_id} (chunk {chunk_start})"
-                        )
+    @staticmethod
+    def _station_path(station_id: str) -> str:
+        full_id = (
+            f"urn:ngsi-ld:EcoCounter:{station_id}"
+            if "urn:" not in station_id
+            else station_id
+        )
+        encoded_id = urllib.parse.quote(full_id)
+        return f"/ecocounter_timeseries/{encoded_id}/attrs/intensity"
+
+    async def _fetch_station(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        station_id: str,
+        start_date: str,
+        end_date: str,
+        retries: int,
+    ) -> Optional[Dict]:
+        """Fetches all chunks of one station and merges them in chronological order."""
+        # 3. Reconstruct the final JSON response structure for this station
+        consolidated_index, consolidated_values = [], []
+        async for data in self._iter_station_chunks(
+            client, semaphore, station_id, start_date, end_date, retries
+        ):
+            if "index" in data and "values" in data:
+                consolidated_index.extend(data["index"])
+                consolidated_values.extend(data["values"])
+
+        if consolidated_index:
+            logger.info(
+                f"Station {station_id}: {len(consolidated_index)} records downloaded."
+            )
+            return {
+                "index": consolidated_index,
+                "values": consolidated_values,
+                "id": station_id,
+            }
+        logger.warning(f"Station {station_id}: no data or failed.")
+        return None
+
+    async def _iter_station_chunks(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        station_id: str,
+        start_date: str,
+        end_date: str,
+        retries: int,
+        stream: bool = False,
+    ) -> AsyncIterator[Dict]:
+        """
+        Fetches the date range of one station chunk by chunk, chronologically.
+
+        The first chunk is sized from the station's known density. A response
+        returned at the record limit may be truncated: the chunk is halved and
+        requested again, so no record is lost. A response far under the limit
+        doubles the next chunk. The observed density is then stored.
+
+        A chunk that cannot be downloaded stops the station there: only the
+        chunks before the gap are returned, so the ingestion watermark stays
+        at the last day actually received and the next run fetches the rest.
+        """
+        path = self._station_path(station_id)
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        span = self._span_days(self.densities.get(station_id))
+        cursor, records, n_requests = start, 0, 0
+
+        while True:
+            chunk_end = min(cursor + pd.Timedelta(days=span), end)
+            try:
+                data = await self._fetch_chunk(
+                    client,
+                    semaphore,
+                    path,
+                    cursor.strftime("%Y-%m-%dT%H:%M:%S"),
+                    chunk_end.strftime("%Y-%m-%dT%H:%M:%S"),
+                    station_id,
+                    retries,
+                    stream=stream,
+                )
+            except ChunkFetchError as e:
+                logger.error(
+                    f"Station {station_id}: incomplete, stopped at {cursor:%Y-%m-%d} ({e})."
+                )
+                return
+            n_requests += 1
+            count = len(data["index"]) if data and "index" in data else 0
+
+            if count >= self.record_limit:
+                if span > MIN_CHUNK_DAYS:
+                    span //= 2
+                    continue
+                logger.warning(
+                    f"Station {station_id}: {count} records in a {span}-day chunk, data may be truncated."
+                )
+            if data:
+                yield data
+            records += count
+            if chunk_end >= end:
+                break
+            if count < self.record_limit * CHUNK_TARGET_FILL / 4:
+                span = min(span * 2, MAX_CHUNK_DAYS)
+            cursor = chunk_end
+
+        logger.info(
+            f"Station {station_id}: {records} records in {n_requests} requests."
+        )
+        days = (end - start) / pd.Timedelta(days=1)
+        self.densities.update(station_id, records, days)
+
+    async def _fetch_chunk(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        path: str,
+        chunk_start: str,
+        chunk_end: str,
+        station_id: str,
+        retries: int,
+        stream: bool = False,
+    ) -> Optional[Dict]:
+        """
+        Fetches one date chunk with retry and exponential backoff.
+        Served from the response cache when a fresh entry exists.
+        With `stream`, the body is parsed incrementally (`parse_timeseries_stream`).
 
-                    except ConnectionError:
+        Returns None when the API has no data for the chunk (404).
+
+        Raises:
+            ChunkFetchError: If the chunk could not be downloaded.
+        """
+        params = {"fromDate": chunk_start, "toDate": chunk_end}
+        headers = {}
+        key = cached = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(f"{self.base_url}{path}", params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                status, body, etag, fresh = cached
+                if fresh:
+                    record_cache_result(self.cache.label, hit=True)
+                    return body if status == 200 else None
+                if etag:
+                    headers["If-None-Match"] = etag
+
+        for attempt in range(retries):
+            try:
+                async with semaphore, client.stream(
+                    "GET", path, params=params, headers=headers
+                ) as response:
+                    # Expired entry still valid: only the headers were transferred
+                    if response.status_code == 304 and cached is not None:
+                        self.cache.touch(key, self._chunk_ttl(chunk_end))
+                        record_cache_result(self.cache.label, hit=True)
+                        return cached[1] if cached[0] == 200 else None
+
+                    # Specific handling: 404 on a chunk isn't fatal (just no data for this period)
+                    if response.status_code == 404:
+                        self._store(key, chunk_end, 404, None)
+                        return None
+
+                    if response.status_code in RETRYABLE_STATUS:
                         logger.warning(
-                            f"Connection error on attempt {attempt + 1} for station {station_id}"
+                            f"HTTP {response.status_code} on attempt {attempt + 1} for station {station_id} (chunk {chunk_start})"
+                        )
+                    else:
+                        response.raise_for_status()
+                        if stream:
+                            data = await parse_timeseries_stream(
+                                response.aiter_bytes()
+                            )
+                        else:
+                            await response.aread()
+                            data = response.json()
+                        self._store(
+                            key, chunk_end, 200, data, response.headers.get("ETag")
                         )
+                        return data
 
-                    except HTTPError as http_err:
-                        # Log critical errors (other than handled 404)
-                        logger.error(f"HTTP error {http_err} for station {station_id}")
-                        break
+            except httpx.TimeoutException:
+                logger.warning(
+                    f"Timeout on attempt {attempt + 1} for station {station_id} (chunk {chunk_start})"
+                )
 
-                    except ValueError as json_err:
-                        logger.error(
-                            f"JSON decode error {json_err} for station {station_id}"
-                        )
-                        break
+            except httpx.TransportError:
+                logger.warning(
+                    f"Connection error on attempt {attempt + 1} for station {station_id}"
+                )
 
-                    except RequestException as req_err:
-                        logger.error(
-                            f"Request exception {req_err} for station {station_id}"
-                        )
+            except httpx.HTTPStatusError as http_err:
+                # Log critical errors (other than handled 404 and retryable codes)
+                logger.error(f"HTTP error {http_err} for station {station_id}")
+                raise ChunkFetchError(str(http_err)) from http_err
+
+            except (ValueError, ijson.JSONError) as json_err:
+                logger.error(f"JSON decode error {json_err} for station {station_id}")
+                raise ChunkFetchError(f"invalid JSON: {json_err}") from json_err
 
-                    time.sleep(0.5 * (attempt + 1))
-                
-                # End of retry loop for this chunk
-
-            # 3. Reconstruct the final JSON response structure for this station
-            if consolidated_index:
-                results[station_id] = {
-                    "index": consolidated_index,
-                    "values": consolidated_values,
-                    "id": station_id
-                }
-                print("Done (Merged)")
-            else:
-                results[station_id] = None
-                print("No Data or Failed")
-
-        return results
\ No newline at end of file
+            if attempt < retries - 1:
+                await asyncio.sleep(self.backoff * 2**attempt)
+
+        logger.error(
+            f"Giving up on station {station_id} (chunk {chunk_start}) after {retries} attempts"
+        )
+        raise ChunkFetchError(f"chunk {chunk_start} failed after {retries} attempts")
+
+    def _store(
+        self,
+        key: Optional[str],
+        chunk_end: str,
+        status: int,
+        body: Optional[Dict],
+        etag: Optional[str] = None,
+    ) -> None:
+        """Stores a downloaded chunk in the response cache (counted as a miss)."""
+        if self.cache is None:
+            return
+        record_cache_result(self.cache.label, hit=False)
+        self.cache.set(
+            key, status, body, etag=etag, expire_after=self._chunk_ttl(chunk_end)
+        )
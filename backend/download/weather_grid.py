@@ -0,0 +1,169 @@
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from download.http_cache import ResponseCache, record_cache_result
+from download.replay_transport import offline_caches
+from utils.logging_config import logger
+from utils.paths import CACHE_PATH
+
+# Stations are grouped on a regular lat/lon grid (0.05° ~ 5 km): one weather
+# location per grid cell instead of one per station
+WEATHER_GRID_STEP = float(os.getenv("WEATHER_GRID_STEP", "0.05"))
+
+# Reference point of the city-wide weather stored in the `weather` table
+# (history and forecast)
+CITY_CENTER = (43.6107, 3.8767)
+
+WEATHER_COLUMNS = ["avg_temp", "precipitation_mm", "vent_max"]
+
+Cell = Tuple[float, float]
+# (cells, start_date, end_date) -> DataFrame[cell_lat, cell_lon, date, *WEATHER_COLUMNS]
+BatchFetcher = Callable[[List[Cell], str, str], pd.DataFrame]
+# Called with the cache result (hit) of each cell
+CacheLookupHook = Callable[[bool], None]
+
+
+def snap_to_grid(
+    latitude: float, longitude: float, step: float = WEATHER_GRID_STEP
+) -> Cell:
+    """Center of the grid cell containing the point (i.e. the nearest grid node)."""
+    return (
+        round(round(float(latitude) / step) * step, 4),
+        round(round(float(longitude) / step) * step, 4),
+    )
+
+
+def station_cells(
+    stations: Iterable[Tuple[str, float, float]], step: float = WEATHER_GRID_STEP
+) -> Dict[str, Cell]:
+    """{station_id: grid cell} for (station_id, latitude, longitude) tuples."""
+    return {
+        station_id: snap_to_grid(lat, lon, step)
+        for station_id, lat, lon in stations
+        if not pd.isna(lat) and not pd.isna(lon)
+    }
+
+
+class WeatherGridCache:
+    """
+    Daily weather per grid cell, stored in CACHE_PATH (SQLite).
+    Each (source, cell, day) entry is independent: a new station only costs
+    the request of its own cell.
+    """
+
+    def __init__(self, path=CACHE_PATH / "weather_grid.sqlite"):
+        self.responses = ResponseCache(path, label="weather_grid")
+
+    @staticmethod
+    def _key(source: str, cell: Cell, day: str) -> str:
+        return ResponseCache.make_key(
+            source, {"cell": f"{cell[0]},{cell[1]}", "day": day}
+        )
+
+    def get(self, source: str, cell: Cell, day: str) -> Optional[Dict[str, float]]:
+        entry = self.responses.get(self._key(source, cell, day))
+        if entry is None or not entry[3]:
+            return None
+        return entry[1]
+
+    def set(
+        self,
+        source: str,
+        cell: Cell,
+        day: str,
+        values: Dict[str, float],
+        expire_after: Optional[float],
+    ) -> None:
+        self.responses.set(
+            self._key(source, cell, day), 200, values, expire_after=expire_after
+        )
+
+
+_grid_cache: Optional[WeatherGridCache] = None
+
+
+def get_grid_cache() -> WeatherGridCache:
+    global _grid_cache
+    if _grid_cache is None:
+        _grid_cache = (
+            WeatherGridCache(":memory:") if offline_caches() else WeatherGridCache()
+        )
+    return _grid_cache
+
+
+def fetch_grid_weather(
+    fetch_batch: BatchFetcher,
+    source: str,
+    cells: Iterable[Cell],
+    start_date: str,
+    end_date: str,
+    expire_after: Optional[float] = None,
+    cache: Optional[WeatherGridCache] = None,
+    on_lookup: Optional[CacheLookupHook] = None,
+) -> pd.DataFrame:
+    """
+    Daily weather of every cell between two dates, from the per-cell cache.
+    All the cells missing from the cache are fetched in one batched
+    (multi-location) request.
+
+    Returns:
+        pd.DataFrame: cell_lat, cell_lon, date (naive, local day), avg_temp,
+        precipitation_mm, vent_max.
+    """
+    cache = cache if cache is not None else get_grid_cache()
+    cells = sorted(set(cells))
+    days = [d.strftime("%Y-%m-%d") for d in pd.date_range(start_date, end_date)]
+
+    rows, missing = [], []
+    for cell in cells:
+        cached = [cache.get(source, cell, day) for day in days]
+        if all(values is not None for values in cached):
+            rows += [
+                {"cell_lat": cell[0], "cell_lon": cell[1], "date": day, **values}
+                for day, values in zip(days, cached)
+            ]
+        else:
+            missing.append(cell)
+        record_cache_result("weather_grid", hit=cell not in missing)
+        if on_lookup is not None:
+            on_lookup(cell not in missing)
+
+    if missing:
+        logger.info(
+            f"Fetching {source} weather for {len(missing)} grid cells ({len(cells) - len(missing)} cached)."
+        )
+        df_batch = fetch_batch(missing, start_date, end_date)
+        for row in df_batch.to_dict(orient="records"):
+            values = {c: row[c] for c in WEATHER_COLUMNS}
+            day = pd.Timestamp(row["date"]).strftime("%Y-%m-%d")
+            cell = (row["cell_lat"], row["cell_lon"])
+            # Days not published yet (archive delay) are fetched again next time
+            if not any(pd.isna(v) for v in values.values()):
+                cache.set(source, cell, day, values, expire_after)
+            rows.append(
+                {"cell_lat": cell[0], "cell_lon": cell[1], "date": day, **values}
+            )
+
+    df = pd.DataFrame(rows, columns=["cell_lat", "cell_lon", "date", *WEATHER_COLUMNS])
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def weather_by_station(
+    cells: Dict[str, Cell], grid_weather: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Joins the grid weather to the stations through their cell.
+
+    Returns:
+        pd.DataFrame: station_id, date, avg_temp, precipitation_mm, vent_max.
+    """
+    df_cells = pd.DataFrame(
+        [(s, lat, lon) for s, (lat, lon) in cells.items()],
+        columns=["station_id", "cell_lat", "cell_lon"],
+    )
+    return df_cells.merge(grid_weather, on=["cell_lat", "cell_lon"]).drop(
+        columns=["cell_lat", "cell_lon"]
+    )
@@ -0,0 +1,80 @@
+import threading
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from download.daily_weather_api import FORECAST_CACHE_TTL, OpenMeteoDailyAPIC
+from download.weather_grid import Cell
+from utils.logging_config import logger
+
+
+class WeatherProvider:
+    """
+    Process-wide daily forecast provider, shared by the daily update and the
+    prediction pipeline.
+
+    Every forecast goes through a single OpenMeteoDailyAPIC, i.e. one HTTP
+    session (connection pool), and is cached per (grid cell, day, timezone)
+    in the SQLite grid cache for FORECAST_CACHE_TTL seconds: the second
+    pipeline of a run only requests the cells the first one did not fetch.
+    The cache hits and misses of the provider are counted.
+    """
+
+    def __init__(self, client: Optional[OpenMeteoDailyAPIC] = None) -> None:
+        self._client = client
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> OpenMeteoDailyAPIC:
+        # Built on first use: importing the provider costs no session
+        with self._lock:
+            if self._client is None:
+                self._client = OpenMeteoDailyAPIC()
+            return self._client
+
+    def get_forecast(
+        self,
+        cells: Iterable[Cell],
+        start_date: str,
+        end_date: str,
+        timezone: str = "Europe/Paris",
+    ) -> pd.DataFrame:
+        """
+        Daily forecast of the grid cells between two dates. Only the cells
+        missing from the cache are requested, in one batch.
+
+        Returns:
+            pd.DataFrame: cell_lat, cell_lon, date, avg_temp, precipitation_mm, vent_max.
+        """
+        df = self.client.get_grid_weather(
+            cells, start_date, end_date, timezone=timezone, on_lookup=self._count
+        )
+        return df.sort_values(["cell_lat", "cell_lon", "date"], ignore_index=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+_provider: Optional[WeatherProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_weather_provider() -> WeatherProvider:
+    """Weather provider shared by all the pipelines of the process."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = WeatherProvider()
+            logger.info(
+                f"Weather provider created (forecast cache TTL: {FORECAST_CACHE_TTL:.0f}s)."
+            )
+        return _provider
@@ -1,10 +1,11 @@
 from requests.exceptions import HTTPError, RequestException, Timeout, ConnectionError
-import requests_cache
 from retry_requests import retry
 from utils.logging_config import logger
 from download.abstract_loader import BaseAPILoader
-from typing import Optional, Dict, Any
-from utils.paths import CACHE_PATH
+from download.replay_transport import install_transport
+from typing import Optional, Dict, Any, Iterable, List
+import pandas as pd
+from download.weather_grid import CITY_CENTER, Cell, fetch_grid_weather
 
 
 class WeatherHistoryLoader(BaseAPILoader):
@@ -13,7 +14,9 @@ class WeatherHistoryLoader(BaseAPILoader):
     Inherits from BaseAPILoader and implements the abstract method `fetch_data`.
     """
 
-    def __init__(self, latitude: float = 43.6107, longitude: float = 3.8767):
+    def __init__(
+        self, latitude: float = CITY_CENTER[0], longitude: float = CITY_CENTER[1]
+    ):
         """
         Initialize WeatherHistoryLoader with caching and retry sessions.
 
@@ -21,11 +24,11 @@ class WeatherHistoryLoader(BaseAPILoader):
             latitude (float): Latitude of the location.
             longitude (float): Longitude of the location.
         """
-        cache_session = requests_cache.CachedSession(
-            CACHE_PATH / ".cache", expire_after=-1
-        )
+        # Archived weather never changes: cached forever
+        cache_session = self.cached_session(".cache", expire_after=-1)
         retry_session = retry(cache_session, retries=5, backoff_factor=0.3)
-        self.session = retry_session
+        # retry() mounts its own adapters: put the fixture transport back on top
+        self.session = install_transport(retry_session)
         self.url = "https://archive-api.open-meteo.com/v1/archive"
         self.latitude = latitude
         self.longitude = longitude
@@ -83,3 +86,56 @@ class WeatherHistoryLoader(BaseAPILoader):
             logger.error(f"Unexpected WeatherHistoryLoader error: {e}")
 
         return None
+
+    def fetch_grid(
+        self, cells: Iterable[Cell], start_date: str, end_date: str
+    ) -> Optional[pd.DataFrame]:
+        """
+        Daily weather history of several grid cells (see `download.weather_grid`).
+        Cells missing from the per-cell cache are fetched in one request with
+        comma-separated coordinates. History never changes: cached forever.
+
+        Returns:
+            pd.DataFrame: cell_lat, cell_lon, date, avg_temp, precipitation_mm, vent_max.
+            None: If an error occurs.
+        """
+
+        def fetch_batch(batch: List[Cell], start: str, end: str) -> pd.DataFrame:
+            params = {
+                "latitude": ",".join(str(lat) for lat, _ in batch),
+                "longitude": ",".join(str(lon) for _, lon in batch),
+                "start_date": start,
+                "end_date": end,
+                "daily": ["temperature_2m_mean", "precipitation_sum", "wind_speed_10m_max"],
+                "timezone": "Europe/Paris",
+            }
+            response = self.session.get(self.url, params=params, timeout=15)
+            response.raise_for_status()
+            data = response.json()
+            # A single location is returned as an object, several as a list
+            locations = data if isinstance(data, list) else [data]
+            frames = []
+            for (lat, lon), location in zip(batch, locations):
+                daily = location["daily"]
+                frames.append(
+                    pd.DataFrame(
+                        {
+                            "cell_lat": lat,
+                            "cell_lon": lon,
+                            "date": daily["time"],
+                            "avg_temp": daily["temperature_2m_mean"],
+                            "precipitation_mm": daily["precipitation_sum"],
+                            "vent_max": daily["wind_speed_10m_max"],
+                        }
+                    )
+                )
+            return pd.concat(frames, ignore_index=True)
+
+        logger.info(f"Fetching grid weather history from {start_date} to {end_date}...")
+        try:
+            return fetch_grid_weather(fetch_batch, "history", cells, start_date, end_date)
+        except RequestException as e:
+            logger.error(f"Grid weather history request failed: {e}")
+        except (KeyError, ValueError) as e:
+            logger.error(f"Unexpected grid weather history response: {e}")
+        return None
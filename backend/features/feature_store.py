@@ -0,0 +1,302 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from database.database import CounterInfo, DatabaseManager, StationFeatures
+from database.service import DatabaseService
+from download.weather_grid import WEATHER_COLUMNS, station_cells, weather_by_station
+from download.weather_provider import get_weather_provider
+from features.features_engineering import SUSPECT_COUNTERS, FeaturesEngineering
+from utils.logging_config import logger
+
+# Lags of the model: intensity 1 and 7 days before
+FEATURE_LAGS = (1, 7)
+
+
+class FeatureStoreError(Exception):
+    """The feature rows could not be written (the caller rolls them back)."""
+
+
+# Columns of a feature row, in the table order
+FEATURE_COLUMNS = [
+    c.name for c in StationFeatures.__table__.columns if c.name != "updated_at"
+]
+
+
+def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calendar, cyclical, holiday and weather features of rows that already
+    carry their lags (same FeaturesEngineering steps as the training).
+    """
+    if df.empty:
+        return df
+    return (
+        FeaturesEngineering(df)
+        .add_week_month_year()
+        .Cycliques()
+        .add_holidays_feature()
+        .add_weather_featuers()
+        .get_data()
+    )
+
+
+def add_daily_lags(
+    df: pd.DataFrame, lags: Sequence[int] = FEATURE_LAGS
+) -> pd.DataFrame:
+    """
+    Adds lag_<k>: intensity of the same station k calendar days before
+    (NaN when that day was not counted), like get_lag_matrix at prediction
+    time.
+    """
+    counts = df[["station_id", "date", "intensity"]]
+    for lag in lags:
+        shifted = counts.assign(date=counts["date"] + pd.Timedelta(days=lag))
+        df = df.merge(
+            shifted.rename(columns={"intensity": f"lag_{lag}"}),
+            on=["station_id", "date"],
+            how="left",
+        )
+    return df
+
+
+def add_cell_weather(service: DatabaseService, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces the city-wide weather of each row by the stored history of the
+    station's grid cell, like the per-cell forecast used at prediction time.
+    Days without cell history keep the city-wide weather.
+    """
+    stations = df[["station_id", "latitude", "longitude"]].drop_duplicates("station_id")
+    cells = station_cells(stations.itertuples(index=False))
+    grid = service.get_cell_weather(
+        list(cells.values()), df["date"].min(), df["date"].max()
+    )
+    if grid.empty:
+        return df
+
+    per_station = weather_by_station(cells, grid)
+    df = df.merge(
+        per_station, on=["station_id", "date"], how="left", suffixes=("", "_cell")
+    )
+    for column in WEATHER_COLUMNS:
+        df[column] = (
+            df.pop(f"{column}_cell").fillna(df[column]).astype(df[column].dtype)
+        )
+    return df
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Feature rows as plain Python values (NaN -> None) for the upsert."""
+    df = df[FEATURE_COLUMNS]
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def refresh_feature_store(
+    service: DatabaseService,
+    station_ids: Optional[Iterable[str]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> int:
+    """
+    Recomputes the stored feature rows of the counts of [start_date, end_date]
+    (whole history when no range is given), for the given stations (all by
+    default).
+
+    The rows of the following week are refreshed as well, since their lags
+    read the new counts. Only this window (plus the week before, for the
+    lags) is loaded, so a daily refresh costs a few days of data. The suspect
+    counters are removed first, as in the training feature engineering: they
+    have no training rows. Does not commit: the caller owns the transaction.
+
+    Returns:
+        int: Number of feature rows written (0 when there is nothing to do).
+
+    Raises:
+        FeatureStoreError: If the rows could not be written.
+    """
+    span = timedelta(days=max(FEATURE_LAGS))
+    frame = service.load_training_frame(
+        start_date=start_date - span if start_date is not None else None,
+        end_date=end_date + span if end_date is not None else None,
+    )
+    if frame.empty:
+        return 0
+
+    frame["station_id"] = frame["station_id"].astype(str)
+    frame = FeaturesEngineering(frame).remove_suspect_counters().get_data()
+    if station_ids is not None:
+        frame = frame[frame["station_id"].isin(set(station_ids))]
+    frame = add_daily_lags(add_cell_weather(service, frame))
+    # Older rows were only loaded as lag sources
+    if start_date is not None:
+        frame = frame[frame["date"] >= start_date]
+
+    rows = _records(engineer_features(frame))
+    if not service.upsert_station_features(rows):
+        raise FeatureStoreError(f"{len(rows)} feature rows not written.")
+    logger.info(f"Feature store refreshed: {len(rows)} rows.")
+    return len(rows)
+
+
+def backfill_feature_store(service: DatabaseService) -> int:
+    """
+    Computes the whole history of the stations the feature store does not
+    fully cover (database filled before the store existed, counts whose
+    weather arrived later...). Nothing is recomputed when the store is
+    complete. Does not commit.
+
+    Returns:
+        int: Number of feature rows written.
+
+    Raises:
+        FeatureStoreError: If the rows could not be written.
+    """
+    gaps = set(service.get_feature_store_gaps()) - set(SUSPECT_COUNTERS)
+    if not gaps:
+        return 0
+    logger.info(f"Feature store incomplete for {len(gaps)} stations: backfilling...")
+    return refresh_feature_store(service, gaps)
+
+
+def load_training_features(db_manager: DatabaseManager) -> pd.DataFrame:
+    """
+    Completes the feature store (see backfill_feature_store) and reads its
+    training rows.
+
+    Rows just written are read back through the same primary session: a
+    lagging read replica would miss them, and the model would silently train
+    on a partial store. The replica only serves stores that were complete.
+    """
+    with db_manager.get_session() as session:
+        service = DatabaseService(session)
+        if backfill_feature_store(service):
+            session.commit()
+            return service.load_station_features()
+
+    # Read-only workload: served by the read replica when one is configured
+    session = db_manager.get_read_session() or db_manager.get_session()
+    with session:
+        return DatabaseService(session).load_station_features()
+
+
+def db_weather_fallback(
+    service: DatabaseService, day: datetime, error: Exception
+) -> Optional[Dict[str, float]]:
+    """Latest weather stored in DB (J0 forecast, else last known day)."""
+    weather = service.get_latest_weather(day)
+    if weather is None:
+        logger.error(f"Weather forecast unavailable ({error}) and no weather in DB.")
+        return None
+    logger.warning(
+        f"Weather forecast unavailable ({error}): using the DB weather of {weather.date:%Y-%m-%d}."
+    )
+    return {
+        "avg_temp": weather.avg_temp,
+        "precipitation_mm": weather.precipitation_mm,
+        "vent_max": weather.vent_max,
+    }
+
+
+def forecast_by_station(
+    service: DatabaseService, stations: List[CounterInfo], day: datetime
+) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Weather of `day` per station: forecast of its grid cell through the shared
+    provider (cached per cell), or the city-wide weather stored in DB for every
+    station when the forecast is unavailable (API down, circuit breaker open
+    or run budget spent).
+    """
+    cells = station_cells((s.station_id, s.latitude, s.longitude) for s in stations)
+    day_str = day.strftime("%Y-%m-%d")
+    logger.info(
+        f"Fetching weather forecast of {day_str} ({len(set(cells.values()))} grid cells)..."
+    )
+    try:
+        grid_weather = get_weather_provider().get_forecast(
+            cells.values(), day_str, day_str, timezone="Europe/Paris"
+        )
+    except Exception as e:
+        fallback = db_weather_fallback(service, day, e)
+        return {s.station_id: fallback for s in stations}
+
+    weather_by_cell = {
+        (r["cell_lat"], r["cell_lon"]): {c: r[c] for c in WEATHER_COLUMNS}
+        for r in grid_weather.to_dict(orient="records")
+    }
+    return {
+        s.station_id: weather_by_cell.get(cells.get(s.station_id)) for s in stations
+    }
+
+
+def build_inference_features(
+    service: DatabaseService,
+    stations: List[CounterInfo],
+    day: datetime,
+    weather_by_station: Dict[str, Optional[Dict[str, float]]],
+) -> pd.DataFrame:
+    """
+    Feature rows of the day to predict (no intensity yet).
+
+    Lags are read from DB in one query. If a lag is missing (API outage), the
+    most recent known count is used instead; stations without weather or
+    without any history are skipped.
+    """
+    lag_matrix = service.get_lag_matrix(
+        [s.station_id for s in stations], day, lags=list(FEATURE_LAGS)
+    )
+
+    rows = []
+    for station in stations:
+        weather = weather_by_station.get(station.station_id)
+        if weather is None:
+            logger.warning(f"No weather for {station.station_id}. Skipping.")
+            continue
+
+        lags = lag_matrix.get(station.station_id, {})
+        values = {f"lag_{k}": lags.get(f"lag_{k}") for k in FEATURE_LAGS}
+        if any(v is None for v in values.values()):
+            fallback_value = lags.get("last_value")
+            if fallback_value is None:
+                logger.warning(
+                    f"No historical data at all for {station.station_id}. Skipping."
+                )
+                continue
+            logger.warning(
+                f"Lags missing for {station.station_id}: using the last known count."
+            )
+            values = {k: fallback_value if v is None else v for k, v in values.items()}
+
+        rows.append(
+            {
+                "date": day,
+                "station_id": station.station_id,
+                "intensity": None,  # Unknown target
+                "latitude": float(station.latitude),
+                "longitude": float(station.longitude),
+                **{c: weather[c] for c in WEATHER_COLUMNS},
+                **values,
+            }
+        )
+
+    if not rows:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+    return engineer_features(pd.DataFrame(rows))[FEATURE_COLUMNS]
+
+
+def refresh_inference_features(service: DatabaseService, day: datetime) -> int:
+    """
+    Precomputes and stores the feature rows of `day` for every station, so
+    that the prediction pipeline reads them in a single lookup. Run after the
+    daily ingestion. Does not commit.
+
+    Returns:
+        int: Number of feature rows written.
+    """
+    stations = service.get_all_stations()
+    features = build_inference_features(
+        service, stations, day, forecast_by_station(service, stations, day)
+    )
+    if features.empty or not service.upsert_station_features(_records(features)):
+        return 0
+    logger.info(f"Feature rows of {day:%Y-%m-%d} stored: {len(features)} stations.")
+    return len(features)
@@ -1,8 +1,18 @@
 import pandas as pd
 import numpy as np
 import holidays
+from utils.archive import write_archive
 from utils.paths import OUTPUT_PATH
 
+# Compteurs aux données incohérentes, exclus de l'entraînement
+SUSPECT_COUNTERS = [
+    "urn:ngsi-ld:EcoCounter:867228050089043",
+    "urn:ngsi-ld:EcoCounter:867228050089159",
+    "urn:ngsi-ld:EcoCounter:867228050089217",
+    "urn:ngsi-ld:EcoCounter:867228050089787",
+    "urn:ngsi-ld:EcoCounter:867228050092989"
+]
+
 
 class FeaturesEngineering:
     """
@@ -30,7 +40,7 @@ class FeaturesEngineering:
         
         Args:
             suspects (list): List of station_id strings to remove. 
-                             If None, uses a default hardcoded list.
+                             If None, uses SUSPECT_COUNTERS.
         
         Returns:
             self (FeaturesEngineering): method chaining
@@ -39,13 +49,7 @@ class FeaturesEngineering:
         
         # Liste par défaut fournie dans ta demande
         if suspects is None:
-            suspects = [
-                "urn:ngsi-ld:EcoCounter:867228050089043",
-                "urn:ngsi-ld:EcoCounter:867228050089159",
-                "urn:ngsi-ld:EcoCounter:867228050089217",
-                "urn:ngsi-ld:EcoCounter:867228050089787",
-                "urn:ngsi-ld:EcoCounter:867228050092989"
-            ]
+            suspects = SUSPECT_COUNTERS
 
         # On compte avant pour le log
         initial_count = len(self.df)
@@ -136,8 +140,10 @@ class FeaturesEngineering:
 
         self.df = self.df.sort_values(by=["station_id", "date"])
 
-        self.df["lag_1"] = self.df.groupby("station_id")["intensity"].shift(1)
-        self.df["lag_7"] = self.df.groupby("station_id")["intensity"].shift(7)
+        # observed=True: station_id may be categorical (streamed training data)
+        by_station = self.df.groupby("station_id", observed=True)["intensity"]
+        self.df["lag_1"] = by_station.shift(1)
+        self.df["lag_7"] = by_station.shift(7)
 
         # drop rows with missing lags
         self.df = self.df.dropna(subset=["lag_1", "lag_7"])
@@ -204,6 +210,20 @@ class FeaturesEngineering:
         self.df.to_csv(file_path, index=False)
         print(f"[INFO] File saved successfully at: {file_path}")
 
+    # -----------------------------------------------------------
+    def save(self, path: str = OUTPUT_PATH, name: str = "features_eng_data") -> None:
+        """
+        Save final dataframe with the configured archive writer
+        (Parquet by default, see `utils.archive`).
+
+        Args:
+            path (str | Path): directory where file will be saved
+            name (str): name of the output file, without extension
+        """
+        print(f"[STEP] Saving dataframe: {name}")
+        file_path = write_archive(self.df, name, path)
+        print(f"[INFO] File saved successfully at: {file_path}")
+
     # -----------------------------------------------------------
     def get_data(self) -> pd.DataFrame:
         """
@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import holidays
+from utils.archive import read_archive
 from utils.paths import OUTPUT_PATH
 
 # Display settings
@@ -222,7 +223,7 @@ class FeaturesVisualization:
 
 if __name__ == "__main__":
     # Load your dataset here
-    df = pd.read_csv(OUTPUT_PATH / "dataset_final.csv")
+    df = read_archive("dataset_final", OUTPUT_PATH)
 
     viz = FeaturesVisualization(df)
     viz.show_all_plots()
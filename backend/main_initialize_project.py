@@ -6,7 +6,7 @@ from pipelines.initialize_project import (
     merge_data,
     run_features_engineering,
 )
-from pipelines.model_training import train_model_pipeline
+from core.training_orchestrator import run_model_training
 
 
 def main():
@@ -15,8 +15,9 @@ def main():
     df_agg = clean_and_aggregate(df_trafic)
     insert_data_into_db(df_agg, df_weather, df_metadata)
     df_final = merge_data(df_agg, df_metadata, df_weather)
-    df_features = run_features_engineering(df_final)
-    train_model_pipeline(df_features)
+    run_features_engineering(df_final)
+    # Only the missing days were downloaded: train on the full history stored in DB
+    run_model_training()
 
 
 if __name__ == "__main__":
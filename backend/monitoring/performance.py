@@ -1,13 +1,15 @@
 import pandas as pd
 from datetime import datetime
+from typing import Optional
 from sqlalchemy.orm import Session
 from database.service import DatabaseService
 from utils.logging_config import logger
 
 class PerformanceMonitor:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, read_session: Optional[Session] = None):
         self.session = session
-        self.service = DatabaseService(session)
+        # Lectures sur le réplica (si configuré), écriture des métriques sur le primaire
+        self.service = DatabaseService(session, read_session=read_session)
 
     def run_daily_evaluation(self, evaluation_date: datetime):
         """
@@ -60,6 +62,16 @@ class PerformanceMonitor:
 
         logger.info(f"Performance du jour ({len(df_metrics)} stations) : MAE = {daily_mae:.2f}")
 
+        # MAE relative au trafic habituel (moyenne glissante 30 jours pré-calculée)
+        rolling_stats = self.service.get_rolling_stats(df_metrics['station_id'].tolist())
+        df_metrics['mean_30d'] = df_metrics['station_id'].map(
+            {s_id: stats.mean_30d for s_id, stats in rolling_stats.items()}
+        )
+        reference_traffic = df_metrics['mean_30d'].sum()
+        if reference_traffic > 0:
+            relative_mae = df_metrics.loc[df_metrics['mean_30d'].notna(), 'absolute_error'].sum() / reference_traffic
+            logger.info(f"Erreur relative au trafic moyen sur 30 jours : {relative_mae:.2%}")
+
         # 5. Préparation pour la sauvegarde en BDD
         # On construit la liste de dictionnaires pour le bulk_insert
         metrics_to_save = []
@@ -1,6 +1,6 @@
 import pandas as pd
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Core imports
 from core.dependencies import db_manager
@@ -8,9 +8,7 @@ from database.service import DatabaseService
 from utils.logging_config import logger
 
 # Domain imports
-from download.daily_weather_api import OpenMeteoDailyAPIC
-from utils.weather_utils import extract_daily_values
-from features.features_engineering import FeaturesEngineering
+from features.feature_store import build_inference_features, forecast_by_station
 from modeling.predictor import TrafficPredictor
 
 
@@ -19,17 +17,22 @@ def run_prediction_pipeline():
     Orchestrates the Daily Prediction Pipeline (J0).
 
     Workflow:
-    1. Fetch today's weather forecast.
-    2. Build the dataset by fetching stations and historical lags from DB.
-       -> Includes a FALLBACK strategy: if Lag-1 (Yesterday) is missing, use Lag-7.
-    3. Apply Feature Engineering (Stateless).
-    4. Run Inference (Prediction).
-    5. Save Prediction + Context to DB.
+    1. Read today's feature rows from the feature store (precomputed by the
+       daily update) in a single lookup.
+    2. Build the rows of the stations missing from the store on the fly:
+       -> Weather forecast of their grid cells, or the weather stored in DB
+          if the API is unavailable.
+       -> Lags from DB, with a FALLBACK strategy: if a lag is missing, use
+          the most recent count.
+    3. Run Inference (Prediction).
+    4. Save Prediction + Context to DB.
     """
     logger.info("Starting Daily Prediction Pipeline (J0)")
 
     session = db_manager.get_session()
-    service = DatabaseService(session)
+    # Features and stations are read from the replica (if any), predictions written to the primary
+    read_session = db_manager.get_read_session()
+    service = DatabaseService(session, read_session=read_session)
     predictor = TrafficPredictor()  # Loads model and preprocessor
 
     if not predictor.model:
@@ -39,104 +42,44 @@ def run_prediction_pipeline():
     # Key Dates setup
     # We want to predict for TODAY
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    yesterday = today - timedelta(days=1)
-    j_minus_7 = today - timedelta(days=7)
 
     today_str = today.strftime("%Y-%m-%d")
     logger.info(f"Target Date for prediction: {today_str}")
 
     try:
-        # --- STEP 1: WEATHER FORECAST (J0) ---
-        logger.info("1. Fetching Weather Forecast for today...")
-        weather_client = OpenMeteoDailyAPIC()
-
-        # Variables order MUST match extraction logic
-        vars_list = ["temperature_2m_mean", "wind_speed_10m_mean", "precipitation_sum"]
-
-        # Coordinates for Montpellier Center
-        responses = weather_client.get_weather_json(
-            latitude=43.61,
-            longitude=3.87,
-            start_date=today_str,
-            end_date=today_str,
-            daily_variables=vars_list,
-            timezone="Europe/Paris",
-        )
-
-        # Extract scalar values from SDK response
-        weather_data = extract_daily_values(responses[0])
-        logger.info(f"Weather context: {weather_data}")
-
-        # --- STEP 2: BUILD DATASET (Hybrid: DB + Weather) ---
-        logger.info("2. Fetching Stations and constructing Lags...")
-        stations = service.get_all_stations()
+        # --- STEP 1: PRECOMPUTED FEATURES (J0) ---
+        logger.info("1. Reading today's features from the feature store...")
+        df_ready = service.load_station_features(today, today, labelled=False)
 
-        rows = []
-        for station in stations:
-            # A. Retrieve J-1 (Yesterday) and J-7 (One week ago)
-            val_lag_1 = service.get_bike_count(station.station_id, yesterday)
-            val_lag_7 = service.get_bike_count(station.station_id, j_minus_7)
-
-            # B. --- ROBUST FALLBACK STRATEGY ---
-            # If specific lags are missing due to API outage, find the most recent data point.
-            if val_lag_1 is None or val_lag_7 is None:
-                logger.warning(
-                    f"Lags missing for {station.station_id}. Attempting robust fallback."
-                )
-                most_recent_count = service.get_most_recent_bike_count(
-                    station.station_id
-                )
+        # --- STEP 2: MISSING STATIONS (Weather + Lags + Feature Engineering) ---
+        stations = service.get_all_stations()
+        stored = set(df_ready["station_id"])
+        missing = [s for s in stations if s.station_id not in stored]
+        if missing:
+            logger.info(f"2. Building the features of {len(missing)} stations...")
+            built = build_inference_features(
+                service, missing, today, forecast_by_station(service, missing, today)
+            )
+            df_ready = (
+                built
+                if df_ready.empty
+                else pd.concat([df_ready, built], ignore_index=True)
+            )
 
-                if most_recent_count is None:
-                    logger.warning(
-                        f"No historical data at all for {station.station_id}. Skipping."
-                    )
-                    continue  # Skip this station if there is NO history at all
-
-                fallback_value = most_recent_count.intensity
-                val_lag_1 = val_lag_1 if val_lag_1 is not None else fallback_value
-                val_lag_7 = val_lag_7 if val_lag_7 is not None else fallback_value
-
-            # C. Build the row
-            row = {
-                "date": today,
-                "station_id": station.station_id,
-                "latitude": float(station.latitude),
-                "longitude": float(station.longitude),
-                # Broadcasted Weather
-                "avg_temp": weather_data["avg_temp"],
-                "precipitation_mm": weather_data["precipitation_mm"],
-                "vent_max": weather_data["vent_max"],
-                # Injected Lags
-                "lag_1": val_lag_1,
-                "lag_7": val_lag_7,
-                "intensity": 0,  # Placeholder target (unknown)
-            }
-            rows.append(row)
-
-        if not rows:
+        if df_ready.empty:
             logger.warning(
                 "No complete station data found (even with fallback). Check DB population."
             )
             return
 
-        df_input = pd.DataFrame(rows)
-        logger.info(f"Raw dataset ready: {len(df_input)} rows.")
+        logger.info(f"Dataset ready: {len(df_ready)} rows ({len(stored)} precomputed).")
 
-        # --- STEP 3: FEATURE ENGINEERING ---
-        # We reuse the existing class logic but SKIP .lag() method
-        fe = FeaturesEngineering(df_input)
-        fe.add_week_month_year().Cycliques().add_weather_featuers().add_holidays_feature()
-        # .lag() -> DO NOT CALL HERE (columns already exist)
-
-        df_ready = fe.get_data()
-
-        # --- STEP 4: INFERENCE & SAVE ---
+        # --- STEP 3: INFERENCE & SAVE ---
         logger.info("3. Running Inference & Saving...")
         df_pred = predictor.predict_batch(df_ready)
 
         if df_pred is not None:
-            count = 0
+            records = []
             for _, row in df_pred.iterrows():
                 # Prepare Prediction Object
                 pred_data = {
@@ -146,8 +89,9 @@ def run_prediction_pipeline():
                     "model_version": "xgboost_v1",
                 }
 
-                # Prepare Context JSON (for MLOps lineage)
-                # Drop technical columns to keep JSON clean
+                # Prepare feature context (for MLOps lineage): values shared by all
+                # stations are stored once per day, the others as a float32 vector
+                # Drop technical columns to keep the context clean
                 cols_drop = ["predicted_intensity", "date", "station_id", "intensity"]
                 features_dict = row.drop(cols_drop, errors="ignore").to_dict()
 
@@ -156,19 +100,22 @@ def run_prediction_pipeline():
                     k: str(v) if isinstance(v, (pd.Timestamp, datetime)) else v
                     for k, v in features_dict.items()
                 }
-
-                # Transactional save
-                if service.save_prediction_single_with_context(
-                    pred_data, features_clean
-                ):
-                    count += 1
-
-            logger.info(f"Completed: {count} predictions saved.")
+                records.append((pred_data, features_clean))
+
+            # Transactional save: the whole run in one commit
+            if service.save_predictions_batch_with_context(records):
+                logger.info(f"Completed: {len(records)} predictions saved.")
+            else:
+                logger.error(
+                    "Completed: no prediction saved (transaction rolled back)."
+                )
 
     except Exception as e:
         logger.error(f"Critical Error in Daily Pipeline: {e}", exc_info=True)
     finally:
         session.close()
+        if read_session is not None:
+            read_session.close()
 
 
 if __name__ == "__main__":
@@ -2,29 +2,35 @@ from datetime import datetime, timedelta
 import pandas as pd
 
 # Imports pour la récupération de données (Legacy du collègue)
-from download.daily_weather_api import OpenMeteoDailyAPIC
+from download.weather_grid import CITY_CENTER, station_cells
+from download.weather_provider import get_weather_provider
+from download.circuit_breaker import ExternalApiUnavailable
 from download.ecocounters_ids import EncountersIDsLoader
 from download.weeather_api import WeatherHistoryLoader
 from src.api_data_processing import (
     extract_station_metadata,
-    fetch_and_extract_timeseries,
     extract_weather_fields,
-    extract_daily_weather
 )
 
 # Imports pour la base de données et logs
-from pipelines.data_insertion import insert_data_to_db
+from database.service import DatabaseService
+from features.feature_store import refresh_inference_features
+from pipelines.data_insertion import backfill_rollups, insert_data_to_db
+from pipelines.incremental_ingestion import fetch_incremental_traffic
 from utils.logging_config import logger
 from core.dependencies import db_manager 
 from monitoring.performance import PerformanceMonitor
 
 
-def fetch_data_for_date(target_date: datetime):
+def fetch_incremental_data(end_date: datetime):
     """
-    Download traffic and weather data for a specific date.
-    This function is used by the daily update pipeline.
+    Download only the data missing from the database, up to `end_date`.
+
+    Each station is fetched from the day after its ingestion watermark, so
+    missed days after an outage are caught up. The weather history covers
+    the earliest day requested.
     """
-    logger.info(f"Téléchargement des données pour le {target_date.strftime('%Y-%m-%d')}...")
+    end_str = end_date.strftime("%Y-%m-%d")
 
     # 1. Récupération des IDs et Métadonnées
     df_metadata, ids = extract_station_metadata(EncountersIDsLoader().fetch_data())
@@ -32,16 +38,19 @@ def fetch_data_for_date(target_date: datetime):
         logger.warning("No station IDs found.")
         return None, None, None
 
-    date_str = target_date.strftime("%Y-%m-%d")
-
-    # 2. Récupération du Trafic (J-1)
-    df_trafic = fetch_and_extract_timeseries(
-        ids, start_date=date_str, end_date=date_str
+    # 2. Trafic manquant, par station, agrégé par jour en streaming
+    # (fenêtres de plusieurs jours possibles après une panne)
+    df_trafic, earliest = fetch_incremental_traffic(
+        ids, end_date=end_str, aggregate=True
     )
-    
-    # 3. Récupération de l'Historique Météo (J-1)
+    if earliest is None:
+        return None, None, df_metadata
+    if df_trafic.empty:
+        df_trafic = None
+
+    # 3. Historique Météo sur la même période
     df_weather = extract_weather_fields(
-        WeatherHistoryLoader().fetch_data(start_date=date_str, end_date=date_str)
+        WeatherHistoryLoader().fetch_data(start_date=earliest, end_date=end_str)
     )
 
     return df_trafic, df_weather, df_metadata
@@ -50,10 +59,12 @@ def fetch_data_for_date(target_date: datetime):
 def run_daily_update():
     """
     Orchestrates the daily update pipeline.
-    1. Fetches yesterday's traffic (J-1).
+    1. Fetches the traffic missing since each station's watermark, up to yesterday (J-1).
     2. Fetches today's weather forecast.
-    3. Inserts everything into DB.
-    4. Runs Monitoring to compare J-1 predictions vs reality.
+    3. Inserts everything into DB (the feature store follows the new counts)
+       and completes the dashboard rollups.
+    4. Precomputes today's feature rows (J0) for the prediction pipeline.
+    5. Runs Monitoring to compare J-1 predictions vs reality.
     """
 
     logger.info("--- Starting the daily update pipeline ---")
@@ -65,24 +76,46 @@ def run_daily_update():
 
     try:
         # --- ETAPE 1 : RECUPERATION DES DONNEES ---
-        # Fetch daily aggregated data (Trafic J-1)
-        df_traffic, df_weather, df_metadata = fetch_data_for_date(yesterday)
-        logger.info("Fetched traffic, weather and metadata successfully.")
-
-        # Fetch OpenMeteo daily weather (Forecast J0)
+        # Fetch daily aggregated data (Trafic since the watermarks, up to J-1)
+        try:
+            df_traffic, df_weather, df_metadata = fetch_incremental_data(yesterday)
+            logger.info("Fetched traffic, weather and metadata successfully.")
+        except ExternalApiUnavailable as e:
+            # Fail fast: the watermarks are unchanged, the next run catches up
+            logger.warning(f"APIs unavailable ({e}): keeping the data already in DB.")
+            df_traffic = df_weather = df_metadata = None
+
+        # Fetch OpenMeteo daily weather (Forecast J0): one batched request for
+        # the city center (weather table) and the stations' grid cells, which
+        # warms the shared provider used by the prediction pipeline
         logger.info("Fetching daily weather from OpenMeteo API...")
-        client = OpenMeteoDailyAPIC()
+        provider = get_weather_provider()
 
         today_str = datetime.now().strftime("%Y-%m-%d")
-        json_response = client.get_weather_json(
-            latitude=43.6109,
-            longitude=3.8763,
-            start_date=today_str,
-            end_date=today_str,
-        )
-
-        df_daily_weather = extract_daily_weather(json_response)
-        logger.info(f"Fetched OpenMeteo daily weather. Rows: {len(df_daily_weather)}")
+        cells = [CITY_CENTER]
+        if df_metadata is not None:
+            cells += station_cells(
+                df_metadata[["station_id", "latitude", "longitude"]].itertuples(
+                    index=False
+                )
+            ).values()
+        try:
+            grid_weather = provider.get_forecast(cells, today_str, today_str)
+
+            center = grid_weather[
+                (grid_weather["cell_lat"] == CITY_CENTER[0])
+                & (grid_weather["cell_lon"] == CITY_CENTER[1])
+            ]
+            df_daily_weather = center[
+                ["date", "avg_temp", "vent_max", "precipitation_mm"]
+            ]
+            logger.info(
+                f"Fetched OpenMeteo daily weather. Rows: {len(df_daily_weather)}"
+            )
+        except Exception as e:
+            # The predictor falls back to the weather stored in DB
+            logger.warning(f"Daily forecast unavailable: {e}")
+            df_daily_weather = None
 
         # --- ETAPE 2 : INSERTION EN BASE ---
         # Prepare datasets for insertion
@@ -100,25 +133,49 @@ def run_daily_update():
 
             if has_data:
                 logger.info(f"Inserting {name} into DB...")
-                insert_data_to_db(traffic_df, weather_df, metadata_df)
-                logger.info(f"{name} inserted successfully.")
+                if insert_data_to_db(traffic_df, weather_df, metadata_df):
+                    logger.info(f"{name} inserted successfully.")
+                else:
+                    logger.error(f"{name} not inserted: the next run fetches it again.")
             else:
                 logger.warning(f"{name} is empty or None → Skipping.")
 
         logger.info("Daily data update completed.")
 
+        # Rollups of the weeks and stations the incremental refresh missed
+        # (no-op once complete)
+        if not backfill_rollups():
+            logger.error("Rollups not backfilled: the next run tries again.")
+
+        # --- ETAPE 2b : FEATURE STORE (J0) ---
+        # Today's feature rows (lags J-1/J-7, forecast of each grid cell from
+        # the warm provider): the prediction pipeline reads them in one lookup
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        session = db_manager.get_session()
+        try:
+            refresh_inference_features(DatabaseService(session), today)
+            session.commit()
+        except Exception as e:
+            logger.error(f"Feature store (J0) not refreshed: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
         # --- ETAPE 3 : MONITORING (Feedback Loop) ---
         logger.info("--- Démarrage du Monitoring (Comparaison J-1) ---")
         
         session = db_manager.get_session()
+        read_session = db_manager.get_read_session()
         try:
-            monitor = PerformanceMonitor(session)
+            monitor = PerformanceMonitor(session, read_session=read_session)
             # On évalue la performance pour la date 'yesterday'
             monitor.run_daily_evaluation(yesterday)
         except Exception as e:
             logger.error(f"Erreur lors du monitoring : {e}")
         finally:
             session.close()
+            if read_session is not None:
+                read_session.close()
             
         logger.info("Daily pipeline finished.")
 
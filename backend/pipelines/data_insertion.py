@@ -4,17 +4,169 @@ from database.database import CounterInfo
 from sqlalchemy.exc import SQLAlchemyError
 from core.dependencies import db_manager
 from utils.logging_config import logger
-from download.geocoding_service import get_street_name_from_coords
+from download.circuit_breaker import ExternalApiUnavailable
+from download.geocoding_service import resolve_street_names
+from download.weather_grid import WEATHER_COLUMNS, station_cells
+from download.weeather_api import WeatherHistoryLoader
+from features.feature_store import refresh_feature_store
+from utils.async_utils import run_sync
+from typing import Dict, List, Optional
+
+
+def geocode_new_counters(df_metadata: pd.DataFrame) -> List[Dict]:
+    """
+    Finds the counters missing from the database and resolves their street
+    names. Runs before the insertion transaction: the (slow, rate-limited)
+    Nominatim calls never hold a database session open.
+    """
+    # Retrieve all IDs already in the database to avoid unnecessary API calls.
+    session = db_manager.get_session()
+    try:
+        existing_ids = {
+            res[0] for res in session.query(CounterInfo.station_id).all()
+        }
+    finally:
+        session.close()
+
+    # If the counter is NOT in the database, it's a new one! (first row wins)
+    new_counters = {}
+    for _, row in df_metadata.iterrows():
+        station_id = str(row["station_id"])
+        if station_id not in existing_ids and station_id not in new_counters:
+            new_counters[station_id] = (row["latitude"], row["longitude"])
+
+    if not new_counters:
+        return []
+
+    logger.info(f"Geocoding of {len(new_counters)} new counters...")
+    # Disk cache first, then Nominatim (rate-limited, concurrent)
+    street_names = run_sync(resolve_street_names(new_counters))
+
+    return [
+        {
+            "station_id": station_id,
+            "latitude": lat,
+            "longitude": lon,
+            # Fallback if API fails or finds nothing
+            "name": street_names.get(station_id) or f"Compteur {station_id}",
+        }
+        for station_id, (lat, lon) in new_counters.items()
+    ]
+
+
+def fetch_cell_weather(
+    df_agg: pd.DataFrame, df_metadata: pd.DataFrame = None
+) -> Optional[pd.DataFrame]:
+    """
+    Weather history of the grid cells of the ingested stations, over the
+    ingested days (one batched request, cached per cell). Runs before the
+    insertion transaction, like the geocoding.
+
+    Returns None when it cannot be fetched: the feature store then keeps the
+    city-wide weather of these days.
+    """
+    station_ids = set(df_agg["station_id"].astype(str))
+
+    # Coordinates stored in the database (those of the feature store), else
+    # those of the API metadata for the new counters
+    session = db_manager.get_session()
+    try:
+        coords = {
+            station_id: (lat, lon)
+            for station_id, lat, lon in session.query(
+                CounterInfo.station_id, CounterInfo.latitude, CounterInfo.longitude
+            ).filter(CounterInfo.station_id.in_(station_ids))
+        }
+    finally:
+        session.close()
+    if df_metadata is not None:
+        for _, row in df_metadata.iterrows():
+            station_id = str(row["station_id"])
+            if station_id in station_ids and station_id not in coords:
+                coords[station_id] = (row["latitude"], row["longitude"])
+
+    cells = station_cells((s, lat, lon) for s, (lat, lon) in coords.items())
+    if not cells:
+        return None
+
+    dates = pd.to_datetime(df_agg["date"])
+    try:
+        return WeatherHistoryLoader().fetch_grid(
+            cells.values(),
+            dates.min().strftime("%Y-%m-%d"),
+            dates.max().strftime("%Y-%m-%d"),
+        )
+    except ExternalApiUnavailable as e:
+        logger.warning(f"Grid weather history unavailable: {e}")
+        return None
+
+
+def backfill_rollups() -> bool:
+    """
+    Completes the dashboard rollups in their own transaction: the daily
+    insertions only rebuild the weeks of their new counts.
+
+    Returns:
+        bool: True if the rollups are complete.
+    """
+    session = db_manager.get_session()
+    try:
+        if not DatabaseService(session).backfill_rollups():
+            session.rollback()
+            return False
+        session.commit()
+        return True
+    except SQLAlchemyError as e:
+        logger.error(f"A database error has occurred: {e}", exc_info=True)
+        session.rollback()
+        return False
+    finally:
+        session.close()
+
+
+def _rollback(session, step: str) -> bool:
+    """Undoes the whole insertion: no watermark moves past unsaved days."""
+    logger.error(f"{step} failed: rolling back the insertion (watermarks unchanged).")
+    session.rollback()
+    return False
 
 
 def insert_data_to_db(
     df_agg: pd.DataFrame = None,
     df_weather: pd.DataFrame = None,
     df_metadata: pd.DataFrame = None,
-):
+) -> bool:
     """
     Inserts data into the database. Handles None inputs safely.
+
+    Everything is written in one transaction: if any write fails, nothing is
+    committed, so the ingestion watermarks never skip days that were not
+    stored (the next run fetches them again).
+
+    Returns:
+        bool: True if the transaction was committed.
     """
+    # 0. Geocoding of the new counters, outside of the transaction
+    new_counters_list = []
+    if df_metadata is not None and not df_metadata.empty:
+        logger.info("Verification of new counters for geocoding...")
+        try:
+            new_counters_list = geocode_new_counters(df_metadata)
+        except SQLAlchemyError as e:
+            logger.error(f"A database error has occurred: {e}", exc_info=True)
+            return False
+    else:
+        logger.info("No metadata to insert (None or empty).")
+
+    # Weather of the stations' grid cells, outside of the transaction too
+    df_cell_weather = None
+    if df_agg is not None and not df_agg.empty:
+        try:
+            df_cell_weather = fetch_cell_weather(df_agg, df_metadata)
+        except SQLAlchemyError as e:
+            logger.error(f"A database error has occurred: {e}", exc_info=True)
+            return False
+
     # Setup database connection
     logger.info("Getting a database session...")
     session = db_manager.get_session()
@@ -22,62 +174,46 @@ def insert_data_to_db(
     try:
         service = DatabaseService(session)
 
-        # 1. Counters (Metadata) & Geocoding
-        if df_metadata is not None and not df_metadata.empty:
-            logger.info("Verification of new counters for geocoding...")
-
-            # Retrieve all IDs already in the database to avoid unnecessary API calls.
-            existing_ids = {
-                res[0] for res in session.query(CounterInfo.station_id).all()
-            }
-
-            new_counters_list = []
-
-            # We iterate over the DataFrame to process the counters one by one.
-            for _, row in df_metadata.iterrows():
-                station_id = str(row["station_id"])
-
-                # If the counter is NOT in the database, it's a new one!
-                if station_id not in existing_ids:
-                    lat = row["latitude"]
-                    lon = row["longitude"]
-
-                    logger.info(f"Geocoding of the new counter: {station_id}...")
-
-                    # Call to the Nominatim API (with pause included in the function)
-                    street_name = get_street_name_from_coords(lat, lon)
-
-                    # Fallback if API fails or finds nothing
-                    final_name = (
-                        street_name if street_name else f"Compteur {station_id}"
-                    )
-
-                    new_counters_list.append(
-                        {
-                            "station_id": station_id,
-                            "latitude": lat,
-                            "longitude": lon,
-                            "name": final_name,
-                        }
-                    )
-
-            # Insert only if new counters have been found
-            if new_counters_list:
-                logger.info(
-                    f"Insertion of {len(new_counters_list)} new counters with street names..."
-                )
-                service.add_counter_infos(new_counters_list)
-            else:
-                logger.info("No new counter detected (no geocoding required).")
-
-        else:
-            logger.info("No metadata to insert (None or empty).")
+        # 1. Counters (Metadata)
+        if new_counters_list:
+            logger.info(
+                f"Insertion of {len(new_counters_list)} new counters with street names..."
+            )
+            if not service.add_counter_infos(new_counters_list):
+                return _rollback(session, "Counters insertion")
+        elif df_metadata is not None and not df_metadata.empty:
+            logger.info("No new counter detected (no geocoding required).")
 
         # 2. Traffic (BikeCount)
+        ingested = None
         if df_agg is not None and not df_agg.empty:
             counts_data = df_agg.to_dict(orient="records")
             logger.info(f"Envoi de {len(counts_data)} données de trafic...")
-            service.add_bike_counts(counts_data)
+            if not service.add_bike_counts(counts_data):
+                return _rollback(session, "Traffic insertion")
+
+            # Keep the dashboard rollups in sync with the new counts
+            dates = pd.to_datetime(df_agg["date"])
+            if dates.dt.tz is not None:
+                dates = dates.dt.tz_localize(None)
+            if not service.update_rollups(
+                df_agg["station_id"].astype(str).unique().tolist(),
+                dates.min().to_pydatetime(),
+                dates.max().to_pydatetime(),
+            ):
+                return _rollback(session, "Rollups refresh")
+
+            # Advance the per-station ingestion watermarks (same transaction)
+            last_dates = dates.groupby(df_agg["station_id"].astype(str)).max()
+            if not service.update_ingestion_watermarks(
+                {s_id: d.to_pydatetime() for s_id, d in last_dates.items()}
+            ):
+                return _rollback(session, "Watermarks update")
+            ingested = (
+                list(last_dates.index),
+                dates.min().to_pydatetime(),
+                dates.max().to_pydatetime(),
+            )
         else:
             logger.info("No traffic data to insert.")
 
@@ -85,19 +221,46 @@ def insert_data_to_db(
         if df_weather is not None and not df_weather.empty:
             weather_data = df_weather.to_dict(orient="records")
             logger.info(f"Envoi de {len(weather_data)} données météo...")
-            service.add_weather_data(weather_data)
+            if not service.add_weather_data(weather_data):
+                return _rollback(session, "Weather insertion")
         else:
             logger.info("No weather data to insert.")
 
+        if df_cell_weather is not None and not df_cell_weather.empty:
+            # Days not published yet by the archive keep the city-wide weather
+            cell_data = df_cell_weather.dropna(subset=WEATHER_COLUMNS).to_dict(
+                orient="records"
+            )
+            logger.info(f"Envoi de {len(cell_data)} données météo par maille...")
+            if not service.add_cell_weather(cell_data):
+                return _rollback(session, "Cell weather insertion")
+
+        # 4. Feature store: rows of the new counts (needs their weather).
+        # Derived data: a failed refresh is undone alone (savepoint) and
+        # never blocks the counts, backfill_feature_store completes it later
+        if ingested is not None:
+            try:
+                with session.begin_nested():
+                    refresh_feature_store(service, *ingested)
+            except Exception as e:
+                logger.error(
+                    f"Feature store not refreshed ({e}): left to the backfill.",
+                    exc_info=True,
+                )
+
         logger.info("Commit transaction...")
         session.commit()
         logger.info("Data insertion process completed successfully.")
+        return True
 
     except SQLAlchemyError as e:
         logger.error(f"A database error has occurred: {e}", exc_info=True)
         session.rollback()
+        return False
     except Exception as e:
         logger.error(f"An unexpected error has occurred: {e}", exc_info=True)
+        session.rollback()
+        return False
     finally:
         session.close()
         logger.info("Session closed.")
\ No newline at end of file
@@ -0,0 +1,90 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.dependencies import db_manager
+from database.service import DatabaseService
+from src.api_data_processing import (
+    fetch_and_aggregate_timeseries_windows,
+    fetch_and_extract_timeseries_windows,
+)
+from utils.logging_config import logger
+
+# First day of the Ecocounter history, used for stations never ingested
+HISTORY_START_DATE = "2022-12-24"
+
+
+def plan_ingestion_windows(
+    station_ids: List[str],
+    watermarks: Dict[str, datetime],
+    end_date: str,
+    default_start: str = HISTORY_START_DATE,
+) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Computes the date range to download for each station: from the day after
+    its watermark (or `default_start`) to `end_date`. Stations already up to
+    date are left out, and stations sharing the same range are grouped so that
+    each window is requested once.
+
+    Returns:
+        Dict[Tuple[str, str], List[str]]: {(start_date, end_date): [station_id, ...]}
+    """
+    end = pd.to_datetime(end_date).normalize()
+    windows: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    for station_id in station_ids:
+        last_date = watermarks.get(station_id)
+        start = (
+            pd.Timestamp(last_date).normalize() + timedelta(days=1)
+            if last_date is not None
+            else pd.to_datetime(default_start)
+        )
+        if start > end:
+            continue
+        windows[(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))].append(
+            station_id
+        )
+    return dict(windows)
+
+
+def fetch_incremental_traffic(
+    station_ids: List[str],
+    end_date: str,
+    default_start: str = HISTORY_START_DATE,
+    aggregate: bool = False,
+) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Downloads only the traffic not yet stored in the database, per station.
+
+    With `aggregate`, the responses are streamed and reduced to daily counts
+    on the fly (`agregate_stream`) instead of building the raw hourly frame.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[str]]: the raw timeseries (or daily
+        counts with `aggregate`) as (station_id, date, intensity) and the
+        earliest day requested (None if every station is up to date).
+    """
+    session = db_manager.get_session()
+    try:
+        watermarks = DatabaseService(session).get_ingestion_watermarks(station_ids)
+    except SQLAlchemyError as e:
+        # Database not initialized yet: full history
+        logger.warning(f"No ingestion watermarks available ({e}). Full download.")
+        watermarks = {}
+    finally:
+        session.close()
+
+    windows = plan_ingestion_windows(station_ids, watermarks, end_date, default_start)
+    if not windows:
+        logger.info("All stations are up to date. Nothing to download.")
+        return pd.DataFrame(columns=["station_id", "date", "intensity"]), None
+
+    for (start, end), ids in windows.items():
+        logger.info(f"Ingestion window {start} -> {end}: {len(ids)} stations.")
+
+    earliest = min(start for start, _ in windows)
+    if aggregate:
+        return fetch_and_aggregate_timeseries_windows(windows), earliest
+    return fetch_and_extract_timeseries_windows(windows), earliest
@@ -4,7 +4,6 @@ from src.data_exploration import Statistics
 from src.data_cleaner import drop_duplicate, agregate
 from src.api_data_processing import (
     extract_station_metadata,
-    fetch_and_extract_timeseries,
     extract_weather_fields,
 )
 from src.data_merger import (
@@ -14,12 +13,19 @@ from src.data_merger import (
 from features.features_engineering import FeaturesEngineering
 import pandas as pd
 from core.dependencies import db_manager
-from pipelines.data_insertion import insert_data_to_db
+from features.feature_store import load_training_features
+from pipelines.data_insertion import backfill_rollups, insert_data_to_db
+from pipelines.incremental_ingestion import fetch_incremental_traffic
+from datetime import datetime, timedelta
 from utils.logging_config import logger
 
 
 def fetch_data_from_apis():
-    """Fetch trafic, weather, and metadata from APIs"""
+    """
+    Fetch trafic, weather, and metadata from APIs.
+    Only the days missing from the database are downloaded (per-station
+    ingestion watermarks): a re-initialization does not pull the whole history again.
+    """
     logger.info("STEP 1 - Fetching data from APIs...")
     print("Fetching data...")
 
@@ -32,10 +38,17 @@ def fetch_data_from_apis():
             print("No station IDs found.")
             return None, None, None
 
-        df_trafic = fetch_and_extract_timeseries(ids)
+        end_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        df_trafic, earliest = fetch_incremental_traffic(ids, end_date=end_date)
         logger.info("Fetched trafic time-series.")
 
-        df_weather = extract_weather_fields(WeatherHistoryLoader().fetch_data())
+        if earliest is None:
+            logger.info("Database already up to date.")
+            return None, None, df_metadata
+
+        df_weather = extract_weather_fields(
+            WeatherHistoryLoader().fetch_data(start_date=earliest, end_date=end_date)
+        )
         logger.info("Fetched weather data.")
 
         print("Data fetching done.\n")
@@ -114,9 +127,15 @@ def insert_data_into_db(df_agg, df_weather, df_metadata) -> bool:
     try:
         logger.info("Inserting trafic, weather, and metadata into DB...")
         print("Inserting trafic, weather, and metadata into DB...")
-        insert_data_to_db(df_agg, df_weather, df_metadata)
+        if not insert_data_to_db(df_agg, df_weather, df_metadata):
+            logger.error("Database insertion failed (transaction rolled back).")
+            print("Database insertion failed (transaction rolled back).")
+            return False
         logger.info("Database insertion completed successfully.")
         print("Database insertion completed successfully.")
+        # History stored before the rollup tables existed
+        if not backfill_rollups():
+            logger.error("Rollups not backfilled: the daily update tries again.")
         return True
     except Exception as e:
         logger.error(f"Error while inserting data into DB: {e}")
@@ -146,8 +165,10 @@ def merge_data(df_agg, df_metadata, df_weather):
 
 def run_features_engineering(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Apply feature engineering to the final merged dataset.
-    Returns the processed dataframe ready for modeling.
+    Exports the features ready for modeling: the rows of the feature store
+    (filled by the insertion step, backfilled for the history it does not
+    cover), or feature engineering applied to the final merged dataset when
+    the store is empty.
     """
     logger.info("STEP 6 - Running feature engineering...")
 
@@ -157,13 +178,21 @@ def run_features_engineering(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
     try:
-        print("[STEP] Running feature engineering...")
-        fe = FeaturesEngineering(df)
+        # The insertion step filled the feature store: complete it with the
+        # history it does not cover yet, then export it as is
+        df_store = load_training_features(db_manager)
+
+        if not df_store.empty:
+            print("[STEP] Reading features from the feature store...")
+            fe = FeaturesEngineering(df_store)
+        else:
+            print("[STEP] Running feature engineering...")
+            fe = FeaturesEngineering(df)
 
-        fe.add_week_month_year().Cycliques().add_weather_featuers().lag().add_holidays_feature().remove_suspect_counters()
+            fe.add_week_month_year().Cycliques().add_weather_featuers().lag().add_holidays_feature().remove_suspect_counters()
 
         final_df_features = fe.get_data()
-        fe.save_to_csv(filename="features_ready_for_training.csv")
+        fe.save(name="features_ready_for_training")
 
         print("[INFO] Feature engineering completed. Sample:")
         print(final_df_features.head(2))
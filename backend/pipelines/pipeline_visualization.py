@@ -1,25 +1,25 @@
-import pandas as pd
+from utils.archive import read_archive
 from utils.paths import OUTPUT_PATH
 from features.features_visualization import FeaturesVisualization
 from utils.logging_config import logger
 
 
-def create_features_from_csv(filename="dataset_final.csv"):
+def create_features_from_archive(name="dataset_final"):
     """
-    Load CSV file and return FeaturesVisualization instance.
+    Load the archived dataset (Parquet, memory-mapped, or legacy CSV) and
+    return FeaturesVisualization instance.
 
     Args:
-        filename (str): Name of the CSV file in OUTPUT_PATH.
+        name (str): Name of the archive in OUTPUT_PATH, without extension.
 
     Returns:
         FeaturesVisualization instance or None if file not found.
     """
-    file_path = OUTPUT_PATH / filename
     try:
-        df = pd.read_csv(file_path)
-        logger.info(f"CSV loaded successfully: {file_path}")
-    except FileNotFoundError:
-        logger.error(f"File not found: {file_path}")
+        df = read_archive(name, OUTPUT_PATH)
+        logger.info(f"Dataset loaded successfully: {name} ({len(df)} rows)")
+    except FileNotFoundError as e:
+        logger.error(str(e))
         return None
 
     fv = FeaturesVisualization(df)
@@ -69,7 +69,7 @@ def main():
     """
     Main function to run feature visualization interactively.
     """
-    fv_instance = create_features_from_csv()
+    fv_instance = create_features_from_archive()
 
     if fv_instance is None:
         logger.error("Cannot proceed without data. Exiting.")
@@ -1,5 +1,12 @@
+import os
+from datetime import datetime, timedelta
+
+from core.dependencies import db_manager
+from database.service import DatabaseService
 from .daily_update import run_daily_update
 from .daily_predictor import run_prediction_pipeline
+from download.circuit_breaker import request_budget
+from download.weather_provider import get_weather_provider
 from utils.logging_config import logger
 
 
@@ -8,13 +15,41 @@ def run_full_daily_process():
     logger.info("CRON START: Start of the automatic daily process.")
 
     try:
-        logger.info("Step 1/2: Updating data...")
-        run_daily_update()
+        # Shared time/request budget of the external APIs: once spent (or once
+        # a circuit breaker opens) the pipelines fall back to the DB data
+        with request_budget():
+            logger.info("Step 1/2: Updating data...")
+            run_daily_update()
 
-        logger.info("Step 2/2: Making predictions...")
-        run_prediction_pipeline()
+            logger.info("Step 2/2: Making predictions...")
+            run_prediction_pipeline()
 
+        weather = get_weather_provider().stats()
+        logger.info(
+            f"Weather provider: {weather['hits']} hits, {weather['misses']} misses."
+        )
         logger.info("CRON END: Daily process completed successfully.")
 
     except Exception as e:
         logger.error(f"CRON ERROR: An error occurred during the daily process: {e}")
+
+
+def run_features_archival():
+    """Scheduled task: moves features_data rows older than the retention period to the archive."""
+    retention_days = int(os.getenv("FEATURES_RETENTION_DAYS", "365"))
+    older_than = datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timedelta(days=retention_days)
+    logger.info(
+        f"CRON START: Archiving features_data older than {older_than:%Y-%m-%d}."
+    )
+
+    session = db_manager.get_session()
+    try:
+        archived = DatabaseService(session).archive_features_data(older_than)
+        if archived < 0:
+            logger.error("CRON ERROR: features_data archival failed.")
+        else:
+            logger.info(f"CRON END: {archived} features_data rows archived.")
+    finally:
+        session.close()
@@ -1,14 +1,25 @@
+import os
+import numpy as np
 import pandas as pd
-from download.trafic_history_api import EcoCounterTimeseriesLoader
+from download.trafic_history_api import EcoCounterTimeseriesLoader, as_intensity_array
+from src.data_cleaner import agregate_stream
+from utils.archive import ARCHIVE_FORMAT, write_archive
 from utils.paths import ARCHIVE_PATH
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from typing import Any
 
+# Archive of the raw timeseries: "parquet", "csv" or "none" (default ARCHIVE_FORMAT)
+TIMESERIES_ARCHIVE_FORMAT = os.getenv(
+    "TIMESERIES_ARCHIVE_FORMAT", ARCHIVE_FORMAT
+).lower()
+if TIMESERIES_ARCHIVE_FORMAT == "none":
+    TIMESERIES_ARCHIVE_FORMAT = None
+
 
 def extract_station_metadata(data: List[Dict]) -> Tuple[pd.DataFrame, List[str]]:
     """
     Extract station metadata (IDs, latitude, longitude) from raw JSON data
-    and save to CSV.
+    and archive it (see `utils.archive`).
 
     Args:
         data (List[Dict]): JSON data from EncountersIDsLoader.
@@ -41,8 +52,7 @@ def extract_station_metadata(data: List[Dict]) -> Tuple[pd.DataFrame, List[str]]
         stations_list.append(station_data)
 
     df = pd.DataFrame(stations_list)
-    output_path = ARCHIVE_PATH / "stations_metadata.csv"
-    df.to_csv(output_path, index=False)
+    output_path = write_archive(df, "stations_metadata", ARCHIVE_PATH)
     print(f"Station metadata saved into: {output_path}")
     print("Sample of station metadata:")
     print(df.head())
@@ -53,7 +63,7 @@ def fetch_and_extract_timeseries(
     ids_list: List[str], start_date: str = "2022-12-24", end_date: str = "2025-12-04"
 ) -> pd.DataFrame:
     """
-    Fetch timeseries data for each station ID and save to CSV.
+    Fetch timeseries data for each station ID and archive it.
 
     Args:
         ids_list (List[str]): List of station IDs.
@@ -72,32 +82,115 @@ def fetch_and_extract_timeseries(
         timeout=5,
         retries=3,
     )
+    return timeseries_to_dataframe(responses_dict)
+
+
+def fetch_and_extract_timeseries_windows(
+    windows: Dict[Tuple[str, str], List[str]],
+) -> pd.DataFrame:
+    """
+    Fetch timeseries data with one date range per group of stations and archive it.
+
+    Args:
+        windows (Dict[Tuple[str, str], List[str]]): {(start_date, end_date): station IDs}.
+
+    Returns:
+        pd.DataFrame: DataFrame containing all stations' timeseries data.
+    """
+    print(f"Fetching timeseries data for {len(windows)} date windows...")
+    responses_dict = EcoCounterTimeseriesLoader().fetch_data_windows(
+        windows, timeout=5, retries=3
+    )
+    return timeseries_to_dataframe(responses_dict)
+
+
+def fetch_and_aggregate_timeseries_windows(
+    windows: Dict[Tuple[str, str], List[str]],
+) -> pd.DataFrame:
+    """
+    Streaming variant of `fetch_and_extract_timeseries_windows` followed by
+    `agregate`: chunks are parsed incrementally and reduced to daily sums as
+    they arrive (bounded memory, no raw archive).
+
+    Args:
+        windows (Dict[Tuple[str, str], List[str]]): {(start_date, end_date): station IDs}.
+
+    Returns:
+        pd.DataFrame: Daily (station_id, date, intensity) DataFrame.
+    """
+    print(f"Streaming timeseries data for {len(windows)} date windows...")
+    chunks = EcoCounterTimeseriesLoader().iter_chunks(windows, timeout=5, retries=3)
+    return agregate_stream(chunks)
 
-    all_records = []
+
+def timeseries_to_dataframe(
+    responses_dict: Dict[str, Any], archive: Optional[str] = TIMESERIES_ARCHIVE_FORMAT
+) -> pd.DataFrame:
+    """
+    Build the (station_id, date, intensity) DataFrame from the loader responses.
+
+    The columns are built directly from each station's `index` and `values`
+    arrays (no per-record dict), dates are parsed in one pass and station_id
+    is categorical.
+
+    Args:
+        responses_dict (Dict[str, Any]): {station_id: {"index", "values"}} or None.
+        archive (Optional[str]): "parquet", "csv" or None (no archive file).
+
+    Returns:
+        pd.DataFrame: DataFrame containing all stations' timeseries data.
+    """
+    station_ids, dates, values = [], [], []
     for station_id, data in responses_dict.items():
         if not data or "index" not in data or "values" not in data:
             continue
-        for d, v in zip(data["index"], data["values"]):
-            all_records.append({"station_id": station_id, "date": d, "intensity": v})
+        station_ids.append(station_id)
+        dates.append(np.asarray(data["index"], dtype=object))
+        # Missing measures (null) -> NaN, integer counts are kept as int64
+        values.append(as_intensity_array(data["values"]))
 
-    df_timeseries = pd.DataFrame(all_records)
-    output_path = ARCHIVE_PATH / "trafic_history.csv"
-    df_timeseries.to_csv(output_path, index=False)
-    print(f"Timeseries data saved into: {output_path}")
+    lengths = [len(d) for d in dates]
+    df_timeseries = pd.DataFrame(
+        {
+            # Codes repeated per station: no string copy per record
+            "station_id": pd.Categorical.from_codes(
+                np.repeat(np.arange(len(station_ids)), lengths),
+                categories=station_ids,
+            ),
+            "date": pd.to_datetime(
+                np.concatenate(dates) if dates else [], format="ISO8601"
+            ),
+            "intensity": np.concatenate(values) if values else [],
+        }
+    )
+
+    if archive:
+        write_timeseries_archive(df_timeseries, archive)
     print("Sample of timeseries data:")
     print(df_timeseries.head())
     return df_timeseries
 
 
+def write_timeseries_archive(df: pd.DataFrame, archive: str = "parquet") -> None:
+    """
+    Save the timeseries into ARCHIVE_PATH: Parquet dataset partitioned by
+    month (trafic_history/archive_month=YYYY-MM/) or single CSV file.
+    """
+    output_path = write_archive(
+        df, "trafic_history", ARCHIVE_PATH, partition="month", fmt=archive
+    )
+    print(f"Timeseries data saved into: {output_path}")
+
+
 def extract_weather_fields(
-    json_data: Dict, filename: str = "weather_history.csv"
+    json_data: Dict, name: str = "weather_history"
 ) -> pd.DataFrame:
     """
-    Extract required weather fields from JSON and save into CSV.
+    Extract required weather fields from JSON and archive them.
 
     Args:
         json_data (Dict): Raw JSON data from WeatherHistoryLoader.
-        filename (str): Name of the output CSV file.
+        name (str): Name of the archive (without extension).
 
     Returns:
         pd.DataFrame: DataFrame containing weather data.
@@ -125,8 +218,7 @@ def extract_weather_fields(
         }
     )
 
-    output = ARCHIVE_PATH / filename
-    df.to_csv(output, index=False)
+    output = write_archive(df, name, ARCHIVE_PATH)
     print(f"Weather data saved into: {output}")
     print("Sample of weather data:")
     print(df.head())
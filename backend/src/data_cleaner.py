@@ -1,3 +1,7 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from utils.logging_config import logger
@@ -46,7 +50,10 @@ def agregate(df: DataFrame) -> DataFrame:
     df_copy["date"] = pd.to_datetime(df_copy["date"])
     df_copy = df_copy.set_index("date")
     df_agg: DataFrame = (
-        df_copy.groupby("station_id").resample("D")["intensity"].sum().reset_index()
+        df_copy.groupby("station_id", observed=True)
+        .resample("D")["intensity"]
+        .sum()
+        .reset_index()
     )
 
     print(f"Data amount after aggregation: {df_agg.shape}")
@@ -56,3 +63,65 @@ def agregate(df: DataFrame) -> DataFrame:
     logger.info(f"Sample after aggregation:\n{df_agg.head(5)}")
 
     return df_agg
+
+
+def agregate_stream(chunks: Iterable[Tuple[str, np.ndarray, np.ndarray]]) -> DataFrame:
+    """
+    Streaming equivalent of `agregate(drop_duplicate(df))`.
+
+    Consumes (station_id, dates, intensities) arrays chunk by chunk (see
+    `EcoCounterTimeseriesLoader.iter_chunks`): each chunk is reduced to daily
+    sums right away, so the hourly records are never held all at once.
+
+    Args:
+        chunks: iterable of (station_id, ISO dates, intensities), in any order.
+
+    Returns:
+        DataFrame: Aggregated DataFrame with daily intensity per station.
+    """
+    daily: Dict[str, List[pd.Series]] = defaultdict(list)
+    # Consecutive chunks share their boundary timestamp: dedup the edges
+    edges: Set[Tuple[str, pd.Timestamp, float]] = set()
+    n_records = 0
+
+    for station_id, dates, values in chunks:
+        df = pd.DataFrame(
+            {"date": pd.to_datetime(dates, format="ISO8601"), "intensity": values}
+        ).drop_duplicates()
+        if df.empty:
+            continue
+        is_edge = df["date"].isin([df["date"].min(), df["date"].max()])
+        duplicated = np.zeros(len(df), dtype=bool)
+        for i in np.flatnonzero(is_edge.to_numpy()):
+            edge = (station_id, df["date"].iat[i], df["intensity"].iat[i])
+            duplicated[i] = edge in edges
+            edges.add(edge)
+        df = df[~duplicated]
+
+        n_records += len(df)
+        daily[station_id].append(df.set_index("date")["intensity"].resample("D").sum())
+
+    logger.info(f"Streamed {n_records} records for {len(daily)} stations.")
+
+    frames = []
+    for station_id in sorted(daily):
+        # Same daily grid as `agregate` (missing days -> 0)
+        series = pd.concat(daily[station_id]).sort_index().resample("D").sum()
+        frames.append(
+            pd.DataFrame(
+                {
+                    "station_id": station_id,
+                    "date": series.index,
+                    "intensity": series.to_numpy(),
+                }
+            )
+        )
+    if not frames:
+        return DataFrame(columns=["station_id", "date", "intensity"])
+
+    df_agg = pd.concat(frames, ignore_index=True)
+    df_agg["station_id"] = df_agg["station_id"].astype("category")
+
+    print(f"Data amount after aggregation: {df_agg.shape}")
+    logger.info(f"Data amount after aggregation: {df_agg.shape}")
+    return df_agg
@@ -1,5 +1,6 @@
 import pandas as pd
 from pandas import DataFrame
+from utils.archive import write_archive
 from utils.paths import OUTPUT_PATH
 from utils.logging_config import logger
 
@@ -74,8 +75,10 @@ def merge_trafic_with_weather(
     print(df_final.head(5))
     logger.info(f"Sample:\n{df_final.head(5)}")
 
-    output_file = OUTPUT_PATH / "dataset_final.csv"
-    df_final.to_csv(output_file, index=False)
+    # Read back by pipeline_visualization (read_archive)
+    output_file = write_archive(
+        df_final, "dataset_final", OUTPUT_PATH, partition="month"
+    )
     print(f"Final dataset saved at: {output_file}")
     logger.info(f"Final dataset saved at: {output_file}")
 
@@ -2,21 +2,27 @@ import pytest
 from typing import Generator, Any
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 
 from api.api import app as main_app
-from core.dependencies import get_db_session
+from core.dependencies import get_db_session, get_async_db_session
 from database.database import Base
 
-TEST_DATABASE_URL = "sqlite:///:memory:"
+# File-based so that the sync test session and the async API sessions share the data
+TEST_DATABASE_FILE = "test.db"
 
 
 @pytest.fixture(scope="function")
-def db_session() -> Generator[Session, Any, None]:
+def db_session(tmp_path) -> Generator[Session, Any, None]:
     """
-    Fixture that creates an isolated in-memory test database for each test.
+    Fixture that creates an isolated test database for each test.
     """
-    engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(
+        f"sqlite:///{tmp_path / TEST_DATABASE_FILE}",
+        connect_args={"check_same_thread": False},
+    )
 
     # Créer toutes les tables
     Base.metadata.create_all(bind=engine)
@@ -29,6 +35,7 @@ def db_session() -> Generator[Session, Any, None]:
     session.close()
     # Clean up
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 
 @pytest.fixture(scope="function")
@@ -44,8 +51,22 @@ def client(db_session: Session) -> Generator[TestClient, Any, None]:
             # Do not close the session here, it is managed by the db_session fixture.
             pass
 
-    # Replace the dependency to use our test session
+    # Async endpoints read the same database file through aiosqlite.
+    # NullPool: connections must not outlive the TestClient event loop.
+    db_path = db_session.get_bind().url.database
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool
+    )
+
+    async def override_get_async_db_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    # Replace the dependencies to use our test database
     main_app.dependency_overrides[get_db_session] = override_get_db_session
+    main_app.dependency_overrides[get_async_db_session] = (
+        override_get_async_db_session
+    )
 
     with TestClient(main_app) as test_client:
         yield test_client
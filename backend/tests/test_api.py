@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 from sqlalchemy.orm import Session
@@ -89,3 +89,56 @@ def test_trigger_daily_update(client: TestClient):
 
         # Assert: Check that our background task function was called exactly once.
         mock_run_update.assert_called_once()
+
+
+def test_get_counters_async(client: TestClient, db_session: Session):
+    """
+    Tests that the async /counters endpoint returns the counters in the database.
+    """
+    db_session.add(
+        CounterInfo(station_id="c-1", name="Comédie", longitude=3.88, latitude=43.61)
+    )
+    db_session.commit()
+
+    response = client.get("/api/counters")
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"station_id": "c-1", "name": "Comédie", "latitude": 43.61, "longitude": 3.88}
+    ]
+
+
+def test_get_dashboard_data_async(client: TestClient, db_session: Session):
+    """
+    Tests the async /dashboard endpoint: prediction of the day, yesterday KPI and history.
+    """
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    yesterday = today - timedelta(days=1)
+
+    service = DatabaseService(db_session)
+    service.add_bike_counts(
+        [{"date": yesterday, "station_id": "dash-api", "intensity": 80}]
+    )
+    service.add_predictions(
+        [
+            {
+                "prediction_date": d,
+                "station_id": "dash-api",
+                "prediction_value": v,
+                "model_version": "v-test",
+            }
+            for d, v in [(yesterday, 75), (today, 90)]
+        ]
+    )
+    service.update_rollups(["dash-api"])
+    db_session.commit()
+
+    response = client.get("/api/dashboard/dash-api")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["prediction"] == {"value": 90, "date": today.isoformat()}
+    assert data["yesterday"] == {"real": 80, "predicted": 75}
+    assert data["history_30_days"] == [80]
+    assert data["weekly_averages"][yesterday.weekday()] == 80
+    assert data["weekly_totals"][-1] + data["weekly_totals"][-2] == 80
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+import src.api_data_processing as api_data_processing
+from src.api_data_processing import timeseries_to_dataframe
+from src.data_cleaner import agregate, agregate_stream, drop_duplicate
+from utils.archive import read_archive
+
+
+def test_timeseries_to_dataframe_builds_typed_columns(tmp_path, monkeypatch):
+    """
+    Tests the vectorized extraction: one row per record, categorical station_id,
+    parsed dates, stations without data skipped and a Parquet archive
+    partitioned by month.
+    """
+    monkeypatch.setattr(api_data_processing, "ARCHIVE_PATH", tmp_path)
+    responses = {
+        "station-a": {
+            "index": ["2025-01-01T08:00:00", "2025-01-01T09:00:00"],
+            "values": [3, 4],
+        },
+        "station-empty": None,
+        "station-b": {"index": ["2025-01-02T08:00:00"], "values": [None]},
+    }
+
+    df = timeseries_to_dataframe(responses, archive="parquet")
+
+    assert list(df.columns) == ["station_id", "date", "intensity"]
+    assert isinstance(df["station_id"].dtype, pd.CategoricalDtype)
+    assert df["station_id"].tolist() == ["station-a", "station-a", "station-b"]
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+    assert df["date"].iloc[1] == pd.Timestamp("2025-01-01 09:00:00")
+    assert df["intensity"].iloc[:2].tolist() == [3, 4]
+    assert pd.isna(df["intensity"].iloc[2])
+
+    assert sorted(p.name for p in (tmp_path / "trafic_history").iterdir()) == [
+        "archive_month=2025-01"
+    ]
+    archived = read_archive("trafic_history", tmp_path)
+    pd.testing.assert_frame_equal(archived, df)
+
+    # Daily aggregation keeps working on the categorical frame
+    daily = agregate(df)
+    assert daily["intensity"].tolist() == [7, 0]
+
+
+def test_timeseries_to_dataframe_without_archive(tmp_path, monkeypatch):
+    """Tests that no file is written when the archive is disabled."""
+    monkeypatch.setattr(api_data_processing, "ARCHIVE_PATH", tmp_path)
+
+    df = timeseries_to_dataframe({"station-a": None}, archive=None)
+
+    assert df.empty
+    assert list(df.columns) == ["station_id", "date", "intensity"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_agregate_stream_matches_agregate():
+    """
+    Tests that the streaming aggregation gives the same daily counts as
+    drop_duplicate + agregate, including the timestamp shared by two chunks.
+    """
+    chunks = [
+        (
+            "station-b",
+            np.array(["2025-01-03T00:00:00", "2025-01-03T10:00:00"]),
+            np.array([2, 5]),
+        ),
+        (
+            "station-a",
+            np.array(["2025-01-01T08:00:00", "2025-01-01T09:00:00"]),
+            np.array([3, 4]),
+        ),
+        # Next chunk of station-a starts on the previous boundary
+        (
+            "station-a",
+            np.array(["2025-01-01T09:00:00", "2025-01-03T09:00:00"]),
+            np.array([4, 6]),
+        ),
+    ]
+    df_raw = pd.DataFrame(
+        [(s, d, v) for s, dates, values in chunks for d, v in zip(dates, values)],
+        columns=["station_id", "date", "intensity"],
+    )
+
+    streamed = agregate_stream(iter(chunks))
+    expected = agregate(drop_duplicate(df_raw))
+
+    assert isinstance(streamed["station_id"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(
+        streamed.astype({"station_id": str}), expected, check_dtype=False
+    )
+    assert streamed["intensity"].tolist() == [7, 0, 6, 7]
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+import utils.archive as archive
+from utils.archive import read_archive, write_archive
+
+
+@pytest.fixture
+def df_daily():
+    return pd.DataFrame(
+        {
+            "station_id": pd.Categorical(["station-b", "station-a", "station-b"]),
+            "date": pd.to_datetime(["2025-01-31", "2025-02-01", "2025-02-02"]),
+            "intensity": [3, 4, 5],
+        }
+    )
+
+
+def test_parquet_archive_partitioned_by_month(df_daily, tmp_path):
+    """
+    Tests the Parquet archive: one directory per month, dtypes and column
+    order restored on read, column selection.
+    """
+    path = write_archive(df_daily, "trafic", tmp_path, partition="month")
+
+    assert path == tmp_path / "trafic"
+    assert sorted(p.name for p in path.iterdir()) == [
+        "archive_month=2025-01",
+        "archive_month=2025-02",
+    ]
+    archived = read_archive("trafic", tmp_path)
+    pd.testing.assert_frame_equal(archived, df_daily)
+    assert read_archive("trafic", tmp_path, columns=["intensity"])[
+        "intensity"
+    ].tolist() == [3, 4, 5]
+
+    # Rewriting without partition replaces the dataset
+    write_archive(df_daily.iloc[:1], "trafic", tmp_path)
+    assert not path.exists()
+    assert len(read_archive("trafic", tmp_path)) == 1
+
+
+def test_parquet_archive_partitioned_by_station(df_daily, tmp_path):
+    """Tests the station partitions: station_id comes back as a categorical."""
+    write_archive(df_daily, "trafic", tmp_path, partition="station")
+
+    archived = read_archive("trafic", tmp_path)
+
+    assert list(archived.columns) == ["station_id", "date", "intensity"]
+    assert isinstance(archived["station_id"].dtype, pd.CategoricalDtype)
+    assert archived.sort_values("date")["station_id"].tolist() == [
+        "station-b",
+        "station-a",
+        "station-b",
+    ]
+
+
+def test_csv_and_disabled_archives(df_daily, tmp_path, monkeypatch):
+    """Tests the legacy CSV writer and the "none" format (nothing written)."""
+    monkeypatch.setattr(archive, "ARCHIVE_FORMAT", "csv")
+
+    path = write_archive(df_daily, "trafic", tmp_path, partition="month")
+
+    assert path == tmp_path / "trafic.csv"
+    assert read_archive("trafic", tmp_path)["intensity"].tolist() == [3, 4, 5]
+
+    assert write_archive(df_daily, "other", tmp_path, fmt="none") is None
+    with pytest.raises(FileNotFoundError):
+        read_archive("other", tmp_path)
+    with pytest.raises(ValueError):
+        write_archive(df_daily, "trafic", tmp_path, fmt="xlsx")
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+import requests
+
+import download.circuit_breaker as circuit_breaker
+from download.circuit_breaker import (
+    BudgetExceededError,
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedAdapter,
+    request_budget,
+)
+
+
+class StaticAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with the same status, without network."""
+
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
+        self.timeouts = []
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = self.status
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setattr(circuit_breaker, "_budget", None)
+
+
+def guarded_session(adapter):
+    session = requests.Session()
+    session.mount("http://", GuardedAdapter(adapter))
+    return session
+
+
+def test_circuit_breaker_states():
+    """Tests closed -> open -> half_open (probe) -> open/closed transitions."""
+    breaker = CircuitBreaker("api", failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    breaker.before_request()  # Probe
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()  # Only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_guarded_adapter_shares_the_breaker_per_host(breakers):
+    """Tests that failures of one session open the breaker for every session."""
+    failing = StaticAdapter(503)
+    for _ in range(circuit_breaker.API_BREAKER_FAILURES):
+        assert guarded_session(failing).get("http://api.test/a").status_code == 503
+
+    healthy = StaticAdapter(200)
+    with pytest.raises(CircuitOpenError):
+        guarded_session(healthy).get("http://api.test/b")
+    assert healthy.timeouts == []
+    # Other hosts are not affected
+    assert guarded_session(healthy).get("http://other.test/b").status_code == 200
+
+
+class BrokenAdapter(StaticAdapter):
+    """Fails with an error that is not a requests exception."""
+
+    def send(self, request, *args, **kwargs):
+        raise ValueError("unexpected")
+
+
+def test_failed_probe_is_released(breakers):
+    """Tests that a probe failing with any exception reopens the breaker."""
+    breaker = circuit_breaker.get_breaker("api.test")
+    breaker.reset_timeout = 0.05
+    for _ in range(circuit_breaker.API_BREAKER_FAILURES):
+        guarded_session(StaticAdapter(503)).get("http://api.test/")
+    assert breaker.state == "open"
+
+    time.sleep(breaker.reset_timeout + 0.01)
+    with pytest.raises(ValueError):
+        guarded_session(BrokenAdapter(200)).get("http://api.test/")
+    assert breaker.state == "open"
+
+    time.sleep(breaker.reset_timeout + 0.01)
+    assert guarded_session(StaticAdapter(200)).get("http://api.test/").ok
+    assert breaker.state == "closed"
+
+
+def test_request_budget(breakers):
+    """Tests the request count limit and the timeouts capped by the time budget."""
+    adapter = StaticAdapter(200)
+    session = guarded_session(adapter)
+
+    with request_budget(seconds=30, max_requests=2):
+        session.get("http://api.test/", timeout=60)
+        session.get("http://api.test/", timeout=(5, 60))
+        with pytest.raises(BudgetExceededError):
+            session.get("http://api.test/")
+
+    assert 29 < adapter.timeouts[0] <= 30
+    assert adapter.timeouts[1][0] == 5 and adapter.timeouts[1][1] <= 30
+    # Outside the block: no budget
+    session.get("http://api.test/", timeout=60)
+    assert adapter.timeouts[-1] == 60
+
+    with request_budget(seconds=0.01):
+        time.sleep(0.02)
+        with pytest.raises(BudgetExceededError):
+            session.get("http://api.test/")
@@ -3,8 +3,16 @@ from datetime import datetime
 from unittest.mock import patch, MagicMock
 from decimal import Decimal
 
+from database.service import DatabaseService
 from pipelines.data_insertion import insert_data_to_db
-from database.database import CounterInfo, BikeCount, Weather
+from database.database import (
+    CounterInfo,
+    BikeCount,
+    Weather,
+    IngestionWatermark,
+    StationFeatures,
+    CellWeather,
+)
 
 
 def test_insert_data_to_db(db_session):
@@ -82,12 +90,26 @@ def test_insert_data_to_db(db_session):
     with (
         patch("pipelines.data_insertion.db_manager", mock_db_manager),
         patch(
-            "pipelines.data_insertion.get_street_name_from_coords"
-        ) as mock_get_street_name,
+            "pipelines.data_insertion.resolve_street_names"
+        ) as mock_resolve_street_names,
+        patch("pipelines.data_insertion.WeatherHistoryLoader") as mock_history_loader,
     ):
         # Configure the mock to prevent external API calls and return a predictable value.
         # This makes the test self-contained and deterministic.
-        mock_get_street_name.return_value = "Counter Two"
+        mock_resolve_street_names.return_value = {"counter-2": "Counter Two"}
+        # Grid weather history: counter-1's cell only (stored coordinates)
+        mock_history_loader.return_value.fetch_grid.return_value = pd.DataFrame(
+            [
+                {
+                    "cell_lat": 1.0,
+                    "cell_lon": 1.0,
+                    "date": datetime(2023, 10, 26, 10, 0, 0),
+                    "avg_temp": 17.0,
+                    "precipitation_mm": 0.0,
+                    "vent_max": 20.0,
+                }
+            ]
+        )
         # Act: Call the function to be tested. The function will now use the mocked db_manager.
         insert_data_to_db(df_trafic, df_weather, df_metadata)
 
@@ -97,6 +119,11 @@ def test_insert_data_to_db(db_session):
     counts_in_db = db_session.query(BikeCount).all()
     weather_in_db = db_session.query(Weather).all()
 
+    # Only the new counter is geocoded, once, before the transaction
+    mock_resolve_street_names.assert_called_once_with(
+        {"counter-2": ("45.764044", "4.835655")}
+    )
+
     # Check if the number of records is correct.
     assert len(counters_in_db) == 2
     assert len(counts_in_db) == 2
@@ -114,3 +141,102 @@ def test_insert_data_to_db(db_session):
     assert original_counter.name == "Existing Counter"
 
     assert weather_in_db[0].avg_temp == 15.5
+
+    # The ingestion watermarks follow the last stored day of each station
+    watermarks = dict(
+        db_session.query(
+            IngestionWatermark.station_id, IngestionWatermark.last_ingested_date
+        ).all()
+    )
+    assert watermarks == {
+        "counter-1": datetime(2023, 10, 26, 10, 0, 0),
+        "counter-2": datetime(2023, 10, 26, 11, 0, 0),
+    }
+
+    # The grid weather history of the stations' cells is stored...
+    cells, start, end = mock_history_loader.return_value.fetch_grid.call_args.args
+    assert sorted(cells) == [(1.0, 1.0), (45.75, 4.85)]
+    assert (start, end) == ("2023-10-26", "2023-10-26")
+    assert db_session.query(CellWeather).count() == 1
+
+    # ...and used by the feature store, which follows the new counts
+    # (counter-2 has no weather at 11:00)
+    features = db_session.query(StationFeatures).all()
+    assert [(f.station_id, f.intensity) for f in features] == [("counter-1", 150)]
+    assert features[0].lag_1 is None and features[0].avg_temp == 17.0
+
+
+def test_failed_write_rolls_back_the_watermarks(db_session):
+    """
+    Tests that a failed write (service method returning False) rolls the
+    whole insertion back: the watermarks do not skip the unsaved days.
+    """
+    db_session.add(
+        CounterInfo(station_id="counter-1", name="c", longitude=1, latitude=1)
+    )
+    db_session.commit()
+    df_trafic = pd.DataFrame(
+        [{"date": datetime(2023, 10, 26), "station_id": "counter-1", "intensity": 150}]
+    )
+
+    mock_db_manager = MagicMock()
+    mock_db_manager.get_session.return_value = db_session
+    with (
+        patch("pipelines.data_insertion.db_manager", mock_db_manager),
+        patch(
+            "pipelines.data_insertion.DatabaseService.update_rollups",
+            return_value=False,
+        ),
+        patch("pipelines.data_insertion.fetch_cell_weather", return_value=None),
+    ):
+        assert insert_data_to_db(df_trafic) is False
+
+    assert db_session.query(BikeCount).count() == 0
+    assert db_session.query(IngestionWatermark).count() == 0
+
+
+def test_failed_feature_refresh_keeps_the_counts(db_session):
+    """
+    Tests that a failed feature store refresh only undoes its own rows: the
+    counts and watermarks are committed, the backfill completes the store.
+    """
+    db_session.add(
+        CounterInfo(station_id="counter-1", name="c", longitude=1, latitude=1)
+    )
+    db_session.commit()
+    df_trafic = pd.DataFrame(
+        [{"date": datetime(2023, 10, 26), "station_id": "counter-1", "intensity": 150}]
+    )
+    df_weather = pd.DataFrame(
+        [
+            {
+                "date": datetime(2023, 10, 26),
+                "avg_temp": 15.5,
+                "precipitation_mm": 0.2,
+                "vent_max": 25.0,
+            }
+        ]
+    )
+    upsert = DatabaseService.upsert_station_features
+
+    def failing_upsert(self, rows):
+        # Rows written, then reported as failed: the savepoint must undo them
+        upsert(self, rows)
+        return False
+
+    mock_db_manager = MagicMock()
+    mock_db_manager.get_session.return_value = db_session
+    with (
+        patch("pipelines.data_insertion.db_manager", mock_db_manager),
+        patch(
+            "pipelines.data_insertion.DatabaseService.upsert_station_features",
+            failing_upsert,
+        ),
+        patch("pipelines.data_insertion.fetch_cell_weather", return_value=None),
+    ):
+        assert insert_data_to_db(df_trafic, df_weather) is True
+
+    assert db_session.query(BikeCount).count() == 1
+    assert db_session.query(IngestionWatermark).count() == 1
+    assert db_session.query(StationFeatures).count() == 0
+    assert DatabaseService(db_session).get_feature_store_gaps() == ["counter-1"]
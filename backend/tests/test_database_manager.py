@@ -0,0 +1,100 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from prometheus_client import REGISTRY
+
+from database.database import Base, BikeCount, CounterInfo, DatabaseManager
+from database.service import DatabaseService
+
+
+def test_sqlite_engine_uses_wal_and_tuned_pool(tmp_path, monkeypatch):
+    """
+    Tests that a file-based SQLite engine gets the WAL pragmas and the
+    pool settings read from the environment.
+    """
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "2")
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'pool.db'}")
+
+    with manager.engine.connect() as connection:
+        journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = connection.execute(text("PRAGMA synchronous")).scalar()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert manager.engine.pool.size() == 3
+    assert manager.engine.pool._max_overflow == 2
+    manager.engine.dispose()
+
+
+def test_pool_metrics_are_exposed(tmp_path):
+    """Tests that checkouts are counted and pool gauges are registered."""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'metrics.db'}")
+    before = REGISTRY.get_sample_value("db_pool_checkouts_total", {"role": "primary"})
+
+    session = manager.get_session()
+    session.execute(text("SELECT 1"))
+    checked_out = REGISTRY.get_sample_value(
+        "db_pool_checked_out_connections", {"role": "primary"}
+    )
+    session.close()
+
+    after = REGISTRY.get_sample_value("db_pool_checkouts_total", {"role": "primary"})
+    assert after == (before or 0) + 1
+    assert checked_out == 1
+    assert (
+        REGISTRY.get_sample_value(
+            "db_pool_checkout_wait_seconds_count", {"role": "primary"}
+        )
+        >= 1
+    )
+    manager.engine.dispose()
+
+
+def test_reads_are_routed_to_the_replica(tmp_path):
+    """
+    Tests read/write routing with two SQLite files: writes land on the
+    primary, read methods are served by the replica.
+    """
+    manager = DatabaseManager(
+        f"sqlite:///{tmp_path / 'primary.db'}",
+        read_database_url=f"sqlite:///{tmp_path / 'replica.db'}",
+    )
+    manager.init_db()
+    Base.metadata.create_all(bind=manager.read_engine)
+
+    # Simulate replication of the station list only
+    replica = manager.get_read_session()
+    replica.add(CounterInfo(station_id="replicated", name="r"))
+    replica.commit()
+
+    session = manager.get_session()
+    service = DatabaseService(session, read_session=manager.get_read_session())
+    service.add_counter_infos([{"station_id": "primary-only", "name": "p"}])
+    service.add_bike_counts(
+        [{"station_id": "primary-only", "date": datetime(2024, 1, 1), "intensity": 5}]
+    )
+    session.commit()
+
+    assert [s.station_id for s in service.get_all_stations()] == ["replicated"]
+    assert service.get_bike_count("primary-only", datetime(2024, 1, 1)) is None
+    assert session.query(BikeCount).count() == 1
+    assert replica.query(BikeCount).count() == 0
+
+    session.close()
+    service.read_session.close()
+    replica.close()
+    manager.engine.dispose()
+    manager.read_engine.dispose()
+
+
+def test_without_replica_reads_use_the_primary(tmp_path):
+    """Tests that the service falls back to the primary session for reads."""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'single.db'}")
+    assert manager.get_read_session() is None
+
+    session = manager.get_session()
+    service = DatabaseService(session, read_session=manager.get_read_session())
+    assert service.read_session is session
+    session.close()
+    manager.engine.dispose()
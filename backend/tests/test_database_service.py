@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest.mock import patch
 from sqlalchemy.orm import Session, sessionmaker
 import pytest, typing
 from sqlalchemy import create_engine
@@ -9,10 +10,21 @@ from database.database import (
     BikeCount,
     Weather,
     Prediction,
+    LatestPrediction,
     ModelMetrics,
+    FeaturesContext,
+    FeaturesData,
+    FeaturesDataArchive,
+    StationWeeklyTotal,
     Base,
 )
+from database.partitioning import (
+    ensure_partitions,
+    partition_name,
+    partitioned_table_ddl,
+)
 from database.service import DatabaseService
+from pipelines.incremental_ingestion import plan_ingestion_windows
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
@@ -212,3 +224,537 @@ def test_add_model_metrics_success(db_session: Session):
     assert success is True
     assert db_session.query(ModelMetrics).count() == 1
     assert db_session.query(ModelMetrics).first().actual_value == 150  # type: ignore
+
+
+def test_get_lag_matrix_with_fallback(db_session: Session):
+    """Tests that lags and the last-known fallback are resolved for all stations at once."""
+    service = DatabaseService(db_session)
+    today = datetime(2024, 3, 15)
+    service.add_bike_counts(
+        [
+            # Station A: complete history
+            {"date": datetime(2024, 3, 14), "station_id": "A", "intensity": 110},
+            {"date": datetime(2024, 3, 8), "station_id": "A", "intensity": 70},
+            # Station B: J-1 missing, last known value 3 days ago
+            {"date": datetime(2024, 3, 12), "station_id": "B", "intensity": 55},
+            {"date": datetime(2024, 3, 8), "station_id": "B", "intensity": 40},
+        ]
+    )
+    db_session.commit()
+
+    matrix = service.get_lag_matrix(["A", "B", "C"], today, lags=[1, 7])
+
+    assert matrix["A"] == {"lag_1": 110, "lag_7": 70, "last_value": None}
+    assert matrix["B"] == {"lag_1": None, "lag_7": 40, "last_value": 55}
+    # Station C has no history at all
+    assert matrix["C"] == {"lag_1": None, "lag_7": None, "last_value": None}
+
+
+def test_get_dashboard_stats_aggregates_history(db_session: Session):
+    """Tests the single-query dashboard aggregation (history, accuracy, profiles, totals)."""
+    service = DatabaseService(db_session)
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    yesterday = today - timedelta(days=1)
+
+    # One count per day over the last 100 days, intensity = days ago
+    service.add_bike_counts(
+        [
+            {"date": today - timedelta(days=i), "station_id": "dash", "intensity": i}
+            for i in range(1, 101)
+        ]
+    )
+    service.add_predictions(
+        [
+            {
+                "prediction_date": yesterday,
+                "station_id": "dash",
+                "prediction_value": 7,
+                "model_version": "v-test",
+            }
+        ]
+    )
+    service.update_rollups(["dash"])
+    db_session.commit()
+
+    stats = service.get_dashboard_stats("dash")
+
+    assert stats["history_30_days"] == list(range(30, 0, -1))
+    assert stats["accuracy_7_days"]["real"] == list(range(7, 0, -1))
+    assert stats["accuracy_7_days"]["pred"] == [0] * 6 + [7]
+
+    # Weekly totals come from the rollups: ISO weeks, current week last
+    current_week = today - timedelta(days=today.weekday())
+    last_week = current_week - timedelta(weeks=1)
+    expected_last_week = sum(
+        i
+        for i in range(1, 101)
+        if last_week <= today - timedelta(days=i) < current_week
+    )
+    assert stats["weekly_totals"][10] == expected_last_week
+    assert len(stats["weekly_totals"]) == 12
+    assert len(stats["weekly_averages"]) == 7
+    assert all(avg > 0 for avg in stats["weekly_averages"])
+
+
+def test_update_rollups_is_incremental(db_session: Session):
+    """Tests that rollups only rebuild the affected weeks and stay idempotent."""
+    service = DatabaseService(db_session)
+    monday = datetime(2024, 1, 1)
+    service.add_bike_counts(
+        [
+            {"date": monday + timedelta(days=i), "station_id": "roll", "intensity": 10}
+            for i in range(14)
+        ]
+    )
+    service.update_rollups(["roll"])
+
+    # New day arrives in week 3: only that week is refreshed, twice in a row
+    new_day = monday + timedelta(days=14)
+    service.add_bike_counts([{"date": new_day, "station_id": "roll", "intensity": 40}])
+    service.update_rollups(["roll"], new_day, new_day)
+    service.update_rollups(["roll"], new_day, new_day)
+    db_session.commit()
+
+    totals = {
+        w.week_start: w.total_intensity
+        for w in db_session.query(StationWeeklyTotal).filter_by(station_id="roll")
+    }
+    assert totals == {
+        monday: 70,
+        monday + timedelta(days=7): 70,
+        monday + timedelta(days=14): 40,
+    }
+
+    stats = service.get_rolling_stats(["roll"])["roll"]
+    assert stats.as_of_date == new_day
+    assert stats.days_30d == 15
+    assert stats.total_30d == 180
+
+
+def test_backfill_rollups_rebuilds_the_missing_history(db_session: Session):
+    """
+    Tests the one-off rebuild: on a database filled before the rollups, the
+    daily refresh only covers the new week; the backfill rebuilds every week
+    and every station, then does nothing once complete.
+    """
+    service = DatabaseService(db_session)
+    monday = datetime(2024, 1, 1)
+    service.add_bike_counts(
+        [
+            {"date": monday + timedelta(days=i), "station_id": s, "intensity": 10}
+            for s in ("old-a", "old-b")
+            for i in range(14)
+        ]
+    )
+    new_day = monday + timedelta(days=14)
+    service.add_bike_counts([{"date": new_day, "station_id": "old-a", "intensity": 40}])
+    service.update_rollups(["old-a"], new_day, new_day)
+    assert service.get_rollup_gaps() == ["old-a", "old-b"]
+
+    assert service.backfill_rollups()
+    db_session.commit()
+    assert service.get_rollup_gaps() == []
+
+    totals = {
+        (w.station_id, w.week_start): w.total_intensity
+        for w in db_session.query(StationWeeklyTotal)
+    }
+    assert totals[("old-a", monday)] == 70
+    assert totals[("old-b", monday + timedelta(days=7))] == 70
+    assert service.get_rolling_stats(["old-b"])["old-b"].days_30d == 14
+
+    with patch.object(service, "update_rollups") as update_rollups:
+        assert service.backfill_rollups()
+    update_rollups.assert_not_called()
+
+
+def test_bulk_upserts_are_idempotent(db_session: Session):
+    """Tests that replaying counts, weather and predictions updates rows instead of duplicating them."""
+    service = DatabaseService(db_session, batch_size=2)
+    day = datetime(2024, 5, 1)
+    counts = [
+        {"date": day + timedelta(days=i), "station_id": "replay", "intensity": 10 * i}
+        for i in range(5)
+    ]
+    weather = [
+        {"date": day, "avg_temp": 12.0, "precipitation_mm": 0.0, "vent_max": 10.0}
+    ]
+    prediction = {
+        "prediction_date": day,
+        "station_id": "replay",
+        "prediction_value": 100,
+        "model_version": "v1",
+    }
+
+    assert service.add_bike_counts(counts)
+    assert service.add_weather_data(weather)
+    assert service.add_predictions([prediction])
+    db_session.commit()
+
+    # Replay with corrected values
+    counts[0]["intensity"] = 999
+    weather[0]["avg_temp"] = 14.0
+    assert service.add_bike_counts(counts)
+    assert service.add_weather_data(weather)
+    assert service.add_predictions([{**prediction, "prediction_value": 120}])
+    db_session.commit()
+
+    assert db_session.query(BikeCount).count() == 5
+    assert db_session.query(BikeCount).filter_by(date=day).one().intensity == 999
+    assert db_session.query(Weather).one().avg_temp == 14.0
+    assert db_session.query(Prediction).one().prediction_value == 120
+
+
+def test_save_prediction_single_with_context_replay(db_session: Session):
+    """Tests that saving the same prediction twice updates it and its context."""
+    service = DatabaseService(db_session)
+    pred_data = {
+        "prediction_date": datetime(2024, 5, 2),
+        "station_id": "ctx",
+        "prediction_value": 50,
+        "model_version": "v1",
+    }
+
+    assert service.save_prediction_single_with_context(pred_data, {"lag_1": 1.0})
+    assert service.save_prediction_single_with_context(
+        {**pred_data, "prediction_value": 60}, {"lag_1": 2.0}
+    )
+
+    prediction = db_session.query(Prediction).one()
+    assert prediction.prediction_value == 60
+    assert prediction.training_data.features == {"lag_1": 2.0}
+
+
+def test_save_predictions_batch_with_context(db_session: Session):
+    """Tests that a whole run is saved in one transaction and can be replayed."""
+    service = DatabaseService(db_session, batch_size=2)
+    day = datetime(2024, 6, 1)
+    records = [
+        (
+            {
+                "prediction_date": day,
+                "station_id": f"batch-{i}",
+                "prediction_value": 10 * i,
+                "model_version": "v1",
+            },
+            {"lag_1": float(i)},
+        )
+        for i in range(5)
+    ]
+
+    assert service.save_predictions_batch_with_context(records)
+    # Replay the same run: predictions and contexts are replaced, not duplicated
+    assert service.save_predictions_batch_with_context(records)
+
+    assert db_session.query(Prediction).count() == 5
+    assert db_session.query(FeaturesData).count() == 5
+    prediction = db_session.query(Prediction).filter_by(station_id="batch-3").one()
+    assert prediction.training_data.features == {"lag_1": 3.0}
+
+
+def test_save_predictions_batch_is_all_or_nothing(db_session: Session):
+    """Tests that an invalid record rolls back the whole run."""
+    service = DatabaseService(db_session)
+    day = datetime(2024, 6, 2)
+    records = [
+        (
+            {
+                "prediction_date": day,
+                "station_id": "ok",
+                "prediction_value": 10,
+                "model_version": "v1",
+            },
+            {"lag_1": 1.0},
+        ),
+        (
+            {
+                "prediction_date": day,
+                "station_id": "broken",
+                "prediction_value": None,  # NOT NULL violation
+                "model_version": "v1",
+            },
+            {"lag_1": 2.0},
+        ),
+    ]
+
+    assert service.save_predictions_batch_with_context(records) is False
+    assert db_session.query(Prediction).count() == 0
+    assert db_session.query(FeaturesData).count() == 0
+
+
+def test_non_numeric_station_feature_is_reported(db_session: Session, caplog):
+    """
+    Tests that a non-numeric per-station feature (e.g. a date turned into
+    str by the predictor) rolls the run back with the faulty column logged.
+    """
+    service = DatabaseService(db_session)
+    day = datetime(2024, 6, 3)
+    records = [
+        (
+            {
+                "prediction_date": day,
+                "station_id": f"str-{i}",
+                "prediction_value": 10,
+                "model_version": "v1",
+            },
+            {"lag_1": float(i), "last_seen": f"2024-06-0{i + 1} 00:00:00"},
+        )
+        for i in range(2)
+    ]
+
+    assert service.save_predictions_batch_with_context(records) is False
+    assert "Non-numeric per-station features: ['last_seen']" in caplog.text
+    assert db_session.query(Prediction).count() == 0
+    assert db_session.query(FeaturesData).count() == 0
+
+
+def test_archive_features_data_moves_cold_rows(db_session: Session):
+    """Tests that contexts older than the cutoff are moved to the archive table."""
+    service = DatabaseService(db_session)
+    records = [
+        (
+            {
+                "prediction_date": day,
+                "station_id": "arch-1",
+                "prediction_value": 10,
+                "model_version": "v1",
+            },
+            {"lag_1": float(day.month)},
+        )
+        for day in (datetime(2023, 1, 10), datetime(2023, 2, 10), datetime(2024, 6, 1))
+    ]
+    assert service.save_predictions_batch_with_context(records)
+
+    assert service.archive_features_data(datetime(2024, 1, 1)) == 2
+
+    assert db_session.query(FeaturesData).count() == 1
+    archived = db_session.query(FeaturesDataArchive).all()
+    assert all(r.archived_at is not None for r in archived)
+    # Archived contexts can still be decoded
+    frame = service.load_features_frame(
+        datetime(2023, 1, 1), datetime(2023, 12, 31), include_archive=True
+    )
+    assert frame["lag_1"].tolist() == [1.0, 2.0]
+    # Predictions stay in place, only their context moved
+    assert db_session.query(Prediction).count() == 3
+    # Running again is a no-op
+    assert service.archive_features_data(datetime(2024, 1, 1)) == 0
+
+
+def test_partitioned_table_ddl_includes_partition_key():
+    """Tests the PostgreSQL DDL generated for the monthly partitioned layout."""
+    ddl = partitioned_table_ddl(Base.metadata.tables["features_data"])
+
+    assert "PARTITION BY RANGE (date)" in ddl[0]
+    assert "PRIMARY KEY (id, date)" in ddl[0]
+    # Unique constraints must contain the partition key
+    assert "UNIQUE (prediction_id, date)" in ddl[0]
+    assert any("ON features_data (date)" in statement for statement in ddl[1:])
+    assert partition_name("bike_count", datetime(2025, 1, 1)) == "bike_count_y2025m01"
+
+
+class FakeCatalogConnection:
+    """Records the DDL; `catalog` holds the committed partitions."""
+
+    def __init__(self):
+        self.catalog = set()
+        self.created = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT to_regclass"):
+            exists = params["name"] in self.catalog
+            return type("Result", (), {"scalar": lambda self: exists})()
+        name = sql.split()[5]
+        self.created.append(name)
+        self.catalog.add(name)
+
+
+def test_ensure_partitions_recreates_rolled_back_partitions():
+    """Tests that a partition lost by a rollback is created again."""
+    connection = FakeCatalogConnection()
+    days = [datetime(2025, 1, 5), datetime(2025, 1, 20), datetime(2025, 2, 1)]
+
+    ensure_partitions(connection, "bike_count", days)
+    assert connection.created == ["bike_count_y2025m01", "bike_count_y2025m02"]
+
+    # Existing partitions: no DDL
+    ensure_partitions(connection, "bike_count", days)
+    assert len(connection.created) == 2
+
+    # The transaction that created January was rolled back
+    connection.catalog.discard("bike_count_y2025m01")
+    ensure_partitions(connection, "bike_count", days)
+    assert connection.created[-1] == "bike_count_y2025m01"
+
+
+def test_features_context_is_shared_and_vectors_packed(db_session: Session):
+    """Tests the compact encoding: one context per day, float32 vectors per station."""
+    service = DatabaseService(db_session)
+    day = datetime(2024, 6, 3)
+    records = [
+        (
+            {
+                "prediction_date": day,
+                "station_id": f"vec-{i}",
+                "prediction_value": 10 * i,
+                "model_version": "v1",
+            },
+            {"avg_temp": 21.5, "is_holiday": 0, "lag_1": float(i), "lag_7": 2.0 * i},
+        )
+        for i in range(3)
+    ]
+    assert service.save_predictions_batch_with_context(records)
+    # Replay: the replaced context is removed
+    assert service.save_predictions_batch_with_context(records)
+
+    context = db_session.query(FeaturesContext).one()
+    assert context.shared == {"avg_temp": 21.5, "is_holiday": 0}
+    assert context.vector_columns == ["lag_1", "lag_7"]
+    row = db_session.query(FeaturesData).filter_by(station_id="vec-2").one()
+    assert len(row.vector) == 2 * 4  # two float32 values
+    assert row.features == {
+        "avg_temp": 21.5,
+        "is_holiday": 0,
+        "lag_1": 2.0,
+        "lag_7": 4.0,
+    }
+
+    frame = service.load_features_frame(day, day)
+    assert frame["station_id"].tolist() == ["vec-0", "vec-1", "vec-2"]
+    assert frame["lag_7"].tolist() == [0.0, 2.0, 4.0]
+    assert (frame["avg_temp"] == 21.5).all()
+    assert service.load_features_frame(datetime(2020, 1, 1), datetime(2020, 1, 2)).empty
+
+
+def test_iter_training_data_streams_typed_chunks(db_session: Session):
+    """Tests the chunked training reader: SQL weather join, ordering and dtypes."""
+    service = DatabaseService(db_session)
+    service.add_counter_infos(
+        [
+            {"station_id": s, "name": s, "latitude": 43.6, "longitude": 3.88}
+            for s in ("train-a", "train-b")
+        ]
+    )
+    days = [datetime(2024, 3, 1) + timedelta(days=i) for i in range(3)]
+    service.add_bike_counts(
+        [
+            {"station_id": s, "date": d, "intensity": 100 + i}
+            for s in ("train-b", "train-a")
+            for i, d in enumerate(days)
+        ]
+    )
+    # No weather for the last day: its counts are excluded by the join
+    service.add_weather_data(
+        [
+            {"date": d, "avg_temp": 12.5, "precipitation_mm": 0.0, "vent_max": 20.0}
+            for d in days[:2]
+        ]
+    )
+    db_session.commit()
+
+    chunks = list(service.iter_training_data(chunk_size=3))
+
+    assert [len(c) for c in chunks] == [3, 1]
+    frame = service.load_training_frame(chunk_size=3)
+    assert frame["station_id"].dtype == "category"
+    assert list(frame["station_id"].cat.categories) == ["train-a", "train-b"]
+    assert frame["intensity"].dtype == "int32"
+    assert frame["avg_temp"].dtype == "float32"
+    assert frame["latitude"].dtype == "float64"
+    assert list(zip(frame["station_id"], frame["date"].dt.day)) == [
+        ("train-a", 1),
+        ("train-a", 2),
+        ("train-b", 1),
+        ("train-b", 2),
+    ]
+
+
+def test_latest_prediction_lookup_is_maintained(db_session: Session):
+    """Tests that latest_prediction follows the most recent prediction of each station."""
+    service = DatabaseService(db_session)
+
+    def record(day, value):
+        return (
+            {
+                "prediction_date": day,
+                "station_id": "latest-1",
+                "prediction_value": value,
+                "model_version": "v1",
+            },
+            {"lag_1": 1.0},
+        )
+
+    assert service.save_predictions_batch_with_context(
+        [record(datetime(2024, 6, 2), 20)]
+    )
+    # Backfill of an older day: the lookup keeps pointing to the newest prediction
+    assert service.save_predictions_batch_with_context(
+        [record(datetime(2024, 6, 1), 10)]
+    )
+    assert service.get_latest_prediction_for_counter("latest-1").prediction_value == 20
+
+    assert service.add_predictions(
+        [
+            {
+                "prediction_date": datetime(2024, 6, 3),
+                "station_id": "latest-1",
+                "prediction_value": 30,
+                "model_version": "v1",
+            }
+        ]
+    )
+    db_session.commit()
+
+    lookup = db_session.query(LatestPrediction).one()
+    assert lookup.prediction_date == datetime(2024, 6, 3)
+    assert service.get_latest_prediction_for_counter("latest-1").prediction_value == 30
+
+
+def test_ingestion_watermarks_and_windows(db_session: Session):
+    """Tests the watermarks (with bike_count fallback) and the coalesced ingestion windows."""
+    service = DatabaseService(db_session)
+    service.add_bike_counts(
+        [{"station_id": "legacy", "date": datetime(2024, 5, 28), "intensity": 1}]
+    )
+    assert service.update_ingestion_watermarks(
+        {"wm-a": datetime(2024, 5, 30), "wm-b": datetime(2024, 5, 30)}
+    )
+    # A backfill of older days does not move the watermark back
+    assert service.update_ingestion_watermarks({"wm-a": datetime(2024, 5, 1)})
+    db_session.commit()
+
+    marks = service.get_ingestion_watermarks(["wm-a", "wm-b", "legacy", "new"])
+    assert marks == {
+        "wm-a": datetime(2024, 5, 30),
+        "wm-b": datetime(2024, 5, 30),
+        "legacy": datetime(2024, 5, 28),
+    }
+
+    windows = plan_ingestion_windows(
+        ["wm-a", "wm-b", "legacy", "new", "done"],
+        {**marks, "done": datetime(2024, 5, 31)},
+        end_date="2024-05-31",
+        default_start="2022-12-24",
+    )
+    assert windows == {
+        ("2024-05-31", "2024-05-31"): ["wm-a", "wm-b"],
+        ("2024-05-29", "2024-05-31"): ["legacy"],
+        ("2022-12-24", "2024-05-31"): ["new"],
+    }
+
+
+def test_get_latest_weather_for_fallback(db_session: Session):
+    """Tests the DB weather used when the forecast API is unavailable."""
+    service = DatabaseService(db_session)
+    assert service.get_latest_weather(datetime(2025, 1, 10)) is None
+
+    service.add_weather_data(
+        [
+            {"date": datetime(2025, 1, d), "avg_temp": float(d), "precipitation_mm": 0.0, "vent_max": 10.0}
+            for d in (7, 8, 12)
+        ]
+    )
+
+    assert service.get_latest_weather(datetime(2025, 1, 10)).avg_temp == 8.0
+    assert service.get_latest_weather(datetime(2025, 1, 12)).avg_temp == 12.0
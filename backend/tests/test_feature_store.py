@@ -0,0 +1,225 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database.database import Base, StationFeatures
+from database.service import DatabaseService
+from features import feature_store
+from features.feature_store import (
+    backfill_feature_store,
+    load_training_features,
+    refresh_feature_store,
+    refresh_inference_features,
+)
+from features.features_engineering import SUSPECT_COUNTERS
+
+DAYS = [datetime(2024, 3, 1) + timedelta(days=i) for i in range(9)]
+
+
+def _seed(service: DatabaseService, days, station_ids=("fs-a", "fs-b")) -> None:
+    service.add_bike_counts(
+        [
+            {"station_id": s, "date": d, "intensity": 100 + d.day}
+            for s in station_ids
+            for d in days
+        ]
+    )
+    service.add_weather_data(
+        [
+            {"date": d, "avg_temp": 3.0, "precipitation_mm": 2.5, "vent_max": 10.0}
+            for d in days
+        ]
+    )
+
+
+def test_feature_store_is_updated_incrementally(db_session: Session):
+    """
+    Tests the stored training rows: calendar, weather and calendar-day lags,
+    then an incremental refresh limited to the new day.
+    """
+    service = DatabaseService(db_session)
+    service.add_counter_infos(
+        [
+            {"station_id": s, "name": s, "latitude": 43.6, "longitude": 3.88}
+            for s in ("fs-a", "fs-b")
+        ]
+    )
+    _seed(service, DAYS[:8])
+    db_session.commit()
+
+    assert refresh_feature_store(service) == 16
+    db_session.commit()
+
+    # Only the rows with both lags are training rows
+    frame = service.load_station_features()
+    assert len(frame) == 2
+    assert frame["station_id"].dtype == "category"
+    row = frame[frame["station_id"] == "fs-a"].iloc[0]
+    assert row["date"] == DAYS[7]
+    assert (row["lag_1"], row["lag_7"]) == (107, 101)
+    assert row["day_of_week"] == DAYS[7].weekday()
+    assert (row["is_rainy"], row["is_cold"], row["is_hot"]) == (1, 1, 0)
+
+    # New day of fs-a only: its row is added, the other stations are untouched
+    _seed(service, DAYS[8:], station_ids=("fs-a",))
+    assert refresh_feature_store(service, ["fs-a"], DAYS[8], DAYS[8]) == 1
+    db_session.commit()
+
+    frame = service.load_station_features(start_date=DAYS[8])
+    assert list(frame["station_id"]) == ["fs-a"]
+    assert (frame["lag_1"].iloc[0], frame["lag_7"].iloc[0]) == (108, 102)
+    assert db_session.query(StationFeatures).count() == 17
+
+
+def test_feature_store_uses_the_cell_weather(db_session: Session):
+    """
+    Tests that the stored weather of a station's grid cell replaces the
+    city-wide weather, which stays for the days and cells without history.
+    """
+    service = DatabaseService(db_session)
+    service.add_counter_infos(
+        [
+            {"station_id": "fs-a", "name": "a", "latitude": 43.61, "longitude": 3.87},
+            {"station_id": "fs-b", "name": "b", "latitude": 43.66, "longitude": 3.96},
+        ]
+    )
+    _seed(service, DAYS[:8])
+    service.add_cell_weather(
+        [
+            {
+                "cell_lat": 43.6,
+                "cell_lon": 3.85,
+                "date": DAYS[7],
+                "avg_temp": 31.0,
+                "precipitation_mm": 0.0,
+                "vent_max": 12.0,
+            }
+        ]
+    )
+    db_session.commit()
+
+    refresh_feature_store(service)
+    db_session.commit()
+
+    frame = service.load_station_features().set_index("station_id")
+    assert frame.loc["fs-a", "avg_temp"] == 31.0
+    assert (frame.loc["fs-a", "is_hot"], frame.loc["fs-a", "is_rainy"]) == (1, 0)
+    assert frame.loc["fs-b", "avg_temp"] == 3.0
+    assert frame.loc["fs-b", "is_rainy"] == 1
+
+
+def test_backfill_follows_the_store_coverage(db_session: Session):
+    """
+    Tests the backfill: only the stations whose counts are not all stored
+    are recomputed, a complete store costs nothing, and the suspect counters
+    never get training rows.
+    """
+    suspect = SUSPECT_COUNTERS[0]
+    service = DatabaseService(db_session)
+    service.add_counter_infos(
+        [
+            {"station_id": s, "name": s, "latitude": 43.6, "longitude": 3.88}
+            for s in ("fs-a", "fs-b", suspect)
+        ]
+    )
+    _seed(service, DAYS[:8], station_ids=("fs-a", "fs-b", suspect))
+    db_session.commit()
+
+    # Store filled by the daily ingestion of fs-a only: not empty, incomplete
+    refresh_feature_store(service, ["fs-a"], DAYS[7], DAYS[7])
+    db_session.commit()
+    assert service.get_feature_store_gaps() == ["fs-a", "fs-b", suspect]
+
+    assert backfill_feature_store(service) == 16
+    db_session.commit()
+    assert service.get_feature_store_gaps() == [suspect]
+    assert backfill_feature_store(service) == 0
+
+    frame = service.load_station_features()
+    assert sorted(frame["station_id"].unique()) == ["fs-a", "fs-b"]
+
+    # A count stored without its feature row is a gap again
+    _seed(service, DAYS[8:], station_ids=("fs-b",))
+    assert service.get_feature_store_gaps() == ["fs-b", suspect]
+    assert backfill_feature_store(service) == 9
+
+
+def test_backfilled_rows_are_read_from_the_primary(db_session: Session, tmp_path):
+    """
+    Tests that rows just backfilled are read back from the primary, not from
+    a (lagging) read replica, which only serves an already complete store.
+    """
+    service = DatabaseService(db_session)
+    service.add_counter_infos(
+        [{"station_id": "fs-a", "name": "a", "latitude": 43.6, "longitude": 3.88}]
+    )
+    _seed(service, DAYS[:8], station_ids=("fs-a",))
+    db_session.commit()
+
+    # Replica that has not replicated anything yet
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica_engine)
+    db_manager = MagicMock()
+    db_manager.get_session.return_value = db_session
+    db_manager.get_read_session.side_effect = lambda: Session(replica_engine)
+
+    frame = load_training_features(db_manager)
+    assert list(frame["station_id"]) == ["fs-a"]
+    db_manager.get_read_session.assert_not_called()
+
+    # Complete store: read-only workload on the replica
+    assert load_training_features(db_manager).empty
+    db_manager.get_read_session.assert_called_once()
+    replica_engine.dispose()
+
+
+class FakeProvider:
+    def get_forecast(self, cells, start_date, end_date, timezone="Europe/Paris"):
+        return pd.DataFrame(
+            [
+                {
+                    "cell_lat": lat,
+                    "cell_lon": lon,
+                    "date": start_date,
+                    "avg_temp": 32.0,
+                    "precipitation_mm": 0.0,
+                    "vent_max": 40.0,
+                }
+                for lat, lon in cells
+            ]
+        )
+
+
+def test_inference_rows_are_precomputed(db_session: Session, monkeypatch):
+    """
+    Tests the J0 rows: forecast of the station cell, lags read from DB with
+    the last-value fallback, and a single lookup to read them back.
+    """
+    service = DatabaseService(db_session)
+    service.add_counter_infos(
+        [
+            {"station_id": "fs-a", "name": "a", "latitude": 43.6, "longitude": 3.88},
+            {"station_id": "fs-new", "name": "n", "latitude": 43.6, "longitude": 3.9},
+        ]
+    )
+    _seed(service, DAYS[:8], station_ids=("fs-a",))
+    db_session.commit()
+
+    monkeypatch.setattr(feature_store, "get_weather_provider", FakeProvider)
+    today = DAYS[8]
+    # fs-new has no history at all: skipped
+    assert refresh_inference_features(service, today) == 1
+    db_session.commit()
+
+    rows = service.load_station_features(today, today, labelled=False)
+    assert len(rows) == 1
+    row = rows.iloc[0]
+    assert row["station_id"] == "fs-a"
+    assert row["intensity"] is None
+    assert (row["lag_1"], row["lag_7"]) == (108, 102)
+    assert (row["is_hot"], row["is_windy"], row["is_rainy"]) == (1, 1, 0)
+    # Not a training row until its count is ingested
+    assert service.load_station_features(today, today).empty
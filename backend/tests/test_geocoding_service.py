@@ -0,0 +1,85 @@
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download.geocoding_service as geocoding_service
+from download.geocoding_service import GeocodingCache, resolve_street_names
+from utils.async_utils import run_sync
+
+
+class StubNominatimHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Nominatim reverse endpoint."""
+
+    calls = []
+
+    def do_GET(self):
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        lat = params["lat"][0]
+        StubNominatimHandler.calls.append(lat)
+        # Failing point: must not be cached
+        if lat.startswith("0.5"):
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({"address": {"road": f"Rue {lat}"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_nominatim(monkeypatch):
+    StubNominatimHandler.calls = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubNominatimHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        geocoding_service,
+        "NOMINATIM_API_URL",
+        f"http://127.0.0.1:{server.server_address[1]}/reverse",
+    )
+    monkeypatch.setattr(geocoding_service, "NOMINATIM_MIN_INTERVAL", 0.0)
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def test_resolve_street_names_uses_the_disk_cache(stub_nominatim, tmp_path):
+    """
+    Tests the batch geocoding: one request per rounded coordinate, results
+    persisted on disk and reused, failures retried on the next run.
+    """
+    cache_path = tmp_path / "geocoding_cache.json"
+    coords = {
+        "counter-1": ("43.611200", "3.876700"),
+        # Same point once rounded: a single request
+        "counter-2": (43.6112000001, 3.8767),
+        "counter-3": (0.5, 3.0),
+        "counter-4": (None, None),
+    }
+
+    names = run_sync(resolve_street_names(coords, GeocodingCache(cache_path)))
+
+    assert names == {
+        "counter-1": "Rue 43.6112",
+        "counter-2": "Rue 43.6112",
+        "counter-3": None,
+        "counter-4": None,
+    }
+    assert len(StubNominatimHandler.calls) == 2
+    assert json.loads(cache_path.read_text()) == {"43.61120,3.87670": "Rue 43.6112"}
+
+    # Second run: cached names are not requested again, the failure is
+    StubNominatimHandler.calls = []
+    again = run_sync(resolve_street_names(coords, GeocodingCache(cache_path)))
+
+    assert again == names
+    assert StubNominatimHandler.calls == ["0.5"]
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+import requests_cache
+from urllib3.util.retry import Retry
+
+from download.replay_transport import (
+    FaultInjector,
+    FixtureStore,
+    ReplayAdapter,
+    ReplayTransport,
+)
+from utils.async_utils import run_sync
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Echoes the request path: the live service that gets recorded."""
+
+    calls = 0
+
+    def do_GET(self):
+        StubApiHandler.calls += 1
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubApiHandler.calls = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+async def _get(transport, url, params):
+    async with httpx.AsyncClient(transport=transport) as client:
+        return await client.get(url, params=params)
+
+
+def test_httpx_record_then_replay(stub_url, tmp_path):
+    """
+    Tests the async transport: a recorded response is served from disk
+    without the network, whatever the order of the query parameters.
+    """
+    store = FixtureStore(tmp_path)
+    recorded = run_sync(
+        _get(ReplayTransport("record", store), f"{stub_url}/ts", {"a": 1, "b": 2})
+    )
+    assert recorded.json() == {"path": "/ts?a=1&b=2"}
+    assert StubApiHandler.calls == 1
+
+    replayed = run_sync(
+        _get(ReplayTransport("replay", store), f"{stub_url}/ts", {"b": 2, "a": 1})
+    )
+    assert StubApiHandler.calls == 1
+    assert replayed.status_code == 200
+    assert replayed.json() == recorded.json()
+    assert replayed.headers["etag"] == '"v1"'
+
+    with pytest.raises(httpx.ConnectError):
+        run_sync(_get(ReplayTransport("replay", store), f"{stub_url}/other", {}))
+
+
+def test_httpx_replay_injects_latency_and_failures(stub_url, tmp_path):
+    """Tests the injected latency and the failed responses (503)."""
+    store = FixtureStore(tmp_path)
+    run_sync(_get(ReplayTransport("record", store), f"{stub_url}/ts", {}))
+
+    slow = ReplayTransport("replay", store, FaultInjector(latency=0.05, failure_rate=0))
+    start = time.monotonic()
+    assert run_sync(_get(slow, f"{stub_url}/ts", {})).status_code == 200
+    assert time.monotonic() - start >= 0.05
+
+    failing = ReplayTransport("replay", store, FaultInjector(0, failure_rate=1))
+    assert run_sync(_get(failing, f"{stub_url}/ts", {})).status_code == 503
+
+    # Seeded failures are reproducible
+    def statuses():
+        transport = ReplayTransport(
+            "replay", store, FaultInjector(0, failure_rate=0.5, seed="42")
+        )
+        return [
+            run_sync(_get(transport, f"{stub_url}/ts", {})).status_code
+            for _ in range(10)
+        ]
+
+    first = statuses()
+    assert set(first) == {200, 503}
+    assert statuses() == first
+
+
+def test_requests_adapter_replays_behind_a_cached_session(stub_url, tmp_path):
+    """
+    Tests the requests adapter mounted on a requests_cache session (as in the
+    synchronous loaders), including the retry policy applied to failures.
+    """
+    store = FixtureStore(tmp_path)
+    recorder = requests.Session()
+    recorder.mount("http://", ReplayAdapter("record", store))
+    assert recorder.get(f"{stub_url}/meta", params={"x": "1"}).json() == {
+        "path": "/meta?x=1"
+    }
+
+    session = requests_cache.CachedSession(backend="memory")
+    session.mount("http://", ReplayAdapter("replay", store))
+    response = session.get(f"{stub_url}/meta", params={"x": "1"})
+    assert response.json() == {"path": "/meta?x=1"}
+    assert session.get(f"{stub_url}/meta", params={"x": "1"}).from_cache
+    assert StubApiHandler.calls == 1
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(f"{stub_url}/missing")
+
+    # Failed replays are retried like live ones, then give up
+    flaky = requests.Session()
+    flaky.mount(
+        "http://",
+        ReplayAdapter(
+            "replay",
+            store,
+            FaultInjector(0, failure_rate=1),
+            max_retries=Retry(total=2, status_forcelist=[503]),
+        ),
+    )
+    with pytest.raises(requests.exceptions.RetryError):
+        flaky.get(f"{stub_url}/meta", params={"x": "1"})
@@ -0,0 +1,304 @@
+import json
+import threading
+from datetime import date
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import download.circuit_breaker as circuit_breaker
+from download.circuit_breaker import CircuitBreaker, CircuitOpenError
+from download.http_cache import ResponseCache, http_cache_requests
+from download.trafic_history_api import (
+    EcoCounterTimeseriesLoader,
+    StationDensityStore,
+)
+
+# Record limit of the stub API for the "hourly" stations
+STUB_LIMIT = 100
+
+
+class StubEcoCounterHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Ecocounter timeseries API."""
+
+    # Number of requests received per path, shared by all handler instances
+    calls = {}
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        station = urllib.parse.unquote(url.path).split("/")[2]
+        StubEcoCounterHandler.calls[station] = (
+            StubEcoCounterHandler.calls.get(station, 0) + 1
+        )
+
+        if station.endswith("missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if station.endswith("down"):
+            self.send_response(503)
+            self.end_headers()
+            return
+        # Second chunk of the gap station always fails
+        if station.endswith("gap") and params["fromDate"][0] > "2024-06":
+            self.send_response(503)
+            self.end_headers()
+            return
+        # First call of the flaky station fails: the loader must retry
+        if station.endswith("flaky") and StubEcoCounterHandler.calls[station] == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        # Recent data is served with an ETag (conditional requests)
+        if station.endswith("etag") and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        from_date = params["fromDate"][0][:10]
+        payload = {"index": [from_date], "values": [len(from_date)]}
+        # Busy counter: one record per hour, bounds included, capped like the API
+        if station.endswith("hourly"):
+            hours = pd.date_range(params["fromDate"][0], params["toDate"][0], freq="h")
+            hours = hours[:STUB_LIMIT]
+            payload = {
+                "index": [h.isoformat() for h in hours],
+                "values": [1] * len(hours),
+            }
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if station.endswith("etag"):
+            self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubEcoCounterHandler.calls = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEcoCounterHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    cache = ResponseCache(tmp_path / "ecocounter_http.sqlite")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def densities(tmp_path):
+    return StationDensityStore(tmp_path / "ecocounter_density.json")
+
+
+def cache_count(result):
+    return http_cache_requests.labels(cache="ecocounter", result=result)._value.get()
+
+
+def test_fetch_data_merges_chunks_concurrently(stub_server, densities):
+    """
+    Tests the async loader against a local stub server: chunks are merged in
+    order, 404 means no data and transient errors are retried.
+    """
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server,
+        max_concurrency=4,
+        backoff=0.01,
+        use_cache=False,
+        densities=densities,
+    )
+
+    results = loader.fetch_data(
+        ["station-a", "station-flaky", "station-missing"],
+        start_date="2024-01-01",
+        end_date="2025-03-01",
+    )
+
+    # 256-day first chunk (hourly estimate), then a larger one: sparse data
+    assert results["station-a"] == {
+        "index": ["2024-01-01", "2024-09-13"],
+        "values": [10, 10],
+        "id": "station-a",
+    }
+    assert results["station-flaky"]["index"] == results["station-a"]["index"]
+    assert StubEcoCounterHandler.calls["urn:ngsi-ld:EcoCounter:station-flaky"] == 3
+    assert results["station-missing"] is None
+    assert list(results) == ["station-a", "station-flaky", "station-missing"]
+
+
+def test_settled_chunks_are_served_from_cache(stub_server, response_cache, densities):
+    """
+    Tests that replaying a past period makes no request: settled chunks (data
+    and 404) never expire, and the chunk plan is the same on replay.
+    """
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server,
+        backoff=0.01,
+        cache=response_cache,
+        record_limit=STUB_LIMIT,
+        densities=densities,
+    )
+    ids = ["station-hourly", "station-missing"]
+
+    first = loader.fetch_data(ids, start_date="2024-01-01", end_date="2024-01-09")
+    calls = dict(StubEcoCounterHandler.calls)
+    hits = cache_count("hit")
+
+    second = loader.fetch_data(ids, start_date="2024-01-01", end_date="2024-01-09")
+
+    assert second == first
+    assert StubEcoCounterHandler.calls == calls
+    # 4 two-day chunks for the hourly station, 3 growing ones for the 404 station
+    assert cache_count("hit") == hits + 7
+
+
+def test_recent_chunks_are_revalidated_with_etag(
+    stub_server, response_cache, densities
+):
+    """Tests that an expired recent chunk is revalidated (304) instead of re-downloaded."""
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server, backoff=0.01, cache=response_cache, densities=densities
+    )
+    today = date.today().isoformat()
+    station = "urn:ngsi-ld:EcoCounter:station-etag"
+
+    first = loader.fetch_data(["station-etag"], start_date=today, end_date=today)
+    # Recent chunk: cached with a TTL, expire it right away
+    response_cache._connection.execute("UPDATE responses SET expires_at = 0")
+    second = loader.fetch_data(["station-etag"], start_date=today, end_date=today)
+
+    assert second == first
+    assert StubEcoCounterHandler.calls[station] == 2
+    _, _, etag, fresh = response_cache.get(
+        ResponseCache.make_key(
+            f"{stub_server}/ecocounter_timeseries/{station.replace(':', '%3A')}/attrs/intensity",
+            {"fromDate": f"{today}T00:00:00", "toDate": f"{today}T00:00:00"},
+        )
+    )
+    assert etag == '"v1"' and fresh
+
+
+def test_iter_chunks_streams_parsed_arrays(stub_server, densities):
+    """
+    Tests the streaming mode: every chunk is parsed into numpy arrays and
+    yielded through the bounded queue, 404 chunks are skipped.
+    """
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server,
+        max_concurrency=2,
+        backoff=0.01,
+        use_cache=False,
+        densities=densities,
+    )
+    windows = {("2024-01-01", "2025-03-01"): ["station-a", "station-missing"]}
+
+    chunks = list(loader.iter_chunks(windows, queue_size=1))
+
+    assert sorted((s, d.tolist(), v.tolist()) for s, d, v in chunks) == [
+        ("station-a", ["2024-01-01"], [10]),
+        ("station-a", ["2024-09-13"], [10]),
+    ]
+    assert all(isinstance(v, np.ndarray) for _, _, v in chunks)
+
+    # Stopping the consumer early stops the background download
+    stream = loader.iter_chunks(windows, queue_size=1)
+    next(stream)
+    stream.close()
+
+
+def test_adaptive_chunks_split_at_the_record_limit(stub_server, densities):
+    """
+    Tests the adaptive chunker: a chunk returned at the record limit is split
+    and requested again (no record lost), and the observed density is saved
+    for the next run.
+    """
+    # Stale estimate: 1 record/day -> 64-day chunks, far above the limit
+    densities.densities["station-hourly"] = 1.0
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server,
+        backoff=0.01,
+        use_cache=False,
+        record_limit=STUB_LIMIT,
+        densities=densities,
+    )
+
+    result = loader.fetch_data(
+        ["station-hourly"], start_date="2024-01-01", end_date="2024-01-21"
+    )
+
+    # Every hour of the range, chunk bounds being shared by two chunks
+    hours = pd.date_range("2024-01-01", "2024-01-21", freq="h")
+    assert sorted(set(result["station-hourly"]["index"])) == [
+        h.isoformat() for h in hours
+    ]
+    # 64 -> 32 -> 16 -> 8 -> 4 days at the limit, then five 4-day chunks
+    assert StubEcoCounterHandler.calls["urn:ngsi-ld:EcoCounter:station-hourly"] == 9
+    assert densities.get("station-hourly") == pytest.approx((1.0 + 24.25) / 2)
+    assert StationDensityStore(densities.path).densities == densities.densities
+
+
+def test_failed_chunk_stops_the_station(stub_server, densities, monkeypatch):
+    """
+    Tests that a chunk failing after its retries ends the station there:
+    no later chunk leaves a gap behind the ingestion watermark, and the
+    density of the incomplete download is not stored.
+    """
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server, backoff=0.01, use_cache=False, densities=densities
+    )
+
+    results = loader.fetch_data(
+        ["station-gap"], start_date="2024-01-01", end_date="2025-06-01", retries=2
+    )
+
+    assert results["station-gap"]["index"] == ["2024-01-01"]
+    # First chunk, then the failed one (2 attempts), nothing after the gap
+    assert StubEcoCounterHandler.calls["urn:ngsi-ld:EcoCounter:station-gap"] == 3
+    assert "station-gap" not in densities.densities
+
+
+def test_open_circuit_breaker_fails_fast(stub_server, densities, monkeypatch):
+    """
+    Tests that an API failing on every request trips the shared breaker:
+    the fetch stops after `failure_threshold` requests instead of retrying
+    every chunk of every station.
+    """
+    host = stub_server.split("//")[1]
+    monkeypatch.setattr(
+        circuit_breaker,
+        "_breakers",
+        {host: CircuitBreaker(host, failure_threshold=3, reset_timeout=60)},
+    )
+    loader = EcoCounterTimeseriesLoader(
+        base_url=stub_server,
+        max_concurrency=1,
+        backoff=0.01,
+        use_cache=False,
+        densities=densities,
+    )
+
+    with pytest.raises(CircuitOpenError):
+        loader.fetch_data(
+            ["station-down"],
+            start_date="2024-01-01",
+            end_date="2025-03-01",
+            retries=5,
+        )
+
+    # 3 failed attempts, not 5 retries per chunk
+    assert StubEcoCounterHandler.calls["urn:ngsi-ld:EcoCounter:station-down"] == 3
@@ -0,0 +1,164 @@
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+
+import download.daily_weather_api as daily_weather_api
+import download.weather_grid as weather_grid
+from download.daily_weather_api import OpenMeteoDailyAPIC
+from download.weather_grid import WeatherGridCache, station_cells, weather_by_station
+from download.weather_provider import WeatherProvider
+from download.weeather_api import WeatherHistoryLoader
+
+
+class StubOpenMeteoHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Open-Meteo archive API (multi-location JSON)."""
+
+    requests = []
+
+    def do_GET(self):
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        latitudes = params["latitude"][0].split(",")
+        StubOpenMeteoHandler.requests.append(latitudes)
+        days = pd.date_range(params["start_date"][0], params["end_date"][0])
+        locations = [
+            {
+                "daily": {
+                    "time": [d.strftime("%Y-%m-%d") for d in days],
+                    "temperature_2m_mean": [float(lat)] * len(days),
+                    "precipitation_sum": [0.0] * len(days),
+                    "wind_speed_10m_max": [10.0] * len(days),
+                }
+            }
+            for lat in latitudes
+        ]
+        payload = locations if len(locations) > 1 else locations[0]
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def history_loader(tmp_path, monkeypatch):
+    StubOpenMeteoHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenMeteoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        weather_grid, "_grid_cache", WeatherGridCache(tmp_path / "grid.sqlite")
+    )
+    loader = WeatherHistoryLoader()
+    loader.url = f"http://127.0.0.1:{server.server_address[1]}/v1/archive"
+    # Plain session: the per-cell cache is the one under test
+    loader.session = requests.Session()
+    yield loader
+    server.shutdown()
+    server.server_close()
+
+
+def test_grid_weather_is_batched_and_cached_per_cell(history_loader):
+    """
+    Tests the grid weather: stations sharing a cell share one location, the
+    missing cells are fetched in a single request, cached cells are reused.
+    """
+    cells = station_cells(
+        [
+            ("station-a", 43.6101, 3.8712),
+            ("station-b", 43.6149, 3.8688),  # Same 0.05° cell as station-a
+            ("station-c", 43.5602, 3.9011),
+            ("station-d", None, None),  # No coordinates: no weather
+        ]
+    )
+    assert cells == {
+        "station-a": (43.6, 3.85),
+        "station-b": (43.6, 3.85),
+        "station-c": (43.55, 3.9),
+    }
+
+    grid = history_loader.fetch_grid(cells.values(), "2025-01-01", "2025-01-02")
+
+    assert StubOpenMeteoHandler.requests == [["43.55", "43.6"]]
+    assert len(grid) == 4
+
+    per_station = weather_by_station(cells, grid)
+    station_c = per_station[per_station["station_id"] == "station-c"]
+    assert station_c["avg_temp"].tolist() == [43.55, 43.55]
+    assert station_c["date"].tolist() == [
+        pd.Timestamp("2025-01-01"),
+        pd.Timestamp("2025-01-02"),
+    ]
+
+    # A new cell only: one single-location request, the others from the cache
+    again = history_loader.fetch_grid(
+        [*cells.values(), (43.65, 3.85)], "2025-01-01", "2025-01-02"
+    )
+
+    assert StubOpenMeteoHandler.requests[1:] == [["43.65"]]
+    assert len(again) == 6
+
+
+def test_weather_provider_caches_forecasts(tmp_path, monkeypatch):
+    """
+    Tests the shared provider: the second pipeline of a run only requests
+    the cells the first one did not fetch, and expired entries are refetched.
+    """
+    monkeypatch.setattr(
+        weather_grid, "_grid_cache", WeatherGridCache(tmp_path / "grid.sqlite")
+    )
+    # One frame per requested location stands for the SDK responses
+    monkeypatch.setattr(daily_weather_api, "daily_response_to_frame", lambda r: r)
+    calls = []
+
+    def get_weather_json(latitude, longitude, start_date, **kwargs):
+        calls.append((list(zip(latitude, longitude)), kwargs["timezone"]))
+        return [
+            pd.DataFrame(
+                [
+                    {
+                        "date": pd.Timestamp(start_date),
+                        "avg_temp": lat,
+                        "precipitation_mm": 0.0,
+                        "vent_max": 10.0,
+                    }
+                ]
+            )
+            for lat in latitude
+        ]
+
+    client = OpenMeteoDailyAPIC()
+    monkeypatch.setattr(client, "get_weather_json", get_weather_json)
+    provider = WeatherProvider(client=client)
+
+    first = provider.get_forecast(
+        [(43.6, 3.85), (43.55, 3.9)], "2025-01-01", "2025-01-01"
+    )
+    second = provider.get_forecast(
+        [(43.6, 3.85), (43.65, 3.9)], "2025-01-01", "2025-01-01"
+    )
+
+    assert [cells for cells, _ in calls] == [
+        [(43.55, 3.9), (43.6, 3.85)],
+        [(43.65, 3.9)],
+    ]
+    assert first["avg_temp"].tolist() == [43.55, 43.6]
+    assert second["cell_lat"].tolist() == [43.6, 43.65]
+    assert provider.stats() == {"hits": 1, "misses": 3}
+
+    # Another timezone is another cache entry
+    provider.get_forecast([(43.6, 3.85)], "2025-01-01", "2025-01-01", timezone="UTC")
+    assert calls[-1] == ([(43.6, 3.85)], "UTC")
+
+    monkeypatch.setattr(daily_weather_api, "FORECAST_CACHE_TTL", -1)
+    provider.get_forecast([(43.55, 3.9)], "2025-01-02", "2025-01-02")
+    provider.get_forecast([(43.55, 3.9)], "2025-01-02", "2025-01-02")
+    assert len(calls) == 5
@@ -0,0 +1,203 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Type
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from utils.logging_config import logger
+from utils.paths import ARCHIVE_PATH
+
+# Format of the archive/output files: "parquet" (default), "csv" or "none"
+ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "parquet").lower()
+
+# Partitions: one directory per month of the `date` column, or per station.
+# The month column is only used for the layout and dropped on read (a leading
+# "_" would make pyarrow skip the directories).
+PARTITIONS = {"month": "archive_month", "station": "station_id"}
+
+
+class ArchiveWriter(ABC):
+    """Writes a DataFrame as `directory / name` (+ extension) and reads it back."""
+
+    extension: str
+
+    def path(self, directory: Path, name: str, partition: Optional[str] = None) -> Path:
+        return Path(directory) / f"{name}{self.extension}"
+
+    @abstractmethod
+    def write(
+        self,
+        df: pd.DataFrame,
+        directory: Path,
+        name: str,
+        partition: Optional[str] = None,
+    ) -> Path:
+        pass
+
+    @abstractmethod
+    def read(self, path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        pass
+
+
+class ParquetArchiveWriter(ArchiveWriter):
+    """
+    Columnar archive: dtypes (datetime, categorical, int/float) are kept,
+    partitioned archives are hive-style directories and reads are
+    memory-mapped.
+    """
+
+    extension = ".parquet"
+
+    def path(self, directory: Path, name: str, partition: Optional[str] = None) -> Path:
+        # Partitioned dataset: directory of files, one sub-directory per partition
+        return Path(directory) / (name if partition else f"{name}{self.extension}")
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        directory: Path,
+        name: str,
+        partition: Optional[str] = None,
+    ) -> Path:
+        output_path = self.path(directory, name, partition)
+        # Drop the archive of the other layout, which read_archive could pick up
+        stale = self.path(directory, name, None if partition else "month")
+        if stale.is_dir():
+            shutil.rmtree(stale, ignore_errors=True)
+        else:
+            stale.unlink(missing_ok=True)
+        if partition is None:
+            df.to_parquet(output_path, index=False)
+            return output_path
+
+        column = PARTITIONS[partition]
+        if partition == "month":
+            df = df.assign(**{column: pd.to_datetime(df["date"]).dt.strftime("%Y-%m")})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # A rewrite replaces the whole dataset (no stale partition left behind)
+        shutil.rmtree(output_path, ignore_errors=True)
+        ds.write_dataset(
+            table,
+            output_path,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([table.schema.field(column).remove_metadata()]),
+                flavor="hive",
+            ),
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return output_path
+
+    def read(self, path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        dataset = ds.dataset(
+            path,
+            format="parquet",
+            # Partition values (e.g. station_id) come back as categoricals
+            partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+            filesystem=pafs.LocalFileSystem(use_mmap=True),
+        )
+        df = dataset.to_table(columns=columns).to_pandas()
+        df = df.drop(columns=[PARTITIONS["month"]], errors="ignore")
+        # Partition columns are appended: restore the written column order
+        written = [
+            c["name"] for c in (dataset.schema.pandas_metadata or {}).get("columns", [])
+        ]
+        order = [c for c in written if c in df.columns]
+        return df[order + [c for c in df.columns if c not in order]]
+
+
+class CsvArchiveWriter(ArchiveWriter):
+    """Legacy CSV files (no dtypes, no partitions)."""
+
+    extension = ".csv"
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        directory: Path,
+        name: str,
+        partition: Optional[str] = None,
+    ) -> Path:
+        output_path = self.path(directory, name)
+        df.to_csv(output_path, index=False)
+        return output_path
+
+    def read(self, path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return pd.read_csv(path, usecols=columns)
+
+
+# Available formats: register a new ArchiveWriter here to plug it in
+ARCHIVE_WRITERS: Dict[str, Type[ArchiveWriter]] = {
+    "parquet": ParquetArchiveWriter,
+    "csv": CsvArchiveWriter,
+}
+
+
+def get_archive_writer(fmt: Optional[str] = None) -> Optional[ArchiveWriter]:
+    """Writer of the given format (default ARCHIVE_FORMAT), None for "none"."""
+    fmt = (fmt or ARCHIVE_FORMAT).lower()
+    if fmt == "none":
+        return None
+    if fmt not in ARCHIVE_WRITERS:
+        raise ValueError(f"Unknown archive format: {fmt}")
+    return ARCHIVE_WRITERS[fmt]()
+
+
+def write_archive(
+    df: pd.DataFrame,
+    name: str,
+    directory: Path = ARCHIVE_PATH,
+    partition: Optional[str] = None,
+    fmt: Optional[str] = None,
+) -> Optional[Path]:
+    """
+    Saves a DataFrame with the configured writer.
+
+    Args:
+        df (pd.DataFrame): Data to save.
+        name (str): File name without extension.
+        directory (Path): ARCHIVE_PATH, OUTPUT_PATH...
+        partition (Optional[str]): "month" (needs a `date` column), "station" or None.
+        fmt (Optional[str]): "parquet", "csv" or "none" (default ARCHIVE_FORMAT).
+
+    Returns:
+        Optional[Path]: Written file or directory, None if archiving is disabled.
+    """
+    if partition is not None and partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition: {partition}")
+    writer = get_archive_writer(fmt)
+    if writer is None:
+        return None
+    output_path = writer.write(df, directory, name, partition)
+    logger.info(f"Archive saved: {output_path} ({len(df)} rows)")
+    return output_path
+
+
+def read_archive(
+    name: str,
+    directory: Path = ARCHIVE_PATH,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Reads an archive written by `write_archive`, whatever its format: Parquet
+    file or partitioned directory (memory-mapped) and CSV, the configured
+    ARCHIVE_FORMAT first.
+
+    Raises:
+        FileNotFoundError: If no archive `name` exists in `directory`.
+    """
+    candidates = [
+        (ParquetArchiveWriter(), Path(directory) / f"{name}.parquet"),
+        (ParquetArchiveWriter(), Path(directory) / name),
+        (CsvArchiveWriter(), Path(directory) / f"{name}.csv"),
+    ]
+    candidates.sort(key=lambda c: c[0].extension != f".{ARCHIVE_FORMAT}")
+    for writer, path in candidates:
+        if path.exists():
+            return writer.read(path, columns)
+    raise FileNotFoundError(f"No archive named {name!r} in {directory}")
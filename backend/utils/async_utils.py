@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine from synchronous code. If the current thread already runs
+    an event loop, the coroutine is executed in a dedicated thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
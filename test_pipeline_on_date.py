@@ -21,7 +21,9 @@ def run_test_for_date(date_str: str):
 
     This script will:
     1. Freeze time to the day AFTER the target date.
-    2. Run the daily update, which will fetch data for the target date (as "yesterday").
+    2. Run the daily update, which will fetch the data missing since the ingestion
+       watermarks, up to the target date (as "yesterday"). A date already ingested
+       is not downloaded again.
     3. Run the prediction pipeline, which will generate predictions for the day AFTER the target date.
 
     Args: